@@ -0,0 +1,101 @@
+import threading
+import time
+
+import schema
+from supabase_client import supabase
+
+# =========================
+# GRAF AKSES KOLABORASI
+# =========================
+# Semua baris collaborations yang menyangkut satu user (sebagai pemilik,
+# peminta, atau email tujuan) diambil dengan satu query lalu di-cache
+# in-process, dipakai bersama semua sesi. Dari situ diturunkan akun yang
+# boleh dibaca, permintaan keluar, dan permintaan masuk.
+# Terima/tolak/batal/kirim memanggil invalidate() untuk kedua pihak.
+ACCESS_TTL = 300  # detik; perubahan dari luar aplikasi terlihat paling lambat segini
+
+_cache = {}  # user_id -> (waktu, email, DataFrame)
+_generation = 0
+_lock = threading.Lock()
+
+
+def _quote(value):
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def _load(user_id, email):
+    res = supabase.table("collaborations") \
+        .select(schema.columns("collaborations")) \
+        .or_(f"owner_id.eq.{_quote(user_id)},collab_id.eq.{_quote(user_id)},owner_email.eq.{_quote(email)}") \
+        .order("created_at", desc=True) \
+        .execute()
+    return schema.to_frame("collaborations", res.data)
+
+
+def _graph(user_id, email):
+    email = email.strip().lower()
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry and entry[1] == email and now - entry[0] < ACCESS_TTL:
+            return entry[2]
+        generation = _generation
+
+    df = _load(user_id, email)
+
+    with _lock:
+        # Jangan simpan kalau ada invalidasi di tengah-tengah load
+        if _generation == generation:
+            _cache[user_id] = (now, email, df)
+    return df
+
+
+def invalidate(user_ids=(), emails=()):
+    # Hapus graf user yang terkena (berdasarkan id atau email tujuan)
+    global _generation
+    emails = {e.strip().lower() for e in emails if e}
+    with _lock:
+        for key in [k for k, v in _cache.items() if k in user_ids or v[1] in emails]:
+            del _cache[key]
+        _generation += 1
+
+
+def clear():
+    global _generation
+    with _lock:
+        _cache.clear()
+        _generation += 1
+
+
+# =========================
+# TURUNAN GRAF
+# =========================
+def accounts(user):
+    # {user_id: label} akun yang bisa dilihat, akun sendiri pertama
+    df = _graph(user.id, user.email)
+    accepted = df[df["status"] == "accepted"]
+    labels = {user.id: "Saya"}
+    for c in accepted.to_dict("records"):
+        if c["owner_id"] == user.id:
+            labels[c["collab_id"]] = c["requester_email"]
+        elif c["collab_id"] == user.id:
+            labels[c["owner_id"]] = c["owner_email"]
+    return labels
+
+
+def outgoing(user):
+    # Permintaan yang dikirim user (user = peminta)
+    df = _graph(user.id, user.email)
+    return df[df["collab_id"] == user.id]
+
+
+def incoming(user, status="pending"):
+    # Permintaan ke email user (owner_id bisa kosong sebelum diterima)
+    df = _graph(user.id, user.email)
+    return df[(df["owner_email"] == user.email.strip().lower()) & (df["status"] == status)]
+
+
+def can_read(user, owner_ids):
+    if isinstance(owner_ids, str):
+        owner_ids = (owner_ids,)
+    return set(owner_ids) <= set(accounts(user))
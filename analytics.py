@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# DOWNSAMPLING DERET WAKTU
+# =========================
+# Data dari RPC transaction_series sudah teragregasi per bucket; di sini
+# jumlah titik yang dikirim ke browser dibatasi lagi:
+# - garis   -> LTTB (Largest-Triangle-Three-Buckets), bentuk kurva tetap
+# - tumpuk  -> bucket diperbesar (hari -> minggu -> bulan) sampai muat
+MAX_LINE_POINTS = 1_000
+MAX_BARS = 400
+TOP_KEYS = 8  # kategori terbesar; sisanya digabung jadi "Lainnya"
+
+BUCKET_DAYS = {"day": 1, "week": 7, "month": 30}
+COARSER = {"day": "week", "week": "month"}
+
+
+def lttb(x, y, threshold=MAX_LINE_POINTS):
+    # x, y: array numerik dengan x terurut. Mengembalikan indeks titik
+    # yang dipertahankan (titik pertama & terakhir selalu ikut).
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+    keep = np.empty(threshold, dtype="int64")
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Rata-rata bucket berikutnya sebagai titik ketiga segitiga
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_lines(df, x, y, by, threshold=MAX_LINE_POINTS):
+    # LTTB per garis (kolom `by`); df terurut menurut x di tiap garis
+    parts = []
+    for _, line in df.groupby(by, observed=True, sort=False):
+        line = line.sort_values(x)
+        idx = lttb(line[x].to_numpy("int64"), line[y].to_numpy(), threshold)
+        parts.append(line.iloc[idx])
+    return pd.concat(parts, ignore_index=True) if parts else df
+
+
+def fit_bucket(bucket, start, end, limit=MAX_BARS):
+    # Bucket terkecil (mulai dari pilihan user) yang jumlah batangnya <= limit
+    days = (end - start).days
+    while bucket in COARSER and days / BUCKET_DAYS[bucket] > limit:
+        bucket = COARSER[bucket]
+    return bucket
+
+
+def top_keys(df, labels, n=TOP_KEYS):
+    # df hasil transaction_series: kunci di luar n total terbesar jadi
+    # "Lainnya", lalu dijumlahkan lagi per (bucket, nama)
+    ranked = df.groupby("key")["total"].sum().nlargest(n).index
+    names = df["key"].map(labels).fillna("Tanpa nama").where(df["key"].isin(ranked), "Lainnya")
+    return df.assign(name=names).groupby(["bucket", "name"], as_index=False)["total"].sum()
@@ -1,5 +1,6 @@
 import streamlit as st
 from supabase_client import supabase
+import query_log
 
 st.set_page_config(page_title="Finance Tracker", layout="wide")
 
@@ -57,3 +58,9 @@ if st.session_state.user:
     st.switch_page("pages/1_Dashboard.py")
 else:
     login()
+
+
+# -------------------------
+# Debug query (opsional)
+# -------------------------
+query_log.render_panel()
@@ -0,0 +1,128 @@
+"""Benchmark halaman Streamlit secara offline.
+
+Setiap halaman dijalankan dengan ``streamlit.testing.v1.AppTest`` terhadap
+``FakeSupabase`` (SQLite in-memory) yang diisi 1k/100k/1M transaksi.
+
+    python -m benchmarks.bench_pages
+    python -m benchmarks.bench_pages --sizes 1000 100000 --reruns 5 --json bench.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import access  # noqa: E402
+import data_access as db  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+PAGES = [
+    "app.py",
+    "pages/1_Dashboard.py",
+    "pages/4_Transaksi.py",
+    "pages/4_Utang_Piutang.py",
+    "pages/2_Dompet.py",
+    "pages/3_Kategori.py",
+    "pages/5_Analitik.py",
+    "pages/kolaborasi.py",
+]
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def new_app(page, client, user, timeout):
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    at.session_state["_supabase_client"] = client
+    if page != "app.py":
+        at.session_state["user"] = user
+    return at
+
+
+def _delta(before, after):
+    return {k: after[k] - before[k] for k in ("queries", "rows", "bytes")}
+
+
+def bench_page(page, client, user, reruns, timeout, measure_memory=True):
+    # Run pertama = cold (cache & snapshot kosong), sisanya = rerun biasa
+    db.clear_cache()
+    access.clear()
+    at = new_app(page, client, user, timeout)
+    runs = []
+    for _ in range(reruns + 1):
+        before = client.snapshot_stats()
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        runs.append({"seconds": elapsed, **_delta(before, client.snapshot_stats())})
+
+    result = {
+        "page": page,
+        "error": str(at.exception[0].message) if at.exception else None,
+        "cold_ms": runs[0]["seconds"] * 1000,
+        "warm_p50_ms": statistics.median(r["seconds"] for r in runs[1:]) * 1000 if reruns else None,
+        "cold_queries": runs[0]["queries"],
+        "warm_queries": sum(r["queries"] for r in runs[1:]) / reruns if reruns else None,
+        "cold_rows": runs[0]["rows"],
+        "cold_bytes": runs[0]["bytes"],
+        "peak_mb": None,
+    }
+
+    if measure_memory:
+        # tracemalloc memperlambat eksekusi, jadi diukur di run terpisah
+        db.clear_cache()
+        access.clear()
+        at = new_app(page, client, user, timeout)
+        tracemalloc.start()
+        at.run()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result
+
+
+def format_row(size, r):
+    def num(v, fmt):
+        return "-" if v is None else format(v, fmt)
+
+    return (f"{size:>9,} {r['page']:<26} {num(r['cold_ms'], '10.1f')} {num(r['warm_p50_ms'], '10.1f')} "
+            f"{r['cold_queries']:>6} {num(r['warm_queries'], '6.1f')} {r['cold_rows']:>9,} "
+            f"{r['cold_bytes'] / 1024:>10,.0f} {num(r['peak_mb'], '8.1f')}  {r['error'] or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--latency-ms", type=float, default=0, help="latensi simulasi per request")
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>9} {'page':<26} {'cold ms':>10} {'warm ms':>10} {'q':>6} {'q/run':>6} "
+          f"{'rows':>9} {'KiB':>10} {'peak MB':>8}")
+    results = []
+    for size in args.sizes:
+        client = FakeSupabase(latency=args.latency_ms / 1000)
+        user = seed(client, size)
+        for page in args.pages:
+            r = bench_page(page, client, user, args.reruns, args.timeout, not args.no_memory)
+            r["size"] = size
+            results.append(r)
+            print(format_row(size, r), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
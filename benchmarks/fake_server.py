@@ -0,0 +1,211 @@
+"""PostgREST + GoTrue tiruan di atas ``FakeSupabase``, lewat HTTP sungguhan.
+
+Dipakai load test supaya sesi memakai jalur produksi: ``supabase_client``
+(create_client, httpx transport bersama, pool koneksi) -> HTTP -> server
+ini -> SQLite. Hanya bagian API yang dipakai aplikasi yang didukung:
+select/insert/upsert/update/delete dengan filter eq/neq/gt/gte/lt/lte/in/
+is/ilike/or, order, limit/offset, rpc, login/daftar/logout.
+
+    server = FakeServer(FakeSupabase())
+    server.start()   # server.url, ANON_KEY -> SUPABASE_URL, SUPABASE_KEY
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.fake_supabase import FakeAPIError, _split_top
+
+TOKEN_TTL = 24 * 3600
+FILTERS = ("eq", "neq", "gt", "gte", "lt", "lte")
+RESERVED = ("select", "order", "limit", "offset", "on_conflict", "columns")
+
+
+def _b64(data):
+    raw = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _jwt(claims):
+    # Bentuk JWT (tanpa tanda tangan sah); client hanya membaca isinya
+    return f"{_b64({'alg': 'HS256', 'typ': 'JWT'})}.{_b64(claims)}.{_b64(b'fake')}"
+
+
+def _claims(token):
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+ANON_KEY = _jwt({"iss": "supabase", "role": "anon", "exp": 4102444800})
+
+
+def _unquote(value):
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+class FakeServer:
+    def __init__(self, client, host="127.0.0.1", port=0):
+        self.client = client
+        self._users = {}  # user_id -> user (untuk refresh token)
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-supabase", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # --- GoTrue ---
+    def user_json(self, user):
+        created = datetime.now(timezone.utc).isoformat()
+        return {"id": user.id, "aud": "authenticated", "role": "authenticated", "email": user.email,
+                "app_metadata": {"provider": "email"}, "user_metadata": {},
+                "created_at": created, "updated_at": created, "email_confirmed_at": created}
+
+    def session_json(self, user):
+        self._users[user.id] = user
+        now = int(time.time())
+        claims = {"sub": user.id, "email": user.email, "role": "authenticated", "aud": "authenticated",
+                  "iat": now, "exp": now + TOKEN_TTL}
+        return {"access_token": _jwt(claims), "token_type": "bearer", "expires_in": TOKEN_TTL,
+                "expires_at": now + TOKEN_TTL, "refresh_token": f"refresh-{user.id}",
+                "user": self.user_json(user)}
+
+    def auth(self, method, path, params, body, headers):
+        if path == "/auth/v1/token" and params.get("grant_type") == "password":
+            user = self.client.users.get(body.get("email"))
+            if user is None:
+                return 400, {"code": 400, "error_code": "invalid_credentials", "msg": "Invalid login credentials"}
+            return 200, self.session_json(user)
+        if path == "/auth/v1/token" and params.get("grant_type") == "refresh_token":
+            user = self._users.get(str(body.get("refresh_token", "")).removeprefix("refresh-"))
+            if user is None:
+                return 400, {"code": 400, "error_code": "refresh_token_not_found", "msg": "Invalid Refresh Token"}
+            return 200, self.session_json(user)
+        if path == "/auth/v1/signup":
+            user = self.client.users.get(body.get("email")) or self.client.add_user(body.get("email"))
+            return 200, self.session_json(user)
+        if path == "/auth/v1/logout":
+            return 204, None
+        if path == "/auth/v1/user":
+            token = headers.get("Authorization", "").removeprefix("Bearer ")
+            user = self._users.get(_claims(token).get("sub")) if token.count(".") == 2 else None
+            if user is None:
+                return 401, {"code": 401, "error_code": "bad_jwt", "msg": "invalid JWT"}
+            return 200, self.user_json(user)
+        return 404, {"code": 404, "msg": f"{method} {path} tidak didukung"}
+
+    # --- PostgREST ---
+    def rest(self, method, path, query, body, headers):
+        name = path.removeprefix("/rest/v1/")
+        params = dict(query)
+        limit, offset = params.get("limit"), int(params.get("offset") or 0)
+        if name.startswith("rpc/"):
+            builder = self.client.rpc(name.removeprefix("rpc/"), body or {})
+            if limit is not None:
+                builder.range(offset, offset + int(limit) - 1)
+            return 200, builder.execute().data
+
+        prefer = headers.get("Prefer", "")
+        builder = self.client.table(name)
+        if method == "GET":
+            builder.select(params.get("select", "*"))
+        elif method == "POST":
+            returning = "minimal" if "return=minimal" in prefer else "representation"
+            if "resolution=" in prefer:
+                builder.upsert(body, returning=returning, on_conflict=params.get("on_conflict", "id"),
+                               ignore_duplicates="resolution=ignore-duplicates" in prefer)
+            else:
+                builder.insert(body, returning=returning)
+        elif method == "PATCH":
+            builder.update(body)
+        else:
+            builder.delete()
+
+        for key, value in query:
+            if key in RESERVED:
+                continue
+            if key == "or":
+                builder.or_(value[1:-1])
+                continue
+            op, _, criteria = value.partition(".")
+            if op in FILTERS:
+                getattr(builder, op)(key, _unquote(criteria))
+            elif op == "in":
+                builder.in_(key, [_unquote(v) for v in _split_top(criteria[1:-1])])
+            elif op == "is":
+                builder.is_(key, criteria)
+            elif op in ("like", "ilike"):
+                builder.ilike(key, criteria)
+            else:
+                raise FakeAPIError(f"filter tidak didukung: {key}={value}")
+        for item in filter(None, params.get("order", "").split(",")):
+            column, *modifiers = item.split(".")
+            builder.order(column, desc="desc" in modifiers)
+        if limit is not None:
+            builder.range(offset, offset + int(limit) - 1)
+        if "vnd.pgrst.object" in headers.get("Accept", ""):
+            builder.single()
+
+        data = builder.execute().data
+        if method == "POST" and "return=minimal" in prefer:
+            return 201, None
+        return 201 if method == "POST" else 200, data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, seperti PostgREST di balik proxy
+    fake = None
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        query = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        try:
+            if url.path.startswith("/auth/v1/"):
+                status, data = self.fake.auth(method, url.path, dict(query), body or {}, self.headers)
+            elif url.path.startswith("/rest/v1/"):
+                status, data = self.fake.rest(method, url.path, query, body, self.headers)
+            else:
+                status, data = 404, {"message": f"{url.path} tidak ada"}
+        except Exception as e:  # error database / trigger -> respons error PostgREST
+            status, data = 400, {"code": "P0001", "message": str(e), "details": None, "hint": None}
+
+        payload = b"" if data is None and status in (201, 204) else json.dumps(data, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if isinstance(data, list):
+            self.send_header("Content-Range", f"0-{max(len(data) - 1, 0)}/*")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):
+        pass
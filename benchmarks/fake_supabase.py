@@ -0,0 +1,849 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+# =========================
+# FAKE SUPABASE (SQLite)
+# =========================
+# Pengganti offline untuk permukaan supabase-py yang dipakai aplikasi:
+# table(...).select/eq/neq/gt/gte/lt/lte/in_/or_/order/limit/single,
+# insert/update/delete().execute(), rpc(...).execute() dan auth.
+# Setiap execute() dicatat (jumlah query, baris, byte JSON) untuk benchmark.
+
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now') || '+00:00'"
+ID_SQL = "lower(hex(randomblob(16)))"
+
+SCHEMA = f"""
+create table wallets (
+    id text primary key default ({ID_SQL}),
+    user_id text not null,
+    name text,
+    balance real not null default 0,
+    created_at text not null default ({NOW_SQL}),
+    updated_at text not null default ({NOW_SQL})
+);
+create table categories (
+    id text primary key default ({ID_SQL}),
+    user_id text not null,
+    name text,
+    type text,
+    created_at text not null default ({NOW_SQL})
+);
+create table category_rules (
+    id integer primary key autoincrement,
+    user_id text not null,
+    category_id text not null references categories (id) on delete cascade,
+    kind text not null,
+    pattern text not null,
+    priority integer not null default 0,
+    created_at text not null default ({NOW_SQL})
+);
+create table transactions (
+    id text primary key default ({ID_SQL}),
+    user_id text not null,
+    wallet_id text,
+    category_id text,
+    amount real not null,
+    type text not null,
+    description text,
+    date text not null,
+    created_at text not null default ({NOW_SQL}),
+    updated_at text not null default ({NOW_SQL})
+);
+create table debts (
+    id text primary key default ({ID_SQL}),
+    user_id text not null,
+    name text,
+    amount real,
+    type text,
+    description text,
+    due_date text,
+    status text,
+    created_at text not null default ({NOW_SQL}),
+    updated_at text not null default ({NOW_SQL})
+);
+create table collaborations (
+    id text primary key default ({ID_SQL}),
+    owner_id text,
+    collab_id text,
+    owner_email text,
+    requester_email text,
+    status text,
+    created_at text not null default ({NOW_SQL})
+);
+create table deleted_rows (
+    id integer primary key autoincrement,
+    table_name text not null,
+    row_id text not null,
+    user_id text not null,
+    deleted_at text not null default ({NOW_SQL})
+);
+create table wallet_ledger (
+    id integer primary key autoincrement,
+    wallet_id text not null references wallets (id) on delete cascade,
+    user_id text not null,
+    transaction_id text,
+    kind text not null,
+    amount real not null,
+    occurred_on text not null default (date('now')),
+    note text,
+    created_at text not null default ({NOW_SQL})
+);
+create table wallet_checkpoints (
+    wallet_id text not null references wallets (id) on delete cascade,
+    as_of text not null,
+    balance real not null,
+    ledger_id integer not null,
+    created_at text not null default ({NOW_SQL}),
+    primary key (wallet_id, as_of)
+);
+create table transaction_monthly_rollup (
+    user_id text not null,
+    month text not null,
+    category_id text,
+    type text not null,
+    total real not null default 0,
+    n integer not null default 0
+);
+create index transaction_monthly_rollup_idx on transaction_monthly_rollup (user_id, month, category_id, type);
+create index wallet_ledger_wallet_date_idx on wallet_ledger (wallet_id, occurred_on);
+create index wallet_ledger_transaction_idx on wallet_ledger (transaction_id);
+create index transactions_user_keyset_idx on transactions (user_id, date, created_at, id);
+create index transactions_user_updated_idx on transactions (user_id, updated_at);
+create index debts_user_updated_idx on debts (user_id, updated_at);
+create index wallets_user_updated_idx on wallets (user_id, updated_at);
+create index deleted_rows_sync_idx on deleted_rows (user_id, table_name, deleted_at);
+"""
+
+SYNC_TABLES = ("transactions", "debts", "wallets")
+
+TRIGGERS = "".join(f"""
+create trigger {t}_touch after update on {t}
+for each row when new.updated_at = old.updated_at
+begin
+    update {t} set updated_at = {NOW_SQL} where id = new.id;
+end;
+create trigger {t}_tombstone after delete on {t}
+begin
+    insert into deleted_rows (table_name, row_id, user_id) values ('{t}', old.id, old.user_id);
+end;
+""" for t in SYNC_TABLES) + """
+create trigger apply_ledger_entries after insert on wallet_ledger
+for each row when new.kind != 'saldo_awal'
+begin
+    update wallets set balance = balance + new.amount where id = new.wallet_id;
+end;
+create trigger ledger_transactions_insert after insert on transactions
+for each row when new.wallet_id is not null
+begin
+    select raise(abort, 'Dompet transaksi tidak ditemukan')
+    where not exists (select 1 from wallets w where w.id = new.wallet_id and w.user_id = new.user_id);
+    insert into wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    values (new.wallet_id, new.user_id, new.id, 'transaksi',
+            case when new.type = 'pemasukan' then new.amount else -new.amount end, new.date);
+end;
+create trigger ledger_transactions_delete after delete on transactions
+for each row when exists (select 1 from wallets w where w.id = old.wallet_id and w.user_id = old.user_id)
+begin
+    insert into wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    values (old.wallet_id, old.user_id, old.id, 'pembatalan',
+            case when old.type = 'pemasukan' then -old.amount else old.amount end, old.date);
+end;
+create trigger rollup_transactions_insert after insert on transactions
+begin
+    insert into transaction_monthly_rollup (user_id, month, category_id, type)
+    select new.user_id, substr(new.date, 1, 7) || '-01', new.category_id, new.type
+    where not exists (
+        select 1 from transaction_monthly_rollup
+        where user_id = new.user_id and month = substr(new.date, 1, 7) || '-01'
+          and category_id is new.category_id and type = new.type
+    );
+    update transaction_monthly_rollup set total = total + new.amount, n = n + 1
+    where user_id = new.user_id and month = substr(new.date, 1, 7) || '-01'
+      and category_id is new.category_id and type = new.type;
+end;
+create trigger rollup_transactions_delete after delete on transactions
+begin
+    update transaction_monthly_rollup set total = total - old.amount, n = n - 1
+    where user_id = old.user_id and month = substr(old.date, 1, 7) || '-01'
+      and category_id is old.category_id and type = old.type;
+    delete from transaction_monthly_rollup where n <= 0;
+end;
+create trigger rollup_transactions_update after update on transactions
+for each row when old.amount is not new.amount or old.type is not new.type or old.date is not new.date
+    or old.category_id is not new.category_id or old.user_id is not new.user_id
+begin
+    update transaction_monthly_rollup set total = total - old.amount, n = n - 1
+    where user_id = old.user_id and month = substr(old.date, 1, 7) || '-01'
+      and category_id is old.category_id and type = old.type;
+    insert into transaction_monthly_rollup (user_id, month, category_id, type)
+    select new.user_id, substr(new.date, 1, 7) || '-01', new.category_id, new.type
+    where not exists (
+        select 1 from transaction_monthly_rollup
+        where user_id = new.user_id and month = substr(new.date, 1, 7) || '-01'
+          and category_id is new.category_id and type = new.type
+    );
+    update transaction_monthly_rollup set total = total + new.amount, n = n + 1
+    where user_id = new.user_id and month = substr(new.date, 1, 7) || '-01'
+      and category_id is new.category_id and type = new.type;
+    delete from transaction_monthly_rollup where n <= 0;
+end;
+create trigger ledger_transactions_update after update on transactions
+for each row when old.wallet_id is not new.wallet_id or old.amount is not new.amount
+    or old.type is not new.type or old.date is not new.date
+begin
+    select raise(abort, 'Dompet transaksi tidak ditemukan')
+    where new.wallet_id is not null
+      and not exists (select 1 from wallets w where w.id = new.wallet_id and w.user_id = new.user_id);
+    insert into wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    select old.wallet_id, old.user_id, old.id, 'pembatalan',
+           case when old.type = 'pemasukan' then -old.amount else old.amount end, old.date
+    where exists (select 1 from wallets w where w.id = old.wallet_id and w.user_id = old.user_id);
+    insert into wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    select new.wallet_id, new.user_id, new.id, 'transaksi',
+           case when new.type = 'pemasukan' then new.amount else -new.amount end, new.date
+    where new.wallet_id is not null;
+end;
+create trigger ledger_wallet_opening after insert on wallets
+begin
+    insert into wallet_ledger (wallet_id, user_id, kind, amount) values (new.id, new.user_id, 'saldo_awal', new.balance);
+end;
+"""
+
+# Trigger yang dilewati bulk_insert_transactions (ledger & saldo dibangun ulang)
+BULK_TRIGGERS = ("apply_ledger_entries", "ledger_transactions_insert", "rollup_transactions_insert")
+
+
+def _trigger_sql(name):
+    start = TRIGGERS.index(f"create trigger {name} ")
+    return TRIGGERS[start:TRIGGERS.index("end;", start) + 4]
+
+
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+def _ident(name):
+    name = name.strip()
+    if not _IDENT.match(name):
+        raise FakeAPIError(f"kolom tidak valid: {name!r}")
+    return name
+
+
+def _split_top(text):
+    # Pisah "a,b(c,d),e" di koma level teratas (menghormati kurung & kutip)
+    parts, depth, quoted, cur = [], 0, False, ""
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def _parse_logic(text, joiner, params):
+    # Sintaks filter logika PostgREST -> SQL
+    clauses = []
+    for part in _split_top(text):
+        part = part.strip()
+        m = re.match(r"^(and|or)\((.*)\)$", part, re.S)
+        if m:
+            clauses.append("(" + _parse_logic(m.group(2), m.group(1).upper(), params) + ")")
+            continue
+        column, op, value = part.split(".", 2)
+        if op not in OPERATORS:
+            raise FakeAPIError(f"operator tidak didukung: {op}")
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        clauses.append(f"{_ident(column)} {OPERATORS[op]} ?")
+        params.append(value)
+    return f" {joiner} ".join(clauses)
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = _ident(table)
+        self._action = "select"
+        self._columns = "*"
+        self._payload = None
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._single = False
+        self._minimal = False
+        self._upsert = False
+        self._on_conflict = "id"
+        self._ignore_duplicates = False
+
+    # --- aksi ---
+    def select(self, columns="*", count=None):
+        self._action = "select"
+        self._columns = ", ".join(_ident(c) for c in columns.split(",")) if columns.strip() != "*" else "*"
+        return self
+
+    def insert(self, payload, returning=None, **kwargs):
+        self._action = "insert"
+        self._payload = payload if isinstance(payload, list) else [payload]
+        self._minimal = str(getattr(returning, "value", returning)) == "minimal"
+        return self
+
+    def upsert(self, payload, returning=None, on_conflict="id", ignore_duplicates=False, **kwargs):
+        self.insert(payload, returning=returning)
+        self._upsert = True
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values, **kwargs):
+        self._action = "update"
+        self._payload = values
+        return self
+
+    def delete(self, **kwargs):
+        self._action = "delete"
+        return self
+
+    # --- filter ---
+    def _filter(self, column, op, value):
+        self._where.append(f"{_ident(column)} {op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{_ident(column)} in ({', '.join('?' * len(values))})")
+        self._params.extend(values)
+        return self
+
+    def is_(self, column, value):
+        self._where.append(f"{_ident(column)} is {'null' if value in (None, 'null') else '?'}")
+        if value not in (None, "null"):
+            self._params.append(value)
+        return self
+
+    def ilike(self, column, pattern):
+        self._where.append(f"{_ident(column)} like ?")
+        self._params.append(pattern.replace("*", "%"))
+        return self
+
+    def or_(self, filters):
+        self._where.append("(" + _parse_logic(filters, "OR", self._params) + ")")
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self._order.append(f"{_ident(column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, size):
+        self._limit = int(size)
+        return self
+
+    def range(self, start, end):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        return self.single()
+
+    # --- eksekusi ---
+    def _where_sql(self):
+        return (" where " + " and ".join(self._where)) if self._where else ""
+
+    def execute(self):
+        return self._client._run(self._table, self._execute)
+
+    def _execute(self, conn):
+        where = self._where_sql()
+        if self._action == "select":
+            sql = f"select {self._columns} from {self._table}{where}"
+            if self._order:
+                sql += " order by " + ", ".join(self._order)
+            limit = self._client.row_limit(self._limit)
+            if limit is not None:
+                sql += f" limit {limit}"
+                if self._offset:
+                    sql += f" offset {self._offset}"
+            rows = [dict(r) for r in conn.execute(sql, self._params)]
+        elif self._action == "insert":
+            rows = []
+            for record in self._payload:
+                cols = [_ident(c) for c in record]
+                sql = f"insert into {self._table} ({', '.join(cols)}) values ({', '.join('?' * len(cols))})"
+                if self._upsert:
+                    key = _ident(self._on_conflict)
+                    updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != key)
+                    if updates and not self._ignore_duplicates:
+                        sql += f" on conflict ({key}) do update set {updates}"
+                    else:
+                        sql += f" on conflict ({key}) do nothing"
+                sql += " returning *"
+                rows.extend(dict(r) for r in conn.execute(sql, [record[c] for c in record]))
+            if self._minimal:
+                rows = []
+        elif self._action == "update":
+            cols = [_ident(c) for c in self._payload]
+            sets = ", ".join(f"{c} = ?" for c in cols)
+            sql = f"update {self._table} set {sets}{where} returning *"
+            rows = [dict(r) for r in conn.execute(sql, list(self._payload.values()) + self._params)]
+        else:
+            sql = f"delete from {self._table}{where} returning *"
+            rows = [dict(r) for r in conn.execute(sql, self._params)]
+
+        if self._single:
+            if len(rows) != 1:
+                raise FakeAPIError(f"single(): {len(rows)} baris")
+            return rows[0]
+        return rows
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params or {}
+        self._offset = 0
+        self._limit = None
+
+    def limit(self, size):
+        self._limit = int(size)
+        return self
+
+    def range(self, start, end):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    def _slice(self, data):
+        # Fungsi set-returning: limit/range & max_rows seperti PostgREST
+        if not isinstance(data, list):
+            return data
+        limit = self._client.row_limit(self._limit)
+        return data[self._offset:None if limit is None else self._offset + limit]
+
+    def execute(self):
+        fn = RPCS.get(self._name)
+        if fn is None:
+            raise FakeAPIError(f"rpc tidak dikenal: {self._name}")
+        return self._client._run(f"rpc:{self._name}", lambda conn: self._slice(fn(conn, **self._params)))
+
+
+class FakeAuth:
+    def __init__(self, client):
+        self._client = client
+        self._user = None
+
+    def get_session(self):
+        return SimpleNamespace(user=self._user) if self._user else None
+
+    def sign_in_with_password(self, credentials):
+        user = self._client.users.get(credentials.get("email"))
+        if user is None:
+            raise FakeAPIError("Invalid login credentials")
+        self._user = user
+        return SimpleNamespace(user=user)
+
+    def sign_up(self, credentials):
+        user = self._client.add_user(credentials.get("email"))
+        return SimpleNamespace(user=user)
+
+    def sign_out(self):
+        self._user = None
+
+
+class FakeSupabase:
+    def __init__(self, path=":memory:", latency=0.0, max_rows=None):
+        # `latency` (detik) disimulasikan per request, untuk meniru jaringan;
+        # `max_rows` = batas baris per respons (max-rows PostgREST)
+        self.latency = latency
+        self.max_rows = max_rows
+        self.users = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("word_similarity", 2, word_similarity, deterministic=True)
+        self._conn.create_function("rule_matches", 3, rule_matches, deterministic=True)
+        self._conn.executescript(SCHEMA + TRIGGERS)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        self.auth = FakeAuth(self)
+
+    # --- permukaan supabase-py ---
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params)
+
+    # --- util ---
+    def row_limit(self, limit):
+        if self.max_rows is None:
+            return limit
+        return self.max_rows if limit is None else min(limit, self.max_rows)
+
+    def add_user(self, email):
+        user = SimpleNamespace(id=f"user-{len(self.users) + 1:05d}", email=email)
+        self.users[email] = user
+        return user
+
+    def executemany(self, sql, rows):
+        with self._lock:
+            self._conn.execute("begin")
+            self._conn.executemany(sql, rows)
+            self._conn.execute("commit")
+
+    def bulk_insert_transactions(self, sql, rows):
+        # Untuk seed besar: trigger per baris dilewati, ledger & rollup
+        # dibangun sekali secara set-based (sama hasilnya dengan trigger).
+        with self._lock:
+            self._conn.execute("begin")
+            for name in BULK_TRIGGERS:
+                self._conn.execute(f"drop trigger {name}")
+            self._conn.executemany(sql, rows)
+            self._conn.execute("""
+                insert into wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+                select wallet_id, user_id, id, 'transaksi',
+                       case when type = 'pemasukan' then amount else -amount end, date
+                from transactions t
+                where wallet_id is not null
+                  and not exists (select 1 from wallet_ledger l where l.transaction_id = t.id)
+            """)
+            rpc_rebuild_monthly_rollup(self._conn)
+            for name in BULK_TRIGGERS:
+                self._conn.execute(_trigger_sql(name))
+            self._conn.execute("commit")
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {"queries": 0, "rows": 0, "bytes": 0, "lock_wait": 0.0, "by_target": {}}
+
+    def snapshot_stats(self):
+        with self._stats_lock:
+            return {**self.stats, "by_target": dict(self.stats["by_target"])}
+
+    def _run(self, target, fn):
+        if self.latency:
+            time.sleep(self.latency)
+        waited = time.perf_counter()
+        with self._lock:
+            waited = time.perf_counter() - waited
+            self._conn.execute("begin")
+            try:
+                data = fn(self._conn)
+                self._conn.execute("commit")
+            except Exception:
+                self._conn.execute("rollback")
+                raise
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        payload = len(json.dumps(data, default=str))
+        with self._stats_lock:
+            self.stats["queries"] += 1
+            self.stats["rows"] += rows
+            self.stats["bytes"] += payload
+            self.stats["lock_wait"] += waited
+            self.stats["by_target"][target] = self.stats["by_target"].get(target, 0) + 1
+        return FakeResponse(data)
+
+
+# =========================
+# RPC (padanan supabase/migrations)
+# =========================
+def _one(conn, sql, params):
+    rows = conn.execute(sql, params).fetchall()
+    return dict(rows[0]) if rows else None
+
+
+def _month_start(value):
+    return value[8:10] == "01"
+
+
+def rpc_monthly_summary(conn, p_user_id, p_start, p_end, p_by_category=False):
+    category = "category_id" if p_by_category else "null"
+    if _month_start(p_start) and _month_start(p_end):
+        sql = f"""
+            select month, type, {category} as category_id, sum(total) as total, sum(n) as n
+            from transaction_monthly_rollup
+            where user_id = ? and month >= ? and month < ?
+            group by 1, 2, 3
+            order by 1, 2, 3
+        """
+    else:
+        sql = f"""
+            select substr(date, 1, 7) || '-01' as month, type, {category} as category_id,
+                   sum(amount) as total, count(*) as n
+            from transactions
+            where user_id = ? and date >= ? and date < ?
+            group by 1, 2, 3
+            order by 1, 2, 3
+        """
+    return [dict(r) for r in conn.execute(sql, (p_user_id, p_start, p_end))]
+
+
+SERIES_BUCKETS = {
+    "day": "date",
+    "week": "date(date, 'weekday 0', '-6 days')",
+    "month": "substr(date, 1, 7) || '-01'",
+}
+SERIES_KEYS = {"type": "null", "category": "category_id", "wallet": "wallet_id"}
+
+
+def rpc_transaction_series(conn, p_user_id, p_start, p_end, p_bucket="month", p_group="type"):
+    if p_bucket not in SERIES_BUCKETS:
+        raise FakeAPIError(f"Bucket tidak valid: {p_bucket}")
+    if p_group not in SERIES_KEYS:
+        raise FakeAPIError(f"Pengelompokan tidak valid: {p_group}")
+    if p_bucket == "month" and p_group != "wallet" and _month_start(p_start) and _month_start(p_end):
+        sql = f"""
+            select month as bucket, type, {SERIES_KEYS[p_group]} as key, sum(total) as total, sum(n) as n
+            from transaction_monthly_rollup
+            where user_id = ? and month >= ? and month < ?
+            group by 1, 2, 3
+            order by 1, 2, 3
+        """
+    else:
+        sql = f"""
+            select {SERIES_BUCKETS[p_bucket]} as bucket, type, {SERIES_KEYS[p_group]} as key,
+                   sum(amount) as total, count(*) as n
+            from transactions
+            where user_id = ? and date >= ? and date < ?
+            group by 1, 2, 3
+            order by 1, 2, 3
+        """
+    return [dict(r) for r in conn.execute(sql, (p_user_id, p_start, p_end))]
+
+
+def _trigrams(words):
+    return {f"  {w} "[i:i + 3] for w in words for i in range(len(w) + 1)}
+
+
+def word_similarity(query, text):
+    # Pendekatan word_similarity pg_trgm: porsi trigram query yang ada di
+    # rentang kata berurutan terbaik pada teks
+    if not query or not text:
+        return 0.0
+    q_words = re.findall(r"\w+", query.lower())
+    t_words = re.findall(r"\w+", text.lower())
+    q = _trigrams(q_words)
+    if not q or not t_words:
+        return 0.0
+    width = min(len(q_words), len(t_words))
+    return max(len(q & _trigrams(t_words[i:i + width])) / len(q) for i in range(len(t_words) - width + 1))
+
+
+def rule_matches(kind, pattern, text):
+    # Padanan public.rule_matches: ILIKE potongan teks / regex ~*
+    if text is None:
+        return 0
+    if kind == "keyword":
+        return int(pattern.lower() in text.lower())
+    return int(re.search(pattern, text, re.IGNORECASE) is not None)
+
+
+SIMILARITY_THRESHOLD = 0.6  # default pg_trgm.word_similarity_threshold
+
+
+def _like_pattern(query):
+    return "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def rpc_search_transactions(conn, p_user_id, p_query, p_limit=50):
+    sql = """
+        select id, wallet_id, category_id, amount, type, description, date,
+               case when description like :pat escape '\\' then 1.0
+                    else word_similarity(:q, description) end as score
+        from transactions
+        where user_id = :uid
+          and (description like :pat escape '\\' or word_similarity(:q, description) >= :th)
+        order by score desc, date desc
+        limit :lim
+    """
+    params = {"uid": p_user_id, "q": p_query, "pat": _like_pattern(p_query),
+              "th": SIMILARITY_THRESHOLD, "lim": p_limit}
+    return [dict(r) for r in conn.execute(sql, params)]
+
+
+def rpc_search_debts(conn, p_user_id, p_query, p_limit=50):
+    sql = """
+        select id, name, amount, type, description, due_date, status,
+               max(case when name like :pat escape '\\' then 1.0 else word_similarity(:q, name) end,
+                   0.9 * case when description like :pat escape '\\' then 1.0
+                              else word_similarity(:q, description) end) as score
+        from debts
+        where user_id = :uid
+          and (name like :pat escape '\\' or word_similarity(:q, name) >= :th
+               or description like :pat escape '\\' or word_similarity(:q, description) >= :th)
+        order by score desc, due_date
+        limit :lim
+    """
+    params = {"uid": p_user_id, "q": p_query, "pat": _like_pattern(p_query),
+              "th": SIMILARITY_THRESHOLD, "lim": p_limit}
+    return [dict(r) for r in conn.execute(sql, params)]
+
+
+def rpc_apply_category_rules(conn, p_user_id, p_only_uncategorized=False):
+    # Per transaksi: aturan cocok berprioritas tertinggi (seri: id terkecil)
+    matched = conn.execute("""
+        select transaction_id, rule_id, category_id from (
+            select t.id as transaction_id, cr.id as rule_id, cr.category_id, t.category_id as current,
+                   row_number() over (partition by t.id order by cr.priority desc, cr.id) as rn
+            from transactions t
+            join category_rules cr on cr.user_id = t.user_id
+            join categories c on c.id = cr.category_id
+            where t.user_id = ? and t.type = c.type
+              and (not ? or t.category_id is null)
+              and rule_matches(cr.kind, cr.pattern, t.description)
+        ) where rn = 1 and current is not category_id
+    """, (p_user_id, bool(p_only_uncategorized))).fetchall()
+    conn.executemany("update transactions set category_id = ? where id = ?",
+                     [(m["category_id"], m["transaction_id"]) for m in matched])
+    counts = {}
+    for m in matched:
+        counts[m["rule_id"]] = counts.get(m["rule_id"], 0) + 1
+    rules = conn.execute("select id from category_rules where user_id = ? order by id", (p_user_id,)).fetchall()
+    return [{"rule_id": r["id"], "updated": counts.get(r["id"], 0)} for r in rules]
+
+
+def rpc_rebuild_monthly_rollup(conn, p_user_id=None):
+    conn.execute("delete from transaction_monthly_rollup where ? is null or user_id = ?", (p_user_id, p_user_id))
+    cur = conn.execute("""
+        insert into transaction_monthly_rollup (user_id, month, category_id, type, total, n)
+        select user_id, substr(date, 1, 7) || '-01', category_id, type, sum(amount), count(*)
+        from transactions
+        where ? is null or user_id = ?
+        group by 1, 2, 3, 4
+    """, (p_user_id, p_user_id))
+    return cur.rowcount
+
+
+def rpc_record_transaction(conn, p_user_id, p_wallet_id, p_category_id, p_amount, p_type, p_description, p_date):
+    if p_type not in ("pemasukan", "pengeluaran"):
+        raise FakeAPIError(f"Jenis transaksi tidak valid: {p_type}")
+    if _one(conn, "select id from wallets where id = ? and user_id = ?", (p_wallet_id, p_user_id)) is None:
+        raise FakeAPIError(f"Dompet {p_wallet_id} tidak ditemukan")
+    # Saldo disesuaikan oleh trigger ledger
+    return _one(conn, """
+        insert into transactions (user_id, wallet_id, category_id, amount, type, description, date)
+        values (?, ?, ?, ?, ?, ?, ?) returning *
+    """, (p_user_id, p_wallet_id, p_category_id, float(p_amount), p_type, p_description, p_date))
+
+
+def rpc_delete_transaction(conn, p_id):
+    row = _one(conn, "delete from transactions where id = ? returning *", (p_id,))
+    if row is None:
+        raise FakeAPIError(f"Transaksi {p_id} tidak ditemukan")
+    return row
+
+
+def _ledger_entry(conn, wallet_id, amount, note):
+    cur = conn.execute("""
+        insert into wallet_ledger (wallet_id, user_id, kind, amount, note)
+        select id, user_id, 'koreksi', ?, ? from wallets where id = ?
+    """, (amount, note, wallet_id))
+    if cur.rowcount == 0:
+        raise FakeAPIError(f"Dompet {wallet_id} tidak ditemukan")
+    return _one(conn, "select * from wallets where id = ?", (wallet_id,))
+
+
+def rpc_set_wallet_balance(conn, p_wallet_id, p_balance):
+    row = _one(conn, "select balance from wallets where id = ?", (p_wallet_id,))
+    if row is None:
+        raise FakeAPIError(f"Dompet {p_wallet_id} tidak ditemukan")
+    return _ledger_entry(conn, p_wallet_id, float(p_balance) - row["balance"], "Update saldo manual")
+
+
+def rpc_wallet_balance_at(conn, p_wallet_id, p_at):
+    cp = _one(conn, """
+        select as_of, balance, ledger_id from wallet_checkpoints
+        where wallet_id = ? and as_of <= ? order by as_of desc limit 1
+    """, (p_wallet_id, p_at))
+    if cp is None:
+        cp = {"as_of": "", "balance": 0, "ledger_id": 0}
+    row = _one(conn, """
+        select coalesce(sum(amount), 0) as total from wallet_ledger
+        where wallet_id = ? and occurred_on <= ? and (occurred_on > ? or id > ?)
+    """, (p_wallet_id, p_at, cp["as_of"], cp["ledger_id"]))
+    return cp["balance"] + row["total"]
+
+
+def rpc_reconcile_wallets(conn, p_user_id=None, p_fix=False):
+    sql = """
+        select w.id as wallet_id, w.user_id, w.balance,
+               coalesce((select sum(l.amount) from wallet_ledger l where l.wallet_id = w.id), 0) as ledger_balance
+        from wallets w
+        where ? is null or w.user_id = ?
+    """
+    rows = [dict(r) for r in conn.execute(sql, (p_user_id, p_user_id))]
+    drift = [dict(r, drift=round(r["balance"] - r["ledger_balance"], 2)) for r in rows
+             if round(r["balance"] - r["ledger_balance"], 2) != 0]
+    if p_fix:
+        conn.executemany("update wallets set balance = ? where id = ?",
+                         [(r["ledger_balance"], r["wallet_id"]) for r in drift])
+    return drift
+
+
+RPCS = {
+    "apply_category_rules": rpc_apply_category_rules,
+    "monthly_summary": rpc_monthly_summary,
+    "rebuild_monthly_rollup": rpc_rebuild_monthly_rollup,
+    "transaction_series": rpc_transaction_series,
+    "search_transactions": rpc_search_transactions,
+    "search_debts": rpc_search_debts,
+    "record_transaction": rpc_record_transaction,
+    "delete_transaction": rpc_delete_transaction,
+    "set_wallet_balance": rpc_set_wallet_balance,
+    "wallet_balance_at": rpc_wallet_balance_at,
+    "reconcile_wallets": rpc_reconcile_wallets,
+}
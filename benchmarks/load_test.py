@@ -0,0 +1,454 @@
+"""Load test: banyak sesi Streamlit bersamaan di satu proses server.
+
+Server Streamlit sungguhan (bootstrap yang sama dengan ``streamlit run``)
+jalan di proses ini; setiap sesi simulasi adalah koneksi websocket sendiri,
+seperti satu tab browser. Aplikasi memakai jalur produksi: client per sesi
+dari ``supabase_client`` (transport httpx & pool koneksi bersama) dan
+executor ``data_access.load_concurrently``, ke ``benchmarks.fake_server``
+(PostgREST/GoTrue tiruan lewat HTTP di atas ``FakeSupabase``).
+
+Skenario per sesi: login lewat ``app.py``, buka dashboard, ganti tampilan ke
+data kolaborator lalu gabungan, tambah transaksi, kembali ke dashboard.
+Dilaporkan per tingkat konkurensi: p50/p95/p99 latensi rerun, throughput,
+RSS per sesi, dan waktu tunggu di executor, pool HTTP, dan lock database.
+Waktu tunggu executor & pool diukur oleh ``TimedExecutor``/``TimedTransport``
+yang dipasang load test ke modul aplikasi (``instrument_app``).
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --sessions 1 10 50 --rows 10000 --latency-ms 20 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+from streamlit.proto.Alert_pb2 import Alert  # noqa: E402
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from streamlit.proto.WidgetStates_pb2 import WidgetState  # noqa: E402
+from streamlit.web import bootstrap  # noqa: E402
+from websockets.asyncio.client import connect  # noqa: E402
+
+from benchmarks.fake_server import ANON_KEY, FakeServer  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.seed import _id, _ts, seed  # noqa: E402
+
+# Modul aplikasi (access, data_access, supabase_client) baru di-import
+# setelah SUPABASE_URL diarahkan ke server tiruan, lihat main().
+
+DEFAULT_SESSIONS = [1, 5, 10, 25]
+DASHBOARD = "Dashboard"
+TRANSAKSI = "Transaksi"
+MAX_MESSAGE_SIZE = 200 * 2**20  # = server.maxMessageSize bawaan Streamlit
+FINISHED = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR)
+
+
+def rss_mb():
+    # RSS proses saat ini (Linux); selain itu puncak RSS dari getrusage
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class WaitStats:
+    # Waktu tunggu kumulatif (jumlah, total, maksimum), aman antar-thread
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count, self.total, self.max, self.expired = 0, 0.0, 0.0, 0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def record_expired(self):
+        with self._lock:
+            self.expired += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"count": self.count, "total": self.total, "max": self.max, "expired": self.expired}
+
+
+executor_waits = WaitStats()
+pool_waits = WaitStats()
+
+
+class TimedExecutor(ThreadPoolExecutor):
+    # Pengganti data_access._executor: catat waktu antre job (submit -> mulai
+    # jalan) dan job yang dibatalkan load_concurrently karena kelamaan antre
+    def submit(self, fn, /, *args, **kwargs):
+        submitted = time.perf_counter()
+
+        def timed():
+            executor_waits.record(time.perf_counter() - submitted)
+            return fn(*args, **kwargs)
+
+        future = super().submit(timed)
+        future.add_done_callback(lambda f: f.cancelled() and executor_waits.record_expired())
+        return future
+
+
+class TimedTransport(httpx.HTTPTransport):
+    # Pengganti transport bersama supabase_client. Event trace pertama dari
+    # httpcore muncul saat request sudah dapat koneksi (connect baru atau
+    # kirim header di koneksi keep-alive); selisihnya dengan awal request =
+    # waktu antre di pool
+    def handle_request(self, request):
+        start = time.perf_counter()
+        acquired = []
+        outer = request.extensions.get("trace")
+
+        def trace(event, info):
+            if not acquired:
+                acquired.append(time.perf_counter())
+            if outer is not None:
+                outer(event, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return super().handle_request(request)
+        finally:
+            pool_waits.record((acquired[0] if acquired else time.perf_counter()) - start)
+
+
+def instrument_app():
+    # Pasang executor & transport berinstrumen ke modul aplikasi sebelum
+    # server jalan; kode produksi sendiri tidak mengukur apa-apa
+    import data_access
+    import supabase_client
+
+    data_access._executor.shutdown(wait=False)
+    data_access._executor = TimedExecutor(max_workers=data_access.MAX_WORKERS,
+                                          thread_name_prefix="finapp-db")
+    transport = TimedTransport(limits=supabase_client.POOL_LIMITS, http2=supabase_client.HTTP2)
+    supabase_client._shared_transport = lambda: transport
+
+
+def percentile(values, q):
+    # Nearest-rank, cukup untuk ratusan sampai ribuan sampel
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def seed_users(client, n_users, rows):
+    # Satu user per sesi; user i melihat data user i+1 (kolaborasi accepted),
+    # jadi setiap sesi punya tampilan kolaborator & gabungan
+    users = [seed(client, rows, email=f"load{i + 1}@example.com", collaborators=0, seed_value=i)
+             for i in range(n_users)]
+    partners = users[1:] + users[:1] if n_users > 1 else [None]
+    if n_users > 1:
+        created = _ts(datetime.now(timezone.utc))
+        client.executemany(
+            "insert into collaborations (id, owner_id, collab_id, owner_email, requester_email, status, created_at)"
+            " values (?, ?, ?, ?, ?, 'accepted', ?)",
+            [(_id(), owner.id, user.id, owner.email, user.email, created) for user, owner in zip(users, partners)],
+        )
+    return list(zip(users, partners))
+
+
+class Session:
+    # Satu tab browser: satu websocket ke /_stcore/stream = satu sesi
+    # Streamlit. Widget diisi lewat BackMsg rerun_script seperti frontend.
+    def __init__(self, ws_url, user, partner, timeout):
+        self.ws_url = ws_url
+        self.user = user
+        self.partner = partner
+        self.timeout = timeout
+        self.latencies = []
+        self.errors = []
+        self.ws = None
+        self.pages = {}  # url_pathname -> page_script_hash
+        self.page_hash = ""
+        self.widgets = {}  # label -> proto widget di run terakhir
+        self.states = {}  # id widget -> WidgetState yang sudah diisi di halaman ini
+
+    async def _run(self, step, triggers=(), page_hash=None):
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_hash if page_hash is None else page_hash
+        msg.rerun_script.widget_states.widgets.extend(list(self.states.values()) + list(triggers))
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        # st.rerun()/st.switch_page() = FINISHED_EARLY_FOR_RERUN lalu run
+        # baru; langkah selesai saat run terakhir selesai
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), self.timeout)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                if fwd.new_session.page_script_hash != self.page_hash:
+                    self.page_hash = fwd.new_session.page_script_hash
+                    self.states.clear()
+                self.widgets = {}
+            elif kind == "navigation":
+                self.pages = {p.url_pathname: p.page_script_hash for p in fwd.navigation.app_pages}
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self._element(step, fwd.delta.new_element)
+            elif kind == "script_finished" and fwd.script_finished in FINISHED:
+                break
+        self.latencies.append((step, time.perf_counter() - start))
+
+    def _element(self, step, element):
+        kind = element.WhichOneof("type")
+        proto = getattr(element, kind)
+        if kind == "exception":
+            self.errors.append(f"{step}: {proto.message}")
+        elif kind == "alert" and (proto.format == Alert.ERROR or "Gagal" in proto.body):
+            self.errors.append(f"{step}: {proto.body}")
+        elif "id" in proto.DESCRIPTOR.fields_by_name and "label" in proto.DESCRIPTOR.fields_by_name:
+            self.widgets.setdefault(proto.label, proto)
+
+    def _set(self, label, **value):
+        state = WidgetState(id=self.widgets[label].id, **value)
+        self.states[state.id] = state
+
+    def _option(self, label, index):
+        return self.widgets[label].options[index]
+
+    def _click(self, label):
+        return WidgetState(id=self.widgets[label].id, trigger_value=True)
+
+    async def login(self):
+        self.ws = await connect(self.ws_url, subprotocols=["streamlit"], max_size=MAX_MESSAGE_SIZE)
+        await self._run("app.py")
+        self._set("Email", string_value=self.user.email)
+        self._set("Password", string_value="password")
+        await self._run("login", [self._click("Login")])
+
+    async def open(self, page):
+        self.states.clear()
+        await self._run(page, page_hash=self.pages[page])
+
+    async def view(self, index, step):
+        label = "🔄 Pilih data yang ingin dilihat"
+        self._set(label, string_value=self._option(label, index))
+        await self._run(step)
+
+    async def add_transaction(self, n):
+        self._set("Jenis Transaksi", string_value=self._option("Jenis Transaksi", 2))
+        await self._run("select_type")
+        self._set("Pilih Kategori", string_value=self._option("Pilih Kategori", 1))
+        self._set("Jumlah", double_value=1000.0 + n)
+        self._set("Deskripsi", string_value=f"load test {n}")
+        await self._run("add_transaction", [self._click("Tambah Transaksi")])
+
+    async def scenario(self, iterations):
+        try:
+            await self.login()
+            for n in range(iterations):
+                await self.open(DASHBOARD)
+                if self.partner is not None:
+                    await self.view(1, "view:partner")
+                    await self.view(-1, "view:all")
+                    await self.view(0, "view:me")
+                await self.open(TRANSAKSI)
+                await self.add_transaction(n)
+                await self.open(DASHBOARD)
+        except Exception as e:  # satu sesi gagal tidak menghentikan yang lain
+            self.errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            if self.ws is not None:
+                await self.ws.close()
+
+
+async def run_level(fake, ws_url, accounts, n_sessions, iterations, timeout):
+    import access
+    import data_access
+
+    # Cache proses dikosongkan supaya setiap tingkat mulai dari kondisi dingin
+    data_access.clear_cache()
+    access.clear()
+    sessions = [Session(ws_url, user, partner, timeout)
+                for user, partner in (accounts[i % len(accounts)] for i in range(n_sessions))]
+    rss_before = rss_mb()
+    fake.reset_stats()
+    executor_waits.reset()
+    pool_waits.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(s.scenario(iterations) for s in sessions))
+    wall = time.perf_counter() - start
+    db, executor, pool = fake.snapshot_stats(), executor_waits.snapshot(), pool_waits.snapshot()
+    rss_after = rss_mb()
+
+    latencies = [seconds for s in sessions for _, seconds in s.latencies]
+    by_step = {}
+    for s in sessions:
+        for step, seconds in s.latencies:
+            by_step.setdefault(step, []).append(seconds)
+    queries, lock_wait = db["queries"], db["lock_wait"]
+    jobs, requests = executor["count"], pool["count"]
+    errors = [e for s in sessions for e in s.errors]
+    # `sessions` tetap hidup sampai RSS sesudah diukur
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "wall_s": wall,
+        "reruns_per_s": len(latencies) / wall if wall else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "steps_p95_ms": {step: _ms(percentile(v, 95)) for step, v in sorted(by_step.items())},
+        "queries": queries,
+        "queries_per_rerun": queries / len(latencies) if latencies else None,
+        # antre executor load_concurrently (submit -> mulai jalan)
+        "executor_jobs": jobs,
+        "executor_wait_ms_per_job": executor["total"] / jobs * 1000 if jobs else None,
+        "executor_wait_max_ms": _ms(executor["max"]),
+        "executor_expired": executor["expired"],
+        # antre pool koneksi httpx bersama (request -> dapat koneksi)
+        "http_requests": requests,
+        "pool_wait_ms_per_request": pool["total"] / requests * 1000 if requests else None,
+        "pool_wait_max_ms": _ms(pool["max"]),
+        # lock database tiruan (satu lock seperti satu database)
+        "lock_wait_s": lock_wait,
+        "lock_wait_ms_per_query": lock_wait / queries * 1000 if queries else None,
+        "rss_mb": rss_after,
+        "rss_per_session_mb": (rss_after - rss_before) / n_sessions,
+        "errors": errors[:5],
+        "n_errors": len(errors),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+HEADER = (f"{'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'q/run':>6} {'exec ms':>8} {'pool ms':>8} {'lock ms':>8} {'RSS MB':>8} {'MB/sesi':>8} {'errors':>6}")
+
+
+def format_row(r):
+    def num(v, fmt):
+        return "-" if v is None else format(v, fmt)
+
+    return (f"{r['sessions']:>8} {r['reruns']:>7} {num(r['reruns_per_s'], '8.1f')} "
+            f"{num(r['p50_ms'], '8.1f')} {num(r['p95_ms'], '8.1f')} {num(r['p99_ms'], '8.1f')} "
+            f"{num(r['queries_per_rerun'], '6.1f')} {num(r['executor_wait_ms_per_job'], '8.2f')} "
+            f"{num(r['pool_wait_ms_per_request'], '8.2f')} {num(r['lock_wait_ms_per_query'], '8.2f')} "
+            f"{r['rss_mb']:>8.0f} {r['rss_per_session_mb']:>8.1f} {r['n_errors']:>6}")
+
+
+async def wait_healthy(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while True:
+            try:
+                if (await http.get(f"{base_url}/_stcore/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError("server Streamlit tidak siap")
+            await asyncio.sleep(0.2)
+
+
+async def drive(args, fake, accounts, port):
+    await wait_healthy(f"http://127.0.0.1:{port}")
+    ws_url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    # Pemanasan (import, kompilasi script) supaya tidak terhitung sebagai
+    # latensi / RSS tingkat pertama
+    await run_level(fake, ws_url, accounts, 1, 1, args.timeout)
+
+    print(HEADER)
+    results = []
+    for n in args.sessions:
+        r = await run_level(fake, ws_url, accounts, n, args.iterations, args.timeout)
+        results.append(r)
+        print(format_row(r), flush=True)
+        print(f"{'':>8} executor: {r['executor_jobs']} job, maks antre {r['executor_wait_max_ms']:.1f} ms, "
+              f"{r['executor_expired']} kedaluwarsa; pool HTTP: {r['http_requests']} request, "
+              f"maks antre {r['pool_wait_max_ms']:.1f} ms")
+        if args.steps:
+            for step, p95 in r["steps_p95_ms"].items():
+                print(f"{'':>8} {step:<26} p95 {p95:8.1f} ms")
+        for e in r["errors"]:
+            print(f"{'':>8} ! {e}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS,
+                        help="tingkat konkurensi (jumlah sesi bersamaan)")
+    parser.add_argument("--rows", type=int, default=1_000, help="transaksi per user")
+    parser.add_argument("--iterations", type=int, default=3, help="putaran skenario per sesi")
+    parser.add_argument("--timeout", type=float, default=600, help="batas detik per langkah")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latensi simulasi per request")
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    parser.add_argument("--steps", action="store_true", help="tampilkan p95 per langkah skenario")
+    args = parser.parse_args(argv)
+
+    fake = FakeSupabase(latency=args.latency_ms / 1000)
+    accounts = seed_users(fake, max(args.sessions), args.rows)
+    server = FakeServer(fake).start()
+    os.environ["SUPABASE_URL"] = server.url
+    os.environ["SUPABASE_KEY"] = ANON_KEY
+    import supabase_client
+
+    fake.max_rows = supabase_client.MAX_ROWS
+    instrument_app()
+
+    # Driver jalan di thread sendiri; thread utama menjalankan server
+    # Streamlit sampai driver selesai lalu mengirim SIGTERM ke proses ini
+    port = _free_port()
+    failed = []
+
+    def run_driver():
+        try:
+            asyncio.run(drive(args, fake, accounts, port))
+        except Exception:
+            traceback.print_exc()
+            failed.append(True)
+        finally:
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=run_driver, name="load-test-driver", daemon=True).start()
+    bootstrap.load_config_options({
+        "server_port": port,
+        "server_address": "127.0.0.1",
+        "server_headless": True,
+        "server_fileWatcherType": "none",
+        "server_runOnSave": False,
+        "browser_gatherUsageStats": False,
+    })
+    bootstrap.run(os.path.join(ROOT, "app.py"), False, [], {})
+    server.stop()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+# =========================
+# DATA SINTETIS UNTUK BENCHMARK
+# =========================
+WALLETS = ["Kas", "BCA", "Mandiri", "GoPay", "OVO"]
+CATEGORIES = {
+    "pemasukan": ["Gaji", "Bonus", "Investasi"],
+    "pengeluaran": ["Makan", "Transport", "Belanja", "Tagihan", "Hiburan", "Kesehatan", "Pendidikan"],
+}
+DESCRIPTIONS = ["makan siang", "bensin", "listrik PLN", "gaji bulanan", "belanja bulanan",
+                "grab", "kopi", "pulsa", "nonton", "apotek", "SPP", "dividen"]
+DEBT_NAMES = ["Andi", "Budi", "Citra", "Dewi", "Eko", "Fajar", "Gita", "Hadi"]
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+00:00"
+
+
+def _id():
+    return uuid.uuid4().hex
+
+
+def seed(client, n_transactions, email="bench@example.com", years=10, collaborators=1, seed_value=42):
+    # Isi fake client dengan satu user utama (+ kolaborator) dan
+    # n_transactions transaksi tersebar `years` tahun ke belakang.
+    rng = random.Random(seed_value)
+    user = client.add_user(email)
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    start = today - timedelta(days=365 * years)
+    span = (today - start).days
+
+    owners = [user]
+    for i in range(collaborators):
+        other = client.add_user(f"partner{i + 1}@example.com")
+        owners.append(other)
+        client.executemany(
+            "insert into collaborations (id, owner_id, collab_id, owner_email, requester_email, status, created_at)"
+            " values (?, ?, ?, ?, ?, 'accepted', ?)",
+            [(_id(), other.id, user.id, other.email, user.email, _ts(now))],
+        )
+
+    for owner in owners:
+        share = n_transactions if owner is user else max(1, n_transactions // 10)
+        wallet_ids = [_id() for _ in WALLETS]
+        client.executemany(
+            "insert into wallets (id, user_id, name, balance, created_at, updated_at) values (?, ?, ?, 0, ?, ?)",
+            [(wid, owner.id, name, _ts(now), _ts(now)) for wid, name in zip(wallet_ids, WALLETS)],
+        )
+        categories = [(_id(), name, jenis) for jenis, names in CATEGORIES.items() for name in names]
+        client.executemany(
+            "insert into categories (id, user_id, name, type, created_at) values (?, ?, ?, ?, ?)",
+            [(cid, owner.id, name, jenis, _ts(now)) for cid, name, jenis in categories],
+        )
+
+        def transactions():
+            for i in range(share):
+                cid, _, jenis = categories[rng.randrange(len(categories))]
+                day = start + timedelta(days=rng.randrange(span + 1))
+                created = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(seconds=rng.randrange(86400))
+                amount = rng.randrange(10, 5_000) * 1000 if jenis == "pemasukan" else rng.randrange(1, 1_000) * 1000
+                yield (_id(), owner.id, wallet_ids[rng.randrange(len(wallet_ids))], cid, amount, jenis,
+                       rng.choice(DESCRIPTIONS), day.isoformat(), _ts(created), _ts(now))
+
+        client.bulk_insert_transactions(
+            "insert into transactions (id, user_id, wallet_id, category_id, amount, type, description, date,"
+            " created_at, updated_at) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            transactions(),
+        )
+        # Saldo dompet konsisten dengan transaksi
+        client.executemany(
+            "update wallets set balance = (select coalesce(sum(case when t.type = 'pemasukan'"
+            " then t.amount else -t.amount end), 0) from transactions t where t.wallet_id = wallets.id)"
+            " where user_id = ?",
+            [(owner.id,)],
+        )
+
+        n_debts = max(10, share // 100)
+        client.executemany(
+            "insert into debts (id, user_id, name, amount, type, description, due_date, status, created_at, updated_at)"
+            " values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(_id(), owner.id, rng.choice(DEBT_NAMES), rng.randrange(1, 500) * 10_000,
+              rng.choice(["utang", "piutang"]), "", (start + timedelta(days=rng.randrange(span + 365))).isoformat(),
+              rng.choice(["lunas", "belum lunas"]), _ts(now), _ts(now)) for _ in range(n_debts)],
+        )
+    return user
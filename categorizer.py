@@ -0,0 +1,209 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# =========================
+# KATEGORI OTOMATIS DARI DESKRIPSI
+# =========================
+# Aturan user (kata kunci / regex -> kategori) diurutkan menurut prioritas
+# (tertinggi dulu) lalu digabung per jenis transaksi jadi:
+# - satu automaton Aho-Corasick untuk semua kata kunci. Semua deskripsi
+#   unik dipindai bersamaan, satu byte UTF-8 per langkah, dengan numpy:
+#   biayanya sebanding panjang deskripsi, bukan banyaknya aturan;
+# - satu regex gabungan (?P<r0>pola0)|(?P<r1>pola1)|... untuk aturan regex.
+#   Deskripsi disaring dulu secara vektor dengan RE2 (pyarrow); regex
+#   gabungan hanya dijalankan untuk yang lolos saringan dan hasilnya masih
+#   bisa dikalahkan aturan regex berprioritas lebih tinggi.
+# Yang menang adalah aturan berprioritas tertinggi yang cocok di mana pun
+# dalam deskripsi (sama dengan RPC apply_category_rules). Deskripsi yang
+# sama hanya dicocokkan sekali.
+KINDS = {"keyword": "Kata kunci", "regex": "Regex"}
+MAX_PATTERN_LENGTH = 200  # sama dengan check di tabel category_rules
+PYTHON_ONLY_ESCAPES = "bB"  # di PostgreSQL: \b = backspace, \B = backslash
+
+
+def validate(kind, pattern):
+    # Mengembalikan pola yang sudah dirapikan, ValueError kalau tidak valid
+    pattern = pattern.strip()
+    if kind not in KINDS:
+        raise ValueError(f"Jenis aturan tidak dikenal: {kind}")
+    if not pattern:
+        raise ValueError("Pola tidak boleh kosong.")
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"Pola maksimal {MAX_PATTERN_LENGTH} karakter.")
+    if kind == "regex":
+        if "(?P" in pattern:
+            raise ValueError("Regex tidak boleh memakai grup bernama (?P...).")
+        # Escape khusus Python yang artinya lain di regex PostgreSQL
+        # (mis. \b di PostgreSQL = backspace), jadi hasil di aplikasi & di
+        # "Terapkan ke transaksi lama" bisa beda
+        for m in re.finditer(r"\\(.)", pattern):
+            if m.group(1) in PYTHON_ONLY_ESCAPES:
+                raise ValueError(
+                    f"Regex tidak boleh memakai \\{m.group(1)} (tidak sama di PostgreSQL). "
+                    "Pakai ^ / $ untuk awal/akhir teks, atau (^|\\W)kata(\\W|$) untuk batas kata."
+                )
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Regex tidak valid: {e}")
+    return pattern
+
+
+NO_MATCH = np.iinfo(np.int32).max
+SCAN_BATCH = 65_536  # deskripsi per pemindaian automaton (batas memori matriks byte)
+
+
+def _automaton(keywords):
+    # keywords: [(kata kunci, indeks prioritas)] -> (goto, best), atas byte UTF-8
+    # huruf kecil. goto[state * 256 + byte]: transisi DFA (failure link sudah
+    # dilipat); best[state]: indeks prioritas terkecil yang cocok di state itu.
+    goto = [[0] * 256]
+    best = [NO_MATCH]
+    for text, index in keywords:
+        state = 0
+        for byte in text.lower().encode():
+            if goto[state][byte] == 0:
+                goto.append([0] * 256)
+                best.append(NO_MATCH)
+                goto[state][byte] = len(goto) - 1
+            state = goto[state][byte]
+        best[state] = min(best[state], index)
+
+    # BFS dari root: failure link, output diwariskan, transisi yang hilang diisi
+    fail = [0] * len(goto)
+    queue = deque(s for s in goto[0] if s)
+    while queue:
+        state = queue.popleft()
+        best[state] = min(best[state], best[fail[state]])
+        for byte in range(256):
+            child = goto[state][byte]
+            if child:
+                fail[child] = goto[fail[state]][byte] if state else 0
+                queue.append(child)
+            else:
+                goto[state][byte] = goto[fail[state]][byte]
+    return np.array(goto, dtype=np.int32).ravel(), np.array(best, dtype=np.int32)
+
+
+def _byte_columns(texts):
+    # Teks (pyarrow string) -> matriks byte UTF-8 (panjang maks, n): baris k =
+    # byte ke-k tiap teks. ascii_rpad menghitung byte, jadi semua teks jadi
+    # sama panjang (diisi \0, byte yang tidak ada di kata kunci mana pun).
+    width = int(pc.max(pc.binary_length(texts)).as_py() or 0)
+    if width == 0:
+        return np.zeros((0, len(texts)), dtype=np.uint8)
+    padded = pc.ascii_rpad(texts, width, "\0")
+    start = np.frombuffer(padded.buffers()[1], dtype=np.int64)[padded.offset]
+    data = np.frombuffer(padded.buffers()[2], dtype=np.uint8)[start:start + width * len(texts)]
+    return np.ascontiguousarray(data.reshape(len(texts), width).T)
+
+
+def _scan(automaton, texts):
+    # Indeks prioritas kata kunci terbaik per teks (NO_MATCH kalau tidak ada).
+    # Semua teks dijalankan bersamaan: satu langkah = satu byte tiap teks.
+    goto, best = automaton
+    texts = pc.utf8_lower(texts)
+    out = np.full(len(texts), NO_MATCH, dtype=np.int32)
+    for start in range(0, len(texts), SCAN_BATCH):
+        state = np.zeros(min(SCAN_BATCH, len(texts) - start), dtype=np.int32)
+        found = out[start:start + len(state)]
+        for column in _byte_columns(texts.slice(start, len(state))):
+            np.take(goto, state * 256 + column, out=state)
+            np.minimum(found, best.take(state), out=found)
+    return out
+
+
+def _re2(patterns):
+    # Regex gabungan dalam dialek RE2 (pyarrow) untuk saringan vektor; None
+    # kalau ada sintaks yang tidak didukung RE2 (lookaround, backreference, ...)
+    pattern = "(?s)" + "|".join(f"(?:{p})" for p in patterns)
+    try:
+        pc.match_substring_regex(pa.array([""]), pattern, ignore_case=True)
+    except pa.ArrowInvalid:
+        return None
+    return pattern
+
+
+def _regex_candidates(texts, prefilter):
+    # Teks yang mungkin cocok dengan salah satu aturan regex. Saringan RE2
+    # hanya dipercaya untuk teks ASCII tercetak: di situ \w, \d, \s, $ dan
+    # huruf besar/kecil sama artinya di RE2 dan modul re.
+    if prefilter is None:
+        return np.ones(len(texts), dtype=bool)
+    plain = pc.match_substring_regex(texts, r"^[ -~]*$")
+    hit = pc.match_substring_regex(texts, prefilter, ignore_case=True)
+    return pc.or_(pc.invert(plain), hit).to_numpy(zero_copy_only=False)
+
+
+def _best_regex(regex, text, first):
+    # Indeks aturan regex terbaik yang cocok di text, NO_MATCH kalau tidak ada.
+    # Pencarian lanjut dari posisi berikutnya (bukan akhir match) supaya
+    # match yang tumpang tindih tidak terlewat; berhenti di indeks `first`.
+    found = NO_MATCH
+    m = regex.search(text)
+    while m:
+        found = min(found, int(m.lastgroup[1:]))
+        if found == first:
+            break
+        m = regex.search(text, m.start() + 1)
+    return found
+
+
+@lru_cache(maxsize=64)
+def _compile(rules):
+    # rules: tuple (kind, pattern, category_id, jenis) urut prioritas
+    by_type = {}
+    for kind, pattern, category_id, type in rules:
+        by_type.setdefault(type, []).append((kind, pattern, category_id))
+    matcher = {}
+    for type, items in by_type.items():
+        keywords = [(pattern, i) for i, (kind, pattern, _) in enumerate(items) if kind == "keyword"]
+        regexes = [(pattern, i) for i, (kind, pattern, _) in enumerate(items) if kind != "keyword"]
+        automaton = _automaton(keywords) if keywords else None
+        regex = None
+        if regexes:
+            regex = (re.compile("|".join(f"(?P<r{i}>{pattern})" for pattern, i in regexes),
+                                re.IGNORECASE | re.DOTALL),
+                     _re2([pattern for pattern, _ in regexes]), regexes[0][1])
+        matcher[type] = (automaton, regex, [category_id for _, _, category_id in items])
+    return matcher
+
+
+def compile_rules(rules_df, categories_df):
+    # {jenis: (automaton kata kunci, (regex gabungan, saringan RE2, indeks
+    # regex pertama), category_id per indeks prioritas)}; aturan yang kategorinya sudah tidak
+    # ada dilewati
+    if rules_df.empty or categories_df.empty:
+        return {}
+    types = dict(zip(categories_df["id"], categories_df["type"].astype(str)))
+    df = rules_df.assign(category_type=rules_df["category_id"].map(types)) \
+        .dropna(subset=["category_type"]) \
+        .sort_values(["priority", "id"], ascending=[False, True])
+    return _compile(tuple(df[["kind", "pattern", "category_id", "category_type"]].itertuples(index=False, name=None)))
+
+
+def categorize(matcher, descriptions, types):
+    # category_id per baris, None kalau tidak ada aturan yang cocok
+    descriptions = pd.Series(descriptions).fillna("").astype(str)
+    types = pd.Series(types, index=descriptions.index).astype(str)
+    out = np.full(len(descriptions), None, dtype=object)
+    for type, (automaton, regexes, targets) in matcher.items():
+        mask = (types == type).to_numpy()
+        if not mask.any():
+            continue
+        codes, uniques = pd.factorize(descriptions[mask])
+        texts = pa.array(uniques, type=pa.large_string())
+        found = _scan(automaton, texts) if automaton else np.full(len(texts), NO_MATCH, dtype=np.int32)
+        if regexes:
+            regex, prefilter, first = regexes
+            for i in np.flatnonzero((found > first) & _regex_candidates(texts, prefilter)):
+                found[i] = min(found[i], _best_regex(regex, texts[i].as_py(), first))
+        labels = np.array(targets + [None], dtype=object)
+        out[mask] = labels[np.minimum(found, len(targets))].take(codes)
+    return pd.Series(out, index=descriptions.index, dtype=object)
@@ -0,0 +1,618 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import money
+import offline
+import schema
+import sync_store
+from supabase_client import MAX_ROWS, supabase, get_client
+
+# =========================
+# CACHE
+# =========================
+# Cache in-process yang dipakai bersama oleh semua sesi Streamlit.
+# Kunci: (tabel, user_id, query, pembaca). Setiap write menghapus entri
+# untuk (tabel, user_id) yang terkena saja, jadi rerun karena widget tidak
+# perlu ke Supabase lagi.
+# Hasil query tergantung RLS si pembaca: bacaan data sendiri (pembaca =
+# None) dipakai bersama, bacaan akun lain (kolaborator, tampilan gabungan)
+# dicache per pembaca. Tanpa itu hasil kosong milik kolaborator yang
+# aksesnya sudah dicabut bisa tersaji ke sesi pemilik akun.
+CACHE_TTL = 300  # detik
+CACHE_MAXSIZE = 256
+
+_cache = OrderedDict()
+_generations = {}
+_lock = threading.Lock()
+
+
+def _reader(user_id):
+    user = st.session_state.get("user")
+    requester = getattr(user, "id", None)
+    if requester is not None and requester == user_id:
+        return None
+    return requester or "anon"
+
+
+def _cached(table, user_id, query_key, loader):
+    key = (table, user_id, query_key, _reader(user_id))
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and now - entry[0] < CACHE_TTL:
+            _cache.move_to_end(key)
+            return entry[1].copy()
+        generation = _generations.get(table, 0)
+
+    df = loader()
+
+    with _lock:
+        # Jangan simpan hasil kalau ada write di tengah-tengah load
+        if _generations.get(table, 0) == generation:
+            _cache[key] = (now, df)
+            _cache.move_to_end(key)
+            while len(_cache) > CACHE_MAXSIZE:
+                _cache.popitem(last=False)
+    return df.copy()
+
+
+def invalidate(table, user_id=None):
+    # user_id=None -> hapus entri tabel ini untuk semua user
+    # Entri gabungan beberapa akun (user_id berupa tuple) ikut terhapus
+    with _lock:
+        for key in [k for k in _cache if k[0] == table and (
+                user_id is None or k[1] == user_id or (isinstance(k[1], tuple) and user_id in k[1]))]:
+            del _cache[key]
+        _generations[table] = _generations.get(table, 0) + 1
+
+
+# Mirror offline yang ditarik ulang dari server ikut menghapus cache
+offline.add_listener(invalidate)
+
+
+def _patch_cached(table, user_id, patch):
+    # Seperti invalidate(table, user_id), tapi entri milik user ini
+    # diperbarui di tempat: patch(query_key, df) -> df baru, atau None
+    # untuk dihapus. Mengembalikan generation (sebelum, sesudah).
+    with _lock:
+        for key in [k for k in _cache if k[0] == table and (
+                k[1] == user_id or (isinstance(k[1], tuple) and user_id in k[1]))]:
+            # Entri pembaca lain dihapus saja: isinya tergantung RLS pembaca itu
+            df = patch(key[2], _cache[key][1]) if key[1] == user_id and key[3] is None else None
+            if df is None:
+                del _cache[key]
+            else:
+                _cache[key] = (_cache[key][0], df)
+        before = _generations.get(table, 0)
+        _generations[table] = before + 1
+    return before, before + 1
+
+
+def generation(table):
+    return _generations.get(table, 0)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        for table in _generations:
+            _generations[table] += 1
+
+
+def _frame(table, res, view=None):
+    return schema.to_frame(table, res.data, view)
+
+
+def month_bounds(year, month):
+    # [awal bulan, awal bulan berikutnya)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+# =========================
+# FAN-OUT PARALEL
+# =========================
+QUERY_TIMEOUT = 10  # detik per query, dihitung sejak query mulai jalan
+QUEUE_TIMEOUT = 30  # detik maksimal menunggu worker kosong
+MAX_WORKERS = 8
+_POLL = 0.25
+
+# Pool dipakai bersama semua sesi; saat ramai job bisa antre, jadi waktu
+# antre tidak dihitung sebagai timeout query.
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="finapp-db")
+
+
+def load_concurrently(jobs, timeout=QUERY_TIMEOUT):
+    # jobs: {nama: fungsi tanpa argumen}. Semua dijalankan bersamaan.
+    # Mengembalikan (hasil, error) per nama; query yang gagal, lewat
+    # timeout, atau tidak sempat jalan hanya muncul di `error`, sisanya
+    # tetap bisa dirender.
+    ctx = get_script_run_ctx()
+    get_client()  # buat client sesi di thread utama, bukan berebut di worker
+    started = {}
+
+    def run(name, fn):
+        started[name] = time.monotonic()
+        # Worker butuh ScriptRunContext untuk st.session_state
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+
+    submitted = time.monotonic()
+    futures = {name: _executor.submit(run, name, fn) for name, fn in jobs.items()}
+    results, errors = {}, {}
+    pending = dict(futures)
+    while pending:
+        wait(pending.values(), timeout=_POLL, return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for name, future in list(pending.items()):
+            if future.done():
+                del pending[name]
+                if future.cancelled():
+                    continue
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = str(e) or type(e).__name__
+            elif name in started:
+                if now - started[name] >= timeout:
+                    del pending[name]
+                    errors[name] = f"timeout setelah {timeout} detik"
+            elif now - submitted >= QUEUE_TIMEOUT and future.cancel():
+                del pending[name]
+                errors[name] = f"server sibuk, query tidak sempat jalan dalam {QUEUE_TIMEOUT} detik"
+    return results, errors
+
+
+# =========================
+# READ
+# =========================
+# wallets, transactions, debts dibaca dari snapshot delta-sync per sesi.
+# Di mode offline wallets, categories, transactions dari mirror SQLite.
+def get_wallets(user_id):
+    if offline.enabled():
+        return offline.frame("wallets", user_id, get_client())
+    return sync_store.get("wallets", user_id, generation("wallets"))
+
+
+def get_categories(user_id):
+    if offline.enabled():
+        return offline.frame("categories", user_id, get_client())
+    return _cached("categories", user_id, "all", lambda: _frame(
+        "categories",
+        supabase.table("categories").select(schema.columns("categories")).eq("user_id", user_id).execute()
+    ))
+
+
+def get_transactions(user_id, start=None, end=None, type=None, wallet_id=None, category_id=None):
+    # start inklusif, end eksklusif
+    if offline.enabled():
+        df = offline.frame("transactions", user_id, get_client())
+    else:
+        df = sync_store.get("transactions", user_id, generation("transactions"))
+    if df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    if start:
+        mask &= df["date"] >= pd.Timestamp(start)
+    if end:
+        mask &= df["date"] < pd.Timestamp(end)
+    if type:
+        mask &= df["type"] == type
+    if wallet_id:
+        mask &= df["wallet_id"] == wallet_id
+    if category_id:
+        mask &= df["category_id"] == category_id
+    return df[mask]
+
+
+def get_transactions_page(user_id, start=None, end=None, type=None, wallet_id=None, category_id=None,
+                          after=None, page_size=50):
+    # Keyset pagination urut (date, created_at, id) menurun.
+    # `after` = kursor (date, created_at, id) baris terakhir halaman sebelumnya.
+    # Mengembalikan (df, kursor_berikutnya atau None).
+    if offline.enabled():
+        return offline.page(get_transactions(user_id, start, end, type, wallet_id, category_id), after, page_size)
+
+    def load():
+        query = supabase.table("transactions").select(schema.columns("transactions")).eq("user_id", user_id)
+        if start:
+            query = query.gte("date", start.isoformat())
+        if end:
+            query = query.lt("date", end.isoformat())
+        if type:
+            query = query.eq("type", type)
+        if wallet_id:
+            query = query.eq("wallet_id", wallet_id)
+        if category_id:
+            query = query.eq("category_id", category_id)
+        if after:
+            query = query.or_(schema.keyset_after(TRANSACTION_KEYSET, after, desc=True))
+        res = query.order("date", desc=True) \
+            .order("created_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(page_size + 1) \
+            .execute()
+        rows = res.data or []
+        df = schema.to_frame("transactions", rows[:page_size])
+        # Kursor dari nilai mentah server supaya perbandingannya persis
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            df.attrs["next_cursor"] = (last["date"], last["created_at"], last["id"])
+        return df
+
+    key = ("page", start, end, type, wallet_id, category_id, after, page_size)
+    df = _cached("transactions", user_id, key, load)
+    return df, df.attrs.get("next_cursor")
+
+
+def get_monthly_summary(user_id, start, end, by_category=False):
+    # Total per bulan/jenis(/kategori) dari RPC monthly_summary
+    if offline.enabled():
+        return offline.summary(get_transactions(user_id, start, end), by_category)
+    return _cached("transactions", user_id, ("summary", start, end, by_category), lambda: _frame(
+        "monthly_summary",
+        supabase.rpc("monthly_summary", {
+            "p_user_id": user_id,
+            "p_start": start.isoformat(),
+            "p_end": end.isoformat(),
+            "p_by_category": by_category,
+        }).execute()
+    ))
+
+
+def get_transaction_series(user_id, start, end, bucket="month", group="type"):
+    # Total per bucket (day/week/month) x jenis x kategori/dompet dari RPC
+    # transaction_series; halaman Analitik tidak pernah menarik baris mentah.
+    # Hasil RPC juga kena max-rows, jadi dibaca per halaman (urutan hasil
+    # RPC tetap: bucket, jenis, kunci).
+    def load():
+        rows = []
+        while True:
+            page = supabase.rpc("transaction_series", {
+                "p_user_id": user_id,
+                "p_start": start.isoformat(),
+                "p_end": end.isoformat(),
+                "p_bucket": bucket,
+                "p_group": group,
+            }).range(len(rows), len(rows) + MAX_ROWS - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < MAX_ROWS:
+                return schema.to_frame("transaction_series", rows)
+
+    return _cached("transactions", user_id, ("series", start, end, bucket, group), load)
+
+
+def get_debts(user_id):
+    return sync_store.get("debts", user_id, generation("debts"))
+
+
+def get_category_rules(user_id):
+    # Aturan kategori otomatis, prioritas tertinggi dulu
+    return _cached("category_rules", user_id, "all", lambda: _frame(
+        "category_rules",
+        supabase.table("category_rules")
+        .select(schema.columns("category_rules"))
+        .eq("user_id", user_id)
+        .order("priority", desc=True)
+        .order("id")
+        .execute()
+    ))
+
+
+# =========================
+# PENCARIAN (trigram di server, lihat migrasi search)
+# =========================
+SEARCH_LIMIT = 50
+
+
+def search_transactions(user_id, query, limit=SEARCH_LIMIT):
+    # Deskripsi transaksi, urut skor kecocokan (1 = potongan teks persis)
+    query = query.strip()
+    return _cached("transactions", user_id, ("search", query.lower(), limit), lambda: _frame(
+        "transaction_search",
+        supabase.rpc("search_transactions", {"p_user_id": user_id, "p_query": query, "p_limit": limit}).execute()
+    ))
+
+
+def search_debts(user_id, query, limit=SEARCH_LIMIT):
+    # Nama & deskripsi utang/piutang, urut skor kecocokan
+    query = query.strip()
+    return _cached("debts", user_id, ("search", query.lower(), limit), lambda: _frame(
+        "debt_search",
+        supabase.rpc("search_debts", {"p_user_id": user_id, "p_query": query, "p_limit": limit}).execute()
+    ))
+
+
+# =========================
+# READ BEBERAPA AKUN SEKALIGUS
+# =========================
+# Satu query in_("user_id", [...]) per tabel untuk semua akun yang bisa
+# diakses; kolom user_id ikut sebagai penanda pemilik.
+def _owned_frame(table, res):
+    df = _frame(table, res)
+    if "user_id" not in df:
+        df.insert(0, "user_id", pd.Series(dtype="object"))
+    return df
+
+
+def get_for_users(table, user_ids):
+    ids = tuple(sorted(set(user_ids)))
+    return _cached(table, ids, "in", lambda: _owned_frame(
+        table,
+        supabase.table(table).select("user_id, " + schema.columns(table)).in_("user_id", list(ids)).execute()
+    ))
+
+
+def get_transactions_for_users(user_ids, start, end):
+    # start inklusif, end eksklusif
+    ids = tuple(sorted(set(user_ids)))
+    return _cached("transactions", ids, ("in", start, end), lambda: _owned_frame(
+        "transactions",
+        supabase.table("transactions")
+        .select("user_id, " + schema.columns("transactions"))
+        .in_("user_id", list(ids))
+        .gte("date", start.isoformat())
+        .lt("date", end.isoformat())
+        .order("date", desc=True)
+        .execute()
+    ))
+
+
+# =========================
+# UPDATE OPTIMISTIS
+# =========================
+# Baris yang dikembalikan server setelah write langsung diterapkan ke
+# cache & snapshot sesi, jadi rerun sesudah write tidak perlu mengambil
+# ulang tabelnya. Halaman keyset & ringkasan bulanan ikut dipatch; query
+# lain (series, pencarian, gabungan akun) dihapus seperti invalidate().
+# Snapshot sesi mengecek ulang baris ini ke server (sync_store._verify).
+TRANSACTION_KEYSET = ["date", "created_at", "id"]
+
+
+def _older_than(df, cursor):
+    # (date, created_at, id) < kursor
+    d, c, i = pd.Timestamp(cursor[0]), pd.Timestamp(cursor[1]), cursor[2]
+    same_date = df["date"] == d
+    return (df["date"] < d) | (same_date & (df["created_at"] < c)) | \
+        (same_date & (df["created_at"] == c) & (df["id"] < i))
+
+
+def _patch_page(df, key, upserted, deleted_ids):
+    _, start, end, type, wallet_id, category_id, after, page_size = key
+    mask = pd.Series(True, index=upserted.index)
+    if start:
+        mask &= upserted["date"] >= pd.Timestamp(start)
+    if end:
+        mask &= upserted["date"] < pd.Timestamp(end)
+    if type:
+        mask &= upserted["type"] == type
+    if wallet_id:
+        mask &= upserted["wallet_id"] == wallet_id
+    if category_id:
+        mask &= upserted["category_id"] == category_id
+    new = upserted[mask]
+    # Hanya baris di rentang halaman ini: sesudah `after`, sebelum kursor berikutnya
+    cursor = df.attrs.get("next_cursor")
+    if after and not new.empty:
+        new = new[_older_than(new, after)]
+    if cursor and not new.empty:
+        new = new[~_older_than(new, cursor)]
+
+    out = df[~df["id"].isin(set(deleted_ids) | set(upserted["id"]))]
+    if not new.empty:
+        out = pd.concat([out, new.reindex(columns=df.columns)], ignore_index=True) \
+            .sort_values(TRANSACTION_KEYSET, ascending=False, kind="stable")
+    out = out.reset_index(drop=True)
+    if len(out) > page_size:
+        out = out.head(page_size)
+        last = out.iloc[-1]
+        cursor = (last["date"].date().isoformat(), last["created_at"].isoformat(), last["id"])
+    if cursor:
+        out.attrs["next_cursor"] = cursor
+    return out
+
+
+def _patch_summary(df, key, changes):
+    # changes: baris transaksi dengan kolom sign (+1 insert, -1 delete)
+    _, start, end, by_category = key
+    changes = changes[(changes["date"] >= pd.Timestamp(start)) & (changes["date"] < pd.Timestamp(end))]
+    if changes.empty:
+        return df
+    keys = ["month", "type"] + (["category_id"] if by_category else [])
+    delta = changes.assign(
+        month=changes["date"].dt.to_period("M").dt.to_timestamp(),
+        total=changes["amount"] * changes["sign"],
+        n=changes["sign"],
+    )[keys + ["total", "n"]]
+    out = pd.concat([df[keys + ["total", "n"]], delta], ignore_index=True) \
+        .groupby(keys, observed=True, dropna=False)[["total", "n"]].sum() \
+        .reset_index()
+    out = out[out["n"] > 0]
+    if not by_category:
+        out["category_id"] = None
+    return out[df.columns].reset_index(drop=True)
+
+
+def _written(table, user_id, upserted=(), deleted=()):
+    # upserted/deleted: baris mentah dari respons server
+    upserted = schema.to_frame(table, list(upserted))
+    deleted = schema.to_frame(table, list(deleted))
+    deleted_ids = list(deleted["id"]) if "id" in deleted else []
+
+    if table == "transactions":
+        changes = pd.concat([upserted.assign(sign=1), deleted.assign(sign=-1)], ignore_index=True)
+
+        def patch(query_key, df):
+            if isinstance(query_key, tuple) and query_key[0] == "page":
+                return _patch_page(df, query_key, upserted, deleted_ids)
+            if isinstance(query_key, tuple) and query_key[0] == "summary":
+                return _patch_summary(df, query_key, changes)
+            return None
+    else:
+        def patch(query_key, df):
+            return sync_store.merge_rows(table, df, upserted, deleted_ids) if query_key == "all" else None
+
+    before, after = _patch_cached(table, user_id, patch)
+    sync_store.apply(table, user_id, upserted, deleted_ids, before, after)
+
+    if table == "transactions" and not changes.empty:
+        # Saldo dompet: + pemasukan / - pengeluaran, dibalik untuk yang dihapus
+        signed = changes["amount"].where(changes["type"] == "pemasukan", -changes["amount"]) * changes["sign"]
+        deltas = signed.groupby(changes["wallet_id"]).sum().to_dict()
+        before, after = _patch_cached("wallets", user_id, lambda query_key, df: None)
+        sync_store.adjust("wallets", user_id, "balance", deltas, before, after)
+
+
+# =========================
+# WRITE
+# =========================
+# `cascade` untuk tabel lain yang ikut berubah (mis. FK on delete cascade);
+# tabel itu di-invalidate biasa.
+# Di mode offline write tabel mirror hanya di-commit lokal + diantrekan.
+def insert(table, payload, user_id):
+    if offline.handles(table):
+        res = offline.insert(table, payload, user_id, get_client())
+        invalidate(table, user_id)
+        return res
+    res = supabase.table(table).insert(payload).execute()
+    _written(table, user_id, upserted=res.data or [])
+    return res
+
+
+def update(table, values, row_id, user_id):
+    return update_many(table, values, [row_id], user_id)
+
+
+def update_many(table, values, row_ids, user_id):
+    # Satu request untuk banyak baris (filter in_)
+    if not row_ids:
+        return None
+    if offline.handles(table):
+        res = offline.update(table, values, list(row_ids), user_id, get_client())
+        invalidate(table, user_id)
+        return res
+    res = supabase.table(table).update(values).in_("id", list(row_ids)).execute()
+    if table == "transactions":
+        # Saldo lama tidak diketahui di sini; ambil ulang lewat delta sync
+        invalidate(table, user_id)
+        invalidate("wallets", user_id)
+    else:
+        _written(table, user_id, upserted=res.data or [])
+    return res
+
+
+def delete(table, row_id, user_id, cascade=()):
+    if offline.handles(table):
+        res = offline.delete(table, row_id, user_id, get_client(), cascade)
+        invalidate(table, user_id)
+    else:
+        res = supabase.table(table).delete().eq("id", row_id).execute()
+        _written(table, user_id, deleted=res.data or [])
+    for other in cascade:
+        invalidate(other, user_id)
+    if "transactions" in cascade and table != "wallets":
+        # Transaksi yang ikut terhapus mengembalikan saldo dompetnya
+        invalidate("wallets", user_id)
+    return res
+
+
+# =========================
+# TRANSAKSI (atomik, satu round trip)
+# =========================
+def add_transaction(user_id, wallet_id, category_id, amount, type, description, trans_date):
+    # Insert transaksi + sesuaikan saldo dompet lewat RPC record_transaction
+    if offline.enabled():
+        # Insert biasa di server; trigger ledger yang menyesuaikan saldo
+        row = offline.insert("transactions", {
+            "user_id": user_id,
+            "wallet_id": wallet_id,
+            "category_id": category_id,
+            "amount": money.decimal(money.minor(amount)),
+            "type": type,
+            "description": description,
+            "date": trans_date.isoformat(),
+        }, user_id, get_client())
+        invalidate("transactions", user_id)
+        invalidate("wallets", user_id)
+        return row
+    res = supabase.rpc("record_transaction", {
+        "p_user_id": user_id,
+        "p_wallet_id": wallet_id,
+        "p_category_id": category_id,
+        "p_amount": money.decimal(money.minor(amount)),
+        "p_type": type,
+        "p_description": description,
+        "p_date": trans_date.isoformat(),
+    }).execute()
+    _written("transactions", user_id, upserted=[res.data])
+    return res.data
+
+
+def delete_transaction(transaction_id, user_id):
+    # Hapus transaksi + kembalikan saldo lewat RPC delete_transaction
+    if offline.enabled():
+        row = offline.delete("transactions", transaction_id, user_id, get_client())
+        invalidate("transactions", user_id)
+        invalidate("wallets", user_id)
+        return row
+    res = supabase.rpc("delete_transaction", {"p_id": transaction_id}).execute()
+    _written("transactions", user_id, deleted=[res.data])
+    return res.data
+
+
+# =========================
+# ATURAN KATEGORI OTOMATIS
+# =========================
+def apply_category_rules(user_id, only_uncategorized=False):
+    # Terapkan semua aturan ke transaksi lama di server (satu UPDATE per
+    # aturan); mengembalikan jumlah baris yang diubah per aturan
+    res = supabase.rpc("apply_category_rules", {
+        "p_user_id": user_id,
+        "p_only_uncategorized": only_uncategorized,
+    }).execute()
+    invalidate("transactions", user_id)
+    return _frame("category_rule_results", res)
+
+
+# =========================
+# LEDGER SALDO DOMPET
+# =========================
+# Saldo hanya berubah lewat entri wallet_ledger (trigger transaksi / RPC).
+def set_wallet_balance(wallet_id, balance, user_id):
+    # Selisih dengan saldo sekarang dicatat sebagai entri koreksi
+    balance = money.decimal(money.minor(balance))
+    if offline.enabled():
+        res = offline.set_wallet_balance(wallet_id, balance, user_id, get_client())
+        invalidate("wallets", user_id)
+        return res
+    res = supabase.rpc("set_wallet_balance", {
+        "p_wallet_id": wallet_id,
+        "p_balance": balance,
+    }).execute()
+    _written("wallets", user_id, upserted=[res.data])
+    return res.data
+
+
+def get_wallet_balance_at(wallet_id, at):
+    # Saldo (sen) pada akhir tanggal `at`: checkpoint terakhir + entri sesudahnya
+    res = supabase.rpc("wallet_balance_at", {
+        "p_wallet_id": wallet_id,
+        "p_at": at.isoformat(),
+    }).execute()
+    return money.minor(res.data)
+
+
+def reconcile_wallets(user_id, fix=False):
+    # Dompet yang saldonya tidak sama dengan ledger (dihitung di database)
+    res = supabase.rpc("reconcile_wallets", {"p_user_id": user_id, "p_fix": fix}).execute()
+    if fix:
+        invalidate("wallets", user_id)
+    return _frame("wallet_drift", res)
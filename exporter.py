@@ -0,0 +1,169 @@
+import tempfile
+
+import pandas as pd
+
+import money
+import schema
+from supabase_client import MAX_ROWS
+
+# =========================
+# EKSPOR TRANSAKSI / UTANG (CSV / PARQUET / XLSX)
+# =========================
+# Data diambil dari Supabase per EXPORT_CHUNK baris (keyset, lihat
+# KEYSET), diubah jadi tabel ekspor lalu langsung ditulis ke file
+# sementara. Yang ada di memori hanya satu chunk, berapa pun rentangnya.
+# File sementara pindah ke disk setelah SPOOL_MAX_SIZE. Chunk tidak boleh
+# lebih besar dari max-rows server: respons yang dipotong server terlihat
+# seperti chunk terakhir.
+EXPORT_CHUNK = MAX_ROWS
+SPOOL_MAX_SIZE = 8 * 2**20
+
+FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel (XLSX)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Kolom ekspor per tabel: nama kolom file -> kolom sumber
+EXPORT_COLUMNS = {
+    "transactions": {
+        "tanggal": "date",
+        "deskripsi": "description",
+        "dompet": "wallet_id",
+        "kategori": "category_id",
+        "jenis": "type",
+        "jumlah": "amount",
+        "dibuat": "created_at",
+    },
+    "debts": {
+        "nama": "name",
+        "jenis": "type",
+        "jumlah": "amount",
+        "deskripsi": "description",
+        "jatuh_tempo": "due_date",
+        "status": "status",
+        "dibuat": "created_at",
+    },
+}
+
+
+# Urutan keyset per tabel (menaik); transaksi memakai index keyset yang ada
+KEYSET = {
+    "transactions": ("date", "created_at", "id"),
+    "debts": ("created_at", "id"),
+}
+
+
+def iter_chunks(client, table, user_id, start=None, end=None, date_column="date", chunk_size=EXPORT_CHUNK):
+    # `client` = client Supabase sesi (bukan proxy), karena generator ini
+    # bisa berjalan di thread download_button tanpa konteks sesi.
+    keyset = KEYSET[table]
+    after = None
+    while True:
+        query = client.table(table).select(schema.columns(table)).eq("user_id", user_id)
+        if start:
+            query = query.gte(date_column, start.isoformat())
+        if end:
+            query = query.lt(date_column, end.isoformat())
+        if after:
+            query = query.or_(schema.keyset_after(keyset, after))
+        for col in keyset:
+            query = query.order(col)
+        rows = query.limit(min(chunk_size, MAX_ROWS)).execute().data or []
+        if not rows:
+            return
+        yield schema.to_frame(table, rows)
+        if len(rows) < min(chunk_size, MAX_ROWS):
+            return
+        after = tuple(rows[-1][col] for col in keyset)
+
+
+def to_export_frame(table, df, labels=None):
+    # Jumlah dalam rupiah, tanggal tanpa jam, enum jadi teks, id diganti nama
+    labels = labels or {}
+    out = pd.DataFrame(index=df.index)
+    for name, col in EXPORT_COLUMNS[table].items():
+        kind = schema.TABLES[table].get(col)
+        values = df[col] if col in df else pd.Series(None, index=df.index, dtype="object")
+        if col in labels:
+            values = values.map(labels[col])
+        elif kind == "amount":
+            values = money.from_minor(values).astype("float64")
+        elif kind == "date":
+            values = values.dt.date
+        elif kind == "ts":
+            values = values.dt.tz_convert(None)
+        elif isinstance(kind, pd.CategoricalDtype):
+            values = values.astype("object")
+        out[name] = values
+    return out.reset_index(drop=True)
+
+
+# =========================
+# PENULIS PER FORMAT
+# =========================
+def _write_csv(frames, f, columns):
+    header = True
+    for df in frames:
+        f.write(df.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+    if header:
+        f.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+
+
+def _arrow_schema(table):
+    import pyarrow as pa
+
+    # Skema tetap supaya chunk yang kolomnya kosong semua tetap cocok
+    types = {"amount": pa.float64(), "date": pa.date32(), "ts": pa.timestamp("us")}
+    return pa.schema([
+        (name, types.get(schema.TABLES[table].get(col), pa.string()))
+        for name, col in EXPORT_COLUMNS[table].items()
+    ])
+
+
+def _write_parquet(frames, f, arrow_schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pq.ParquetWriter(f, arrow_schema) as writer:
+        for df in frames:
+            # Satu row group per chunk
+            writer.write_table(pa.Table.from_pandas(df, schema=arrow_schema, preserve_index=False))
+
+
+def _write_xlsx(frames, f, columns):
+    from openpyxl import Workbook
+
+    # Mode write-only: baris langsung dialirkan ke file, tidak ditahan di memori
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append(columns)
+    for df in frames:
+        for row in df.astype("object").where(df.notna(), None).itertuples(index=False):
+            ws.append(list(row))
+    wb.save(f)
+
+
+def export_table(client, table, user_id, fmt, labels=None, start=None, end=None):
+    # Mengembalikan file sementara yang sudah di-rewind
+    frames = (to_export_frame(table, df, labels) for df in iter_chunks(client, table, user_id, start, end))
+    columns = list(EXPORT_COLUMNS[table])
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    if fmt == "csv":
+        _write_csv(frames, f, columns)
+    elif fmt == "parquet":
+        _write_parquet(frames, f, _arrow_schema(table))
+    elif fmt == "xlsx":
+        _write_xlsx(frames, f, columns)
+    else:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    f.seek(0)
+    return f
+
+
+def export_bytes(client, table, user_id, fmt, labels=None, start=None, end=None):
+    # Isi file untuk st.download_button (hasil akhirnya selalu ditahan
+    # Streamlit di memori); file sementara langsung ditutup
+    with export_table(client, table, user_id, fmt, labels, start, end) as f:
+        return f.read()
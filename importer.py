@@ -0,0 +1,177 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from postgrest.types import ReturnMethod
+
+import categorizer
+import data_access as db
+import money
+from supabase_client import supabase
+
+# =========================
+# IMPOR TRANSAKSI MASSAL (CSV / OFX)
+# =========================
+# Kolom CSV: date, amount, type, wallet, category, description (opsional).
+# `type` boleh kosong -> ditentukan dari tanda amount (negatif = pengeluaran).
+# Nama dompet/kategori dicocokkan tanpa beda huruf besar/kecil; baris tanpa
+# kategori yang cocok dikategorikan lewat aturan kategori otomatis.
+# Tanggal & angka diparse dengan format eksplisit (bukan tebakan pandas):
+# tanggal tahun-bulan-hari atau hari/bulan/tahun, angka sesuai NUMBER_FORMATS.
+CSV_CHUNKSIZE = 10_000
+BATCH_SIZE = 1_000
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+# kode -> (label, pemisah ribuan, pemisah desimal)
+NUMBER_FORMATS = {
+    "id": ("Indonesia (1.234,56)", ".", ","),
+    "en": ("Internasional (1,234.56)", ",", "."),
+}
+
+TYPE_ALIASES = {
+    "pemasukan": "pemasukan",
+    "income": "pemasukan",
+    "masuk": "pemasukan",
+    "credit": "pemasukan",
+    "pengeluaran": "pengeluaran",
+    "expense": "pengeluaran",
+    "keluar": "pengeluaran",
+    "debit": "pengeluaran",
+}
+
+_OFX_TRN = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+_OFX_FIELD = r"<{}>([^<\r\n]*)"
+
+
+def read_csv_chunks(file, chunksize=CSV_CHUNKSIZE):
+    reader = pd.read_csv(file, chunksize=chunksize, dtype=str, skipinitialspace=True)
+    for chunk in reader:
+        chunk.columns = [c.strip().lower() for c in chunk.columns]
+        yield chunk
+
+
+def read_ofx(file):
+    # OFX/QFX (SGML maupun XML): ambil DTPOSTED, TRNAMT, NAME/MEMO dari tiap STMTTRN
+    raw = file.read()
+    text = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+    blocks = pd.Series(_OFX_TRN.findall(text), dtype=str)
+
+    def field(tag):
+        return blocks.str.extract(_OFX_FIELD.format(tag), flags=re.I, expand=False).str.strip()
+
+    memo = field("MEMO")
+    posted = field("DTPOSTED")
+    return pd.DataFrame({
+        # DTPOSTED = YYYYMMDD[hhmmss...], TRNAMT selalu bertitik desimal
+        "date": posted.str[:4] + "-" + posted.str[4:6] + "-" + posted.str[6:8],
+        "amount": pd.to_numeric(field("TRNAMT"), errors="coerce"),
+        "description": field("NAME").fillna(memo).fillna(""),
+    })
+
+
+def parse_dates(values):
+    # Format DATE_FORMATS dicoba berurutan; jam di belakang tanggal diabaikan
+    text = pd.Series(values, dtype=object).astype(str).str.strip().str.split(r"[ T]", n=1, regex=True).str[0]
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+    return parsed
+
+
+def parse_amounts(values, number_format="id"):
+    # "Rp 1.234,56" / "-1,234.56" -> float; kolom yang sudah numerik dipakai apa adanya
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    _, thousands, decimal = NUMBER_FORMATS[number_format]
+    text = values.astype(str).str.replace(r"(?i)rp|\s", "", regex=True) \
+        .str.replace(thousands, "", regex=False) \
+        .str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(text, errors="coerce")
+
+
+def prepare(raw_df, wallets_df, categories_df, default_wallet_id=None, default_category_ids=None, matcher=None,
+            number_format="id"):
+    # Validasi & mapping vektor untuk satu chunk.
+    # Mengembalikan (rows siap insert, baris gagal + alasan).
+    default_category_ids = default_category_ids or {}
+    n = len(raw_df)
+    empty = pd.Series([None] * n, index=raw_df.index, dtype=object)
+
+    def col(name):
+        return raw_df[name] if name in raw_df.columns else empty
+
+    amount = parse_amounts(col("amount"), number_format)
+    trans_date = parse_dates(col("date"))
+
+    trans_type = col("type").astype(str).str.strip().str.lower().map(TYPE_ALIASES)
+    by_sign = pd.Series(np.where(amount < 0, "pengeluaran", "pemasukan"), index=raw_df.index)
+    trans_type = trans_type.fillna(by_sign.where(amount.notna()))
+
+    wallet_map = dict(zip(wallets_df["name"].str.strip().str.lower(), wallets_df["id"]))
+    wallet_id = col("wallet").astype(str).str.strip().str.lower().map(wallet_map)
+    if default_wallet_id is not None:
+        wallet_id = wallet_id.fillna(default_wallet_id)
+
+    # Kategori dicocokkan per (nama, jenis)
+    cat_key = categories_df["name"].str.strip().str.lower() + "|" + categories_df["type"].astype(str)
+    category_map = dict(zip(cat_key, categories_df["id"]))
+    category_id = (col("category").astype(str).str.strip().str.lower() + "|" + trans_type.fillna("")).map(category_map)
+    # Tanpa kategori yang cocok -> aturan kategori otomatis -> default per jenis
+    if matcher:
+        category_id = category_id.fillna(categorizer.categorize(matcher, col("description"), trans_type))
+    category_id = category_id.fillna(trans_type.map(default_category_ids))
+
+    errors = pd.Series("", index=raw_df.index)
+    errors = errors.mask(trans_date.isna(), errors + "tanggal tidak valid; ")
+    errors = errors.mask(amount.isna() | (amount == 0), errors + "jumlah tidak valid; ")
+    errors = errors.mask(trans_type.isna(), errors + "jenis tidak dikenal; ")
+    errors = errors.mask(wallet_id.isna(), errors + "dompet tidak ditemukan; ")
+    errors = errors.mask(category_id.isna(), errors + "kategori tidak ditemukan; ")
+    ok = errors == ""
+
+    rows = pd.DataFrame({
+        "wallet_id": wallet_id[ok],
+        "category_id": category_id[ok],
+        # String desimal persis, bukan float JSON (lihat money.py)
+        "amount": money.to_decimal(money.to_minor(amount[ok].abs())),
+        "type": trans_type[ok],
+        "description": col("description")[ok].fillna("").astype(str),
+        "date": trans_date[ok].dt.strftime("%Y-%m-%d"),
+    })
+    rejected = raw_df[~ok].assign(error=errors[~ok].str.rstrip("; "))
+    return rows, rejected
+
+
+def import_transactions(user_id, chunks, wallets_df, categories_df, default_wallet_id=None,
+                        default_category_ids=None, batch_size=BATCH_SIZE, progress=None, matcher=None,
+                        number_format="id"):
+    # Insert per batch `batch_size` baris. Saldo dompet disesuaikan oleh
+    # trigger ledger di database, satu update per dompet per batch.
+    imported = 0
+    rejected_parts = []
+    try:
+        for chunk in chunks:
+            rows, rejected = prepare(chunk, wallets_df, categories_df, default_wallet_id, default_category_ids,
+                                     matcher, number_format)
+            rejected_parts.append(rejected)
+            rows.insert(0, "user_id", user_id)
+            for start in range(0, len(rows), batch_size):
+                batch = rows.iloc[start:start + batch_size]
+                # to_json -> tipe numpy jadi tipe JSON biasa
+                supabase.table("transactions").insert(
+                    json.loads(batch.to_json(orient="records")), returning=ReturnMethod.minimal
+                ).execute()
+                imported += len(batch)
+                if progress:
+                    progress(imported)
+    finally:
+        db.invalidate("transactions", user_id)
+        db.invalidate("wallets", user_id)
+
+    rejected_df = pd.concat(rejected_parts) if rejected_parts else pd.DataFrame()
+    return imported, rejected_df
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# =========================
+# UANG: FIXED-POINT INT64
+# =========================
+# Jumlah uang di aplikasi disimpan & dijumlahkan sebagai int64 satuan
+# terkecil (sen, SCALE per rupiah). Float hanya muncul di batas luar:
+# input number_input, JSON dari Supabase, dan sumbu grafik. Ke Supabase
+# jumlah dikirim sebagai string desimal persis ("12345.67").
+SCALE = 100
+
+
+def to_minor(values):
+    # Rupiah (float/str, Series) -> int64 sen
+    return (pd.to_numeric(values, errors="coerce").fillna(0) * SCALE).round().astype("int64")
+
+
+def from_minor(values):
+    # Sen -> rupiah (float); hanya untuk grafik / kolom tampilan
+    return values / SCALE
+
+
+def minor(value):
+    # Satu nilai rupiah (float/int/str/None) -> int sen; None = 0, teks yang
+    # bukan angka -> ValueError (jangan sampai tersimpan diam-diam sebagai 0)
+    if value is None:
+        return 0
+    parsed = pd.to_numeric(pd.Series([value]), errors="coerce")
+    if parsed.isna().iloc[0] or not np.isfinite(parsed.iloc[0]):
+        raise ValueError(f"Jumlah tidak valid: {value!r}")
+    return int(to_minor(parsed).iloc[0])
+
+
+def to_decimal(values):
+    # int64 sen (Series) -> string desimal persis untuk kolom numeric
+    values = pd.Series(values).astype("int64")
+    sign = pd.Series(np.where(values < 0, "-", ""), index=values.index)
+    units, cents = np.divmod(values.abs(), SCALE)
+    return sign + units.astype(str) + "." + cents.astype(str).str.zfill(2)
+
+
+def decimal(value):
+    # Satu nilai sen -> string desimal (parameter RPC)
+    return to_decimal([value]).iloc[0]
+
+
+def rupiah(value):
+    # Satu nilai sen -> "Rp 1.234.567", dibulatkan ke rupiah terdekat
+    value = int(value)
+    units = (abs(value) + SCALE // 2) // SCALE
+    sign = "-" if value < 0 and units else ""
+    return f"Rp {sign}{units:,}".replace(",", ".")
+
+
+def column(label):
+    # Kolom jumlah di st.dataframe: data tetap angka (bisa diurutkan),
+    # isi kolom = from_minor(sen), hanya tampilannya yang diformat
+    return st.column_config.NumberColumn(f"{label} (Rp)", format="localized")
+
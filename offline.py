@@ -0,0 +1,575 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import streamlit as st
+
+import money
+import schema
+from supabase_client import get_client
+
+# =========================
+# MODE OFFLINE: MIRROR SQLITE + ANTRIAN WRITE-BEHIND
+# =========================
+# Aktif kalau FINAPP_OFFLINE=1. wallets, categories, transactions dibaca
+# dari mirror SQLite lokal; write langsung di-commit ke mirror + antrian
+# (tahan restart) lalu UI kembali. Worker latar belakang mengirim antrian
+# ke Supabase berurutan per user: insert berturut-turut ke tabel yang sama
+# jadi satu upsert, error dicoba ulang dengan backoff, dan perubahan yang
+# bentrok dengan server ditandai "conflict" (tidak ditimpa).
+# Mirror ditarik ulang dari server hanya saat antrian user kosong, jadi
+# perubahan lokal yang belum terkirim tidak pernah tertimpa.
+ENV_FLAG = "FINAPP_OFFLINE"
+DB_PATH = os.getenv("FINAPP_OFFLINE_DB", "finapp_offline.db")
+
+TABLES = ("wallets", "categories", "transactions")
+# Tabel yang write-nya dicek versinya (updated_at) sebelum diterapkan.
+# Saldo dompet berubah di setiap transaksi, jadi dompet & kategori
+# memakai "write terakhir menang".
+VERSIONED = ("transactions",)
+
+FLUSH_INTERVAL = 5  # detik; worker juga dibangunkan setiap ada write
+PULL_INTERVAL = 60  # detik; mirror lebih tua dari ini ditarik ulang di latar belakang
+BATCH_SIZE = 100  # item antrian per putaran per user
+MAX_ATTEMPTS = 8  # setelah ini item ditandai "failed"
+MAX_BACKOFF = 300  # detik
+
+SORT_KEYS = {
+    "transactions": (["date", "created_at", "id"], False),
+    "wallets": (["created_at"], True),
+    "categories": (["created_at"], True),
+}
+
+SCHEMA = """
+create table if not exists mirror (
+    table_name text not null,
+    id text not null,
+    user_id text not null,
+    data text not null,           -- baris JSON, bentuknya sama dengan respons Supabase
+    server_updated_at text,       -- versi terakhir dari server; null = baru lokal
+    primary key (table_name, id)
+);
+create index if not exists mirror_user_idx on mirror (table_name, user_id);
+
+create table if not exists pulls (
+    table_name text not null,
+    user_id text not null,
+    pulled_at real not null,
+    primary key (table_name, user_id)
+);
+
+create table if not exists queue (
+    seq integer primary key autoincrement,
+    user_id text not null,
+    op text not null,             -- insert / update / delete / rpc
+    target text not null,         -- nama tabel atau RPC
+    row_id text,
+    payload text,
+    base_updated_at text,         -- versi yang dilihat saat write lokal
+    status text not null default 'pending',  -- pending / conflict / failed
+    attempts integer not null default 0,
+    next_attempt_at real not null default 0,
+    last_error text,
+    created_at text not null
+);
+create index if not exists queue_user_idx on queue (user_id, status, seq);
+"""
+
+logger = logging.getLogger("finapp.offline")
+
+_conn = None
+_lock = threading.RLock()
+_clients = {}  # user_id -> client Supabase sesi terakhir (dipakai worker)
+_versions = {}  # (tabel, user_id) -> penghitung perubahan mirror
+_frames = {}  # (tabel, user_id) -> (versi, DataFrame)
+_pull_requests = set()
+_listeners = []
+_wake = threading.Event()
+_worker = None
+
+
+def enabled():
+    return os.getenv(ENV_FLAG, "0") == "1"
+
+
+def handles(table):
+    return enabled() and table in TABLES
+
+
+def add_listener(fn):
+    # fn(tabel, user_id) dipanggil setelah mirror diperbarui dari server
+    _listeners.append(fn)
+
+
+def _db():
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            _conn.row_factory = sqlite3.Row
+            _conn.execute("pragma journal_mode = wal")
+            _conn.execute("pragma synchronous = normal")
+            _conn.executescript(SCHEMA)
+        return _conn
+
+
+class _transaction:
+    # begin immediate ... commit di bawah _lock (satu koneksi untuk semua thread)
+    def __enter__(self):
+        _lock.acquire()
+        self.conn = _db()
+        self.conn.execute("begin immediate")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("rollback" if exc_type else "commit")
+        finally:
+            _lock.release()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _changed(user_id, *tables):
+    with _lock:
+        for table in tables:
+            _versions[(table, user_id)] = _versions.get((table, user_id), 0) + 1
+
+
+def _register(user_id, client):
+    _clients[user_id] = client
+    _ensure_worker()
+
+
+# =========================
+# MIRROR
+# =========================
+def _put(conn, table, row, server_updated_at=None):
+    conn.execute(
+        "insert or replace into mirror (table_name, id, user_id, data, server_updated_at) values (?, ?, ?, ?, ?)",
+        (table, row["id"], row["user_id"], json.dumps(row), server_updated_at),
+    )
+
+
+def _get(conn, table, row_id):
+    row = conn.execute("select data, server_updated_at from mirror where table_name = ? and id = ?",
+                       (table, row_id)).fetchone()
+    return (json.loads(row["data"]), row["server_updated_at"]) if row else (None, None)
+
+
+def _adjust_balance(conn, wallet_id, delta):
+    # delta dalam sen; saldo dijumlahkan sebagai int lalu disimpan sebagai
+    # string desimal persis, sama seperti yang dikirim ke Supabase
+    found = conn.execute("select json_extract(data, '$.balance') from mirror "
+                         "where table_name = 'wallets' and id = ?", (wallet_id,)).fetchone()
+    if found is None:
+        return
+    conn.execute(
+        "update mirror set data = json_set(data, '$.balance', ?) where table_name = 'wallets' and id = ?",
+        (money.decimal(money.minor(found[0]) + delta), wallet_id),
+    )
+
+
+def _signed(row):
+    # Jumlah transaksi bertanda, dalam sen
+    amount = money.minor(row.get("amount"))
+    return amount if row.get("type") == "pemasukan" else -amount
+
+
+def _has_pending(conn, user_id):
+    return conn.execute("select 1 from queue where user_id = ? and status = 'pending' limit 1",
+                        (user_id,)).fetchone() is not None
+
+
+def pull(table, user_id, client):
+    # Ganti isi mirror (tabel, user) dengan data server. Dilewati kalau
+    # masih ada perubahan lokal yang belum terkirim.
+    with _lock:
+        if _has_pending(_db(), user_id):
+            return False
+    rows = client.table(table).select("user_id, " + schema.columns(table)).eq("user_id", user_id).execute().data or []
+    with _transaction() as conn:
+        if _has_pending(conn, user_id):
+            return False
+        conn.execute("delete from mirror where table_name = ? and user_id = ?", (table, user_id))
+        for row in rows:
+            _put(conn, table, row, row.get("updated_at"))
+        conn.execute("insert or replace into pulls (table_name, user_id, pulled_at) values (?, ?, ?)",
+                     (table, user_id, time.time()))
+    _changed(user_id, table)
+    for fn in _listeners:
+        fn(table, user_id)
+    return True
+
+
+def frame(table, user_id, client):
+    # DataFrame dari mirror; mirror kosong ditarik dulu (sinkron),
+    # mirror basi ditarik ulang oleh worker
+    _register(user_id, client)
+    with _lock:
+        pulled = _db().execute("select pulled_at from pulls where table_name = ? and user_id = ?",
+                               (table, user_id)).fetchone()
+    if pulled is None:
+        pull(table, user_id, client)
+    elif time.time() - pulled["pulled_at"] >= PULL_INTERVAL:
+        _pull_requests.add((table, user_id))
+        _wake.set()
+
+    key = (table, user_id)
+    with _lock:
+        version = _versions.get(key, 0)
+        entry = _frames.get(key)
+        if entry and entry[0] == version:
+            return entry[1].copy()
+        rows = [json.loads(r["data"]) for r in _db().execute(
+            "select data from mirror where table_name = ? and user_id = ?", (table, user_id))]
+
+    df = schema.to_frame(table, rows).reindex(columns=schema.VIEWS[table])
+    columns, ascending = SORT_KEYS[table]
+    if not df.empty:
+        df = df.sort_values(columns, ascending=ascending, kind="stable")
+    df = df.reset_index(drop=True)
+    with _lock:
+        if _versions.get(key, 0) == version:
+            _frames[key] = (version, df)
+    return df.copy()
+
+
+def page(df, after=None, page_size=50):
+    # Keyset (date, created_at, id) menurun atas frame transaksi dari mirror
+    if after and not df.empty:
+        d, c, i = pd.Timestamp(after[0]), pd.Timestamp(after[1]), after[2]
+        same_date = df["date"] == d
+        df = df[(df["date"] < d)
+                | (same_date & (df["created_at"] < c))
+                | (same_date & (df["created_at"] == c) & (df["id"] < i))]
+    out = df.head(page_size).reset_index(drop=True)
+    if len(df) > page_size:
+        last = out.iloc[-1]
+        out.attrs["next_cursor"] = (last["date"].date().isoformat(), last["created_at"].isoformat(), last["id"])
+    return out, out.attrs.get("next_cursor")
+
+
+def summary(df, by_category=False):
+    # Padanan RPC monthly_summary atas frame transaksi dari mirror
+    keys = ["month", "type"] + (["category_id"] if by_category else [])
+    if df.empty:
+        return schema.to_frame("monthly_summary", [])
+    out = df.assign(month=df["date"].dt.to_period("M").dt.to_timestamp()) \
+        .groupby(keys, observed=True, dropna=False) \
+        .agg(total=("amount", "sum"), n=("id", "size")) \
+        .reset_index()
+    if not by_category:
+        out["category_id"] = None
+    return out[list(schema.TABLES["monthly_summary"])]
+
+
+# =========================
+# WRITE LOKAL
+# =========================
+def _enqueue(conn, user_id, op, target, row_id=None, payload=None, base=None):
+    conn.execute(
+        "insert into queue (user_id, op, target, row_id, payload, base_updated_at, created_at) "
+        "values (?, ?, ?, ?, ?, ?, ?)",
+        (user_id, op, target, row_id, json.dumps(payload) if payload is not None else None, base, _now()),
+    )
+
+
+def _cancel_pending_insert(conn, table, row_id):
+    # Baris yang belum pernah sampai ke server: insert & update-nya dibuang
+    found = conn.execute("select 1 from queue where op = 'insert' and target = ? and row_id = ? and status = 'pending'",
+                         (table, row_id)).fetchone()
+    if found:
+        conn.execute("delete from queue where target = ? and row_id = ? and status = 'pending'", (table, row_id))
+    return found is not None
+
+
+def _done(user_id, *tables):
+    _changed(user_id, *tables)
+    _wake.set()
+
+
+def insert(table, payload, user_id, client):
+    _register(user_id, client)
+    now = _now()
+    row = {"id": str(uuid.uuid4()), "created_at": now, **payload}
+    with _transaction() as conn:
+        _put(conn, table, {**row, "updated_at": now})
+        if table == "transactions":
+            _adjust_balance(conn, row["wallet_id"], _signed(row))
+        _enqueue(conn, user_id, "insert", table, row["id"], row)
+    _done(user_id, table, "wallets")
+    return row
+
+
+def update(table, values, row_ids, user_id, client):
+    _register(user_id, client)
+    with _transaction() as conn:
+        for row_id in row_ids:
+            row, base = _get(conn, table, row_id)
+            if row is None:
+                continue
+            if table == "transactions" and ("amount" in values or "type" in values or "wallet_id" in values):
+                _adjust_balance(conn, row["wallet_id"], -_signed(row))
+                _adjust_balance(conn, values.get("wallet_id", row["wallet_id"]), _signed({**row, **values}))
+            _put(conn, table, {**row, **values, "updated_at": _now()}, base)
+            _enqueue(conn, user_id, "update", table, row_id, values, base)
+    _done(user_id, table, "wallets")
+    return values
+
+
+def delete(table, row_id, user_id, client, cascade=()):
+    _register(user_id, client)
+    with _transaction() as conn:
+        row, base = _get(conn, table, row_id)
+        if row is None:
+            return None
+        conn.execute("delete from mirror where table_name = ? and id = ?", (table, row_id))
+        if table == "transactions":
+            _adjust_balance(conn, row["wallet_id"], -_signed(row))
+        # Anak yang ikut terhapus di server (FK on delete cascade)
+        fk = {"wallets": "wallet_id", "categories": "category_id"}.get(table)
+        if fk and "transactions" in cascade:
+            children = [json.loads(r["data"]) for r in conn.execute(
+                f"select data from mirror where table_name = 'transactions' and json_extract(data, '$.{fk}') = ?",
+                (row_id,))]
+            for child in children:
+                conn.execute("delete from mirror where table_name = 'transactions' and id = ?", (child["id"],))
+                conn.execute("delete from queue where target = 'transactions' and row_id = ? and status = 'pending'",
+                             (child["id"],))
+                if table != "wallets":
+                    _adjust_balance(conn, child["wallet_id"], -_signed(child))
+        if not _cancel_pending_insert(conn, table, row_id):
+            _enqueue(conn, user_id, "delete", table, row_id, None, base)
+    _done(user_id, table, *cascade, "wallets")
+    return row
+
+
+def set_wallet_balance(wallet_id, balance, user_id, client):
+    _register(user_id, client)
+    with _transaction() as conn:
+        row, base = _get(conn, "wallets", wallet_id)
+        if row is not None:
+            _put(conn, "wallets", {**row, "balance": money.decimal(money.minor(balance)), "updated_at": _now()}, base)
+        _enqueue(conn, user_id, "rpc", "set_wallet_balance", wallet_id,
+                 {"p_wallet_id": wallet_id, "p_balance": balance})
+    _done(user_id, "wallets")
+    return balance
+
+
+# =========================
+# WORKER: KIRIM ANTRIAN KE SUPABASE
+# =========================
+def _groups(items):
+    # Insert berturut-turut ke tabel yang sama digabung jadi satu request
+    group = []
+    for item in items:
+        if group and not (item["op"] == "insert" and group[0]["op"] == "insert"
+                          and item["target"] == group[0]["target"]):
+            yield group
+            group = []
+        group.append(item)
+        if item["op"] != "insert":
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _exists(client, table, row_id):
+    return bool(client.table(table).select("id").eq("id", row_id).execute().data)
+
+
+def _send(client, group):
+    # Mengembalikan (versi baru dari server atau None, pesan konflik atau None)
+    item = group[0]
+    table, row_id, base = item["target"], item["row_id"], item["base_updated_at"]
+    check = base is not None and table in VERSIONED
+
+    if item["op"] == "insert":
+        # ignore_duplicates: aman dikirim ulang kalau respons sebelumnya hilang
+        rows = client.table(table).upsert([json.loads(i["payload"]) for i in group],
+                                          ignore_duplicates=True, on_conflict="id").execute().data or []
+        return {r["id"]: r.get("updated_at") for r in rows}, None
+    if item["op"] == "rpc":
+        client.rpc(table, json.loads(item["payload"])).execute()
+        return {}, None
+
+    if item["op"] == "update":
+        query = client.table(table).update(json.loads(item["payload"])).eq("id", row_id)
+    else:
+        query = client.table(table).delete().eq("id", row_id)
+    if check:
+        query = query.lte("updated_at", base)
+    rows = query.execute().data or []
+    if rows:
+        return {row_id: rows[0].get("updated_at")}, None
+    if _exists(client, table, row_id):
+        return {}, "diubah di perangkat lain"
+    if item["op"] == "update":
+        return {}, "sudah dihapus di server"
+    return {}, None  # delete: baris memang sudah tidak ada
+
+
+def _finish(group, versions, conflict):
+    seqs = [i["seq"] for i in group]
+    marks = ",".join("?" * len(seqs))
+    with _transaction() as conn:
+        if conflict:
+            conn.execute("update queue set status = 'conflict', last_error = ? where seq = ?", (conflict, seqs[0]))
+        else:
+            conn.execute(f"delete from queue where seq in ({marks})", seqs)
+        item = group[0]
+        for row_id, version in versions.items():
+            if version is None:
+                continue
+            # Write lokal berikutnya atas baris ini dibandingkan dengan versi baru
+            conn.execute("update mirror set server_updated_at = ? where table_name = ? and id = ?",
+                         (version, item["target"], row_id))
+            conn.execute("update queue set base_updated_at = ? where target = ? and row_id = ? "
+                         "and status = 'pending' and base_updated_at is not null",
+                         (version, item["target"], row_id))
+
+
+def _retry(group, error):
+    message = str(error) or type(error).__name__
+    with _transaction() as conn:
+        for item in group:
+            attempts = item["attempts"] + 1
+            if attempts >= MAX_ATTEMPTS:
+                conn.execute("update queue set status = 'failed', attempts = ?, last_error = ? where seq = ?",
+                             (attempts, message, item["seq"]))
+            else:
+                conn.execute("update queue set attempts = ?, next_attempt_at = ?, last_error = ? where seq = ?",
+                             (attempts, time.time() + min(MAX_BACKOFF, 2 ** attempts), message, item["seq"]))
+    logger.warning("flush offline gagal (%s item): %s", len(group), message)
+
+
+def flush(user_id):
+    # Kirim antrian satu user berurutan. Berhenti di item pertama yang
+    # gagal/menunggu backoff supaya urutan write tetap terjaga.
+    client = _clients.get(user_id)
+    if client is None:
+        return 0
+    with _lock:
+        items = _db().execute(
+            "select * from queue where user_id = ? and status = 'pending' order by seq limit ?",
+            (user_id, BATCH_SIZE)).fetchall()
+    sent = 0
+    for group in _groups(items):
+        if group[0]["next_attempt_at"] > time.time():
+            break
+        try:
+            versions, conflict = _send(client, group)
+        except Exception as e:
+            _retry(group, e)
+            break
+        _finish(group, versions, conflict)
+        sent += len(group)
+
+    if sent:
+        with _lock:
+            drained = not _has_pending(_db(), user_id)
+        if drained:
+            # Ambil hasil akhir server (saldo dari ledger, updated_at, dsb.)
+            for table in TABLES:
+                pull(table, user_id, client)
+    return sent
+
+
+def _run():
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            with _lock:
+                users = [r["user_id"] for r in _db().execute(
+                    "select distinct user_id from queue where status = 'pending' and next_attempt_at <= ?",
+                    (time.time(),))]
+            for user_id in users:
+                flush(user_id)
+            while _pull_requests:
+                table, user_id = _pull_requests.pop()
+                if user_id in _clients:
+                    pull(table, user_id, _clients[user_id])
+        except Exception:
+            logger.exception("worker offline error")
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="finapp-offline", daemon=True)
+            _worker.start()
+
+
+# =========================
+# STATUS & PENYELESAIAN KONFLIK
+# =========================
+def status(user_id):
+    with _lock:
+        rows = _db().execute("select status, count(*) as n from queue where user_id = ? group by status",
+                             (user_id,)).fetchall()
+    counts = {"pending": 0, "conflict": 0, "failed": 0}
+    counts.update({r["status"]: r["n"] for r in rows})
+    return counts
+
+
+def problems(user_id):
+    with _lock:
+        rows = _db().execute(
+            "select seq, op, target, row_id, status, attempts, last_error, created_at from queue "
+            "where user_id = ? and status != 'pending' order by seq", (user_id,)).fetchall()
+    return pd.DataFrame([dict(r) for r in rows],
+                        columns=["seq", "op", "target", "row_id", "status", "attempts", "last_error", "created_at"])
+
+
+def retry_failed(user_id):
+    with _transaction() as conn:
+        conn.execute("update queue set status = 'pending', attempts = 0, next_attempt_at = 0 "
+                     "where user_id = ? and status = 'failed'", (user_id,))
+    _wake.set()
+
+
+def discard_problems(user_id, client):
+    # Buang perubahan lokal yang konflik/gagal, lalu mirror ikut data server
+    with _transaction() as conn:
+        conn.execute("delete from queue where user_id = ? and status != 'pending'", (user_id,))
+    for table in TABLES:
+        pull(table, user_id, client)
+
+
+def render_status(user_id):
+    # Panel sidebar: jumlah antrian dan perubahan yang perlu ditangani
+    if not enabled():
+        return
+    counts = status(user_id)
+    label = f"📴 Offline: {counts['pending']} antre"
+    if counts["conflict"] or counts["failed"]:
+        label += f", {counts['conflict'] + counts['failed']} bermasalah"
+    with st.sidebar.expander(label, expanded=bool(counts["conflict"] or counts["failed"])):
+        st.caption("Perubahan disimpan lokal dulu lalu dikirim ke server di latar belakang.")
+        if st.button("🔄 Kirim sekarang", key="offline_flush"):
+            _wake.set()
+        issues = problems(user_id)
+        if issues.empty:
+            return
+        st.dataframe(issues[["op", "target", "status", "last_error"]], hide_index=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Coba lagi", key="offline_retry", disabled=not counts["failed"]):
+                retry_failed(user_id)
+                st.rerun()
+        with col2:
+            if st.button("Pakai data server", key="offline_discard"):
+                discard_problems(user_id, get_client())
+                st.rerun()
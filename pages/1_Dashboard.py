@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
 from supabase_client import supabase
-from datetime import datetime
+from datetime import datetime, timedelta
+import data_access as db
+import access
+import money
+import sync_store
+import query_log
 
 # =========================
 # CONFIGURASI DASAR
@@ -54,8 +59,73 @@ st.markdown("""
 # =========================
 # FUNGSI
 # =========================
-def format_rupiah(x):
-    return f"Rp {x:,.0f}".replace(",", ".")
+def month_range():
+    return db.month_bounds(now.year, now.month)
+
+# Data per bagian. Tiap fragment memuat sendiri datanya (dari cache
+# data_access / snapshot sync_store), jadi rerun satu fragment hanya
+# menyentuh data bagian itu.
+def summary_jobs():
+    return {
+        "summary": lambda: db.get_monthly_summary(user_id, *month_range()),
+        "wallets": lambda: db.get_wallets(user_id),
+    }
+
+def wallet_jobs(view_user_id):
+    if isinstance(view_user_id, tuple):
+        # Gabungan semua akun: satu query in_("user_id", ...) per tabel
+        return {"view_wallets": lambda: db.get_for_users("wallets", view_user_id)}
+    return {"view_wallets": lambda: db.get_wallets(view_user_id)}
+
+def transaction_range():
+    # Rentang tanggal di bagian transaksi (start inklusif, end eksklusif);
+    # bawaan bulan ini. Hanya rentang ini yang dimuat, bukan seluruh riwayat.
+    start, end = month_range()
+    start = st.session_state.get("tx_start", start)
+    last = st.session_state.get("tx_end", end - timedelta(days=1))
+    return start, last + timedelta(days=1)
+
+def transaction_jobs(view_user_id):
+    start, end = transaction_range()
+    if isinstance(view_user_id, tuple):
+        jobs = {
+            "view_transactions": lambda: db.get_transactions_for_users(view_user_id, start, end),
+            "view_categories": lambda: db.get_for_users("categories", view_user_id),
+        }
+    else:
+        jobs = {
+            "view_transactions": lambda: db.get_transactions(view_user_id, start, end),
+            "view_categories": lambda: db.get_categories(view_user_id),
+        }
+    return {**jobs, **wallet_jobs(view_user_id)}
+
+def debt_jobs(view_user_id):
+    if isinstance(view_user_id, tuple):
+        return {"view_debts": lambda: db.get_for_users("debts", view_user_id)}
+    return {"view_debts": lambda: db.get_debts(view_user_id)}
+
+def month_transaction_jobs(view_user_id):
+    # Arus kas bulan ini untuk ringkasan gabungan, terlepas dari rentang
+    # yang dipilih di bagian transaksi (rentang bawaan = query yang sama)
+    if isinstance(view_user_id, tuple):
+        return {"month_transactions": lambda: db.get_transactions_for_users(view_user_id, *month_range())}
+    return {}
+
+def view_jobs(view_user_id):
+    return {**transaction_jobs(view_user_id), **debt_jobs(view_user_id), **month_transaction_jobs(view_user_id)}
+
+def show_errors(errors, *names):
+    # Tampilkan peringatan untuk query yang gagal; True kalau ada yang gagal
+    failed = [n for n in names if n in errors]
+    for n in failed:
+        st.warning(f"⚠️ Gagal memuat data ({n}): {errors[n]}")
+    return bool(failed)
+
+def with_owner(df, owner_labels):
+    # Penanda pemilik untuk tampilan gabungan semua akun
+    if owner_labels is None or df.empty:
+        return df, []
+    return df.assign(owner=df["user_id"].map(owner_labels)), ["owner"]
 
 # =========================
 # CEK LOGIN
@@ -70,89 +140,179 @@ st.success(f"✅ Login sebagai: **{user.email}**")
 st.markdown("## 📊 Dashboard Keuangan")
 
 # =========================
-# AMBIL DATA
+# AMBIL DATA (PREFETCH)
 # =========================
-transactions_df = pd.DataFrame(
-    supabase.table("transactions").select("*").eq("user_id", user_id).execute().data or []
-)
-wallets_df = pd.DataFrame(
-    supabase.table("wallets").select("*").eq("user_id", user_id).execute().data or []
-)
+# Hanya di rerun penuh: semua query independen jalan bersamaan supaya
+# cache terisi, lalu tiap fragment membaca bagiannya dari cache. Data akun
+# yang dilihat ikut dimuat memakai pilihan terakhir di selectbox.
+# Daftar akun yang bisa dilihat berasal dari cache graf akses (access.py),
+# biasanya tanpa query.
+now = datetime.now()
+try:
+    account_labels = access.accounts(user)
+    access_error = None
+except Exception as e:
+    account_labels = {user_id: "Saya"}
+    access_error = str(e) or type(e).__name__
+
+last_selected = st.session_state.get("view_user_select", "me")
+if last_selected == "all":
+    guess_view_id = tuple(sorted(account_labels))
+elif last_selected in account_labels:
+    guess_view_id = last_selected
+else:
+    guess_view_id = user_id
+
+db.load_concurrently({**summary_jobs(), **view_jobs(guess_view_id)})
 
 # =========================
 # RINGKASAN BULAN INI
 # =========================
-if not transactions_df.empty:
-    transactions_df["date"] = pd.to_datetime(transactions_df["date"])
-    now = datetime.now()
-    bulan_ini_df = transactions_df[
-        (transactions_df["date"].dt.month == now.month) &
-        (transactions_df["date"].dt.year == now.year)
-    ]
+@st.fragment
+def summary_section():
+    data, errors = db.load_concurrently(summary_jobs())
+    if show_errors(errors, "summary", "wallets"):
+        return
+    bulan_ini_df = data["summary"]
+    wallets_df = data["wallets"]
+    if bulan_ini_df.empty:
+        st.info("💡 Belum ada transaksi bulan ini untuk ditampilkan di dashboard.")
+        return
 
-    total_pemasukan = bulan_ini_df.loc[bulan_ini_df["type"] == "pemasukan", "amount"].sum()
-    total_pengeluaran = bulan_ini_df.loc[bulan_ini_df["type"] == "pengeluaran", "amount"].sum()
-    saldo_total = wallets_df["balance"].sum()
+    total_pemasukan = bulan_ini_df.loc[bulan_ini_df["type"] == "pemasukan", "total"].sum()
+    total_pengeluaran = bulan_ini_df.loc[bulan_ini_df["type"] == "pengeluaran", "total"].sum()
+    saldo_total = wallets_df["balance"].sum() if not wallets_df.empty else 0
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.markdown(f"<div class='metric-card'><h4>Pemasukan Bulan Ini</h4><h2 style='color:green'>{format_rupiah(total_pemasukan)}</h2></div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'><h4>Pemasukan Bulan Ini</h4><h2 style='color:green'>{money.rupiah(total_pemasukan)}</h2></div>", unsafe_allow_html=True)
     with col2:
-        st.markdown(f"<div class='metric-card'><h4>Pengeluaran Bulan Ini</h4><h2 style='color:red'>{format_rupiah(total_pengeluaran)}</h2></div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'><h4>Pengeluaran Bulan Ini</h4><h2 style='color:red'>{money.rupiah(total_pengeluaran)}</h2></div>", unsafe_allow_html=True)
     with col3:
-        st.markdown(f"<div class='metric-card'><h4>Saldo Total</h4><h2 style='color:blue'>{format_rupiah(saldo_total)}</h2></div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'><h4>Saldo Total</h4><h2 style='color:blue'>{money.rupiah(saldo_total)}</h2></div>", unsafe_allow_html=True)
 
     st.subheader("📈 Grafik Pemasukan vs Pengeluaran")
-    chart_data = bulan_ini_df.groupby("type")["amount"].sum().reset_index()
+    chart_data = money.from_minor(bulan_ini_df.groupby("type", observed=True)["total"].sum()).rename("amount").reset_index()
     st.bar_chart(chart_data.set_index("type"))
-else:
-    st.info("💡 Belum ada transaksi untuk ditampilkan di dashboard.")
+
+summary_section()
 
 # =========================
 # PILIH DATA KOLABORASI
 # =========================
-collabs = supabase.table("collaborations") \
-    .select("*") \
-    .or_(f"owner_id.eq.{user.id},collab_id.eq.{user.id}") \
-    .eq("status", "accepted") \
-    .execute()
+# Ganti akun = rerun penuh (semua bagian ikut berganti data)
+if access_error:
+    show_errors({"collabs": access_error}, "collabs")
 
 options = [("me", "Data Saya")]
-for c in collabs.data:
-    if c["owner_id"] == user.id:
-        options.append((c["collab_id"], f"Data {c['requester_email']}"))
-    else:
-        options.append((c["owner_id"], f"Data {c['owner_email']}"))
+options += [(uid, f"Data {label}") for uid, label in account_labels.items() if uid != user_id]
+if len(account_labels) > 1:
+    options.append(("all", "Semua Akun (gabungan)"))
 
 selected_user_id = st.selectbox(
     "🔄 Pilih data yang ingin dilihat",
     [o[0] for o in options],
-    format_func=lambda x: dict(options)[x]
+    format_func=lambda x: dict(options)[x],
+    key="view_user_select"
 )
-view_user_id = user.id if selected_user_id == "me" else selected_user_id
+if selected_user_id == "me":
+    view_user_id = user.id
+elif selected_user_id == "all":
+    view_user_id = tuple(sorted(account_labels))
+else:
+    view_user_id = selected_user_id
+consolidated = isinstance(view_user_id, tuple)
+# Akses dicek dari graf yang sama (mis. kolaborasi baru saja dicabut)
+if not access.can_read(user, view_user_id):
+    st.error("⚠️ Tidak punya akses baca ke akun ini.")
+    st.stop()
+
+# Pilihan berubah / tidak valid lagi -> muat data akun yang benar
+if view_user_id != guess_view_id:
+    db.load_concurrently(view_jobs(view_user_id))
+owner_labels = account_labels if consolidated else None
+
+# =========================
+# RINGKASAN GABUNGAN
+# =========================
+# Per akun + total: saldo, arus kas bulan ini, utang/piutang belum lunas
+if consolidated:
+    data, errors = db.load_concurrently(view_jobs(view_user_id))
+    if not show_errors(errors, "view_wallets", "month_transactions", "view_debts"):
+        st.subheader("👨‍👩‍👧 Ringkasan Semua Akun")
+        view_wallets_df = data["view_wallets"]
+        view_transactions_df = data["month_transactions"]
+        view_debts_df = data["view_debts"]
+        accounts = pd.Index(view_user_id, name="user_id")
+        per_account = pd.DataFrame(index=accounts)
+        per_account["saldo"] = view_wallets_df.groupby("user_id")["balance"].sum()
+        flows = view_transactions_df.groupby(["user_id", "type"], observed=False)["amount"].sum().unstack("type")
+        per_account["pemasukan"] = flows.get("pemasukan")
+        per_account["pengeluaran"] = flows.get("pengeluaran")
+        open_debts = view_debts_df[view_debts_df["status"] != "lunas"]
+        debts = open_debts.groupby(["user_id", "type"], observed=False)["amount"].sum().unstack("type")
+        per_account["utang"] = debts.get("utang")
+        per_account["piutang"] = debts.get("piutang")
+        per_account = per_account.fillna(0).astype("int64")
+        per_account["arus kas"] = per_account["pemasukan"] - per_account["pengeluaran"]
+        per_account.loc["Total"] = per_account.sum()
+
+        display = money.from_minor(per_account)
+        display.insert(0, "akun", [account_labels.get(i, i) for i in per_account.index])
+        st.dataframe(display, hide_index=True,
+                     column_config={c: money.column(c) for c in per_account.columns})
+
+        chart = money.from_minor(per_account.drop(index="Total")[["pemasukan", "pengeluaran"]])
+        chart.index = [account_labels.get(i, i) for i in chart.index]
+        st.bar_chart(chart)
 
 # =========================
 # DOMPET
 # =========================
-wallets_data = supabase.table("wallets").select("name, balance").eq("user_id", view_user_id).execute().data
-with st.expander("💼 Dompet", expanded=True):
-    if wallets_data:
-        df_wallets = pd.DataFrame(wallets_data)
-        df_wallets["balance"] = df_wallets["balance"].apply(format_rupiah)
-        st.dataframe(df_wallets)
-    else:
-        st.info("Tidak ada dompet ditemukan.")
+@st.fragment
+def wallets_section(view_user_id, owner_labels):
+    data, errors = db.load_concurrently(wallet_jobs(view_user_id))
+    with st.expander("💼 Dompet", expanded=True):
+        if show_errors(errors, "view_wallets"):
+            return
+        view_wallets_df, owner_cols = with_owner(data["view_wallets"], owner_labels)
+        if view_wallets_df.empty:
+            st.info("Tidak ada dompet ditemukan.")
+            return
+        df_wallets = view_wallets_df[owner_cols + ["name", "balance"]].copy()
+        df_wallets["balance"] = money.from_minor(df_wallets["balance"])
+        st.dataframe(df_wallets, column_config={"balance": money.column("balance")})
+
+wallets_section(view_user_id, owner_labels)
 
 # =========================
 # TRANSAKSI
 # =========================
-transactions_data = supabase.table("transactions").select("user_id, wallet_id, category_id, amount, type, description, date").eq("user_id", view_user_id).execute().data
-wallets_df = pd.DataFrame(supabase.table("wallets").select("id, name").eq("user_id", view_user_id).execute().data or [])
-categories_df = pd.DataFrame(supabase.table("categories").select("id, name").eq("user_id", view_user_id).execute().data or [])
+@st.fragment
+def transactions_section(view_user_id, owner_labels):
+    with st.expander("📜 Transaksi", expanded=True):
+        # Rentang dipilih dulu, baru data rentang itu dimuat
+        start, end = month_range()
+        col1, col2 = st.columns(2)
+        col1.date_input("📅 Dari tanggal", value=start, key="tx_start")
+        col2.date_input("📅 Sampai tanggal", value=end - timedelta(days=1), key="tx_end")
+
+        data, errors = db.load_concurrently(transaction_jobs(view_user_id))
+        if show_errors(errors, "view_transactions"):
+            return
+        view_transactions_df, owner_cols = with_owner(data["view_transactions"], owner_labels)
+        if view_transactions_df.empty:
+            st.info("Tidak ada transaksi ditemukan.")
+            return
 
-with st.expander("📜 Transaksi", expanded=True):
-    if transactions_data:
-        df_trans = pd.DataFrame(transactions_data)
+        wallets_df = data.get("view_wallets", pd.DataFrame())
+        if wallets_df.empty:
+            wallets_df = pd.DataFrame(columns=["id", "name"])
+        categories_df = data.get("view_categories", pd.DataFrame())
+        if categories_df.empty:
+            categories_df = pd.DataFrame(columns=["id", "name"])
+
+        df_trans = view_transactions_df[owner_cols + ["wallet_id", "category_id", "amount", "type", "description", "date"]].copy()
         df_trans["date"] = pd.to_datetime(df_trans["date"]).dt.date
 
         df_trans = df_trans.merge(wallets_df[['id', 'name']], left_on='wallet_id', right_on='id', how='left') \
@@ -160,31 +320,36 @@ with st.expander("📜 Transaksi", expanded=True):
         df_trans = df_trans.merge(categories_df[['id', 'name']], left_on='category_id', right_on='id', how='left') \
                            .rename(columns={'name': 'category_name'}).drop(columns=['id'])
 
-        col1, col2 = st.columns(2)
-        start_date = col1.date_input("📅 Dari tanggal", value=df_trans["date"].min())
-        end_date = col2.date_input("📅 Sampai tanggal", value=df_trans["date"].max())
-
         type_filter = st.multiselect("🔍 Jenis Transaksi", options=df_trans["type"].unique().tolist())
         wallet_filter = st.multiselect("💼 Dompet", options=df_trans["wallet_name"].unique().tolist())
 
-        filtered_df = df_trans[(df_trans["date"] >= start_date) & (df_trans["date"] <= end_date)]
+        filtered_df = df_trans
         if type_filter:
             filtered_df = filtered_df[filtered_df["type"].isin(type_filter)]
         if wallet_filter:
             filtered_df = filtered_df[filtered_df["wallet_name"].isin(wallet_filter)]
 
-        filtered_df["amount"] = filtered_df["amount"].apply(format_rupiah)
-        st.dataframe(filtered_df[["date", "wallet_name", "category_name", "amount", "type", "description"]])
-    else:
-        st.info("Tidak ada transaksi ditemukan.")
+        filtered_df["amount"] = money.from_minor(filtered_df["amount"])
+        st.dataframe(filtered_df[owner_cols + ["date", "wallet_name", "category_name", "amount", "type", "description"]],
+                     column_config={"amount": money.column("amount")})
+
+transactions_section(view_user_id, owner_labels)
 
 # =========================
 # UTANG / PIUTANG
 # =========================
-debts_data = supabase.table("debts").select("name, amount, type, description, due_date, created_at, status").eq("user_id", view_user_id).execute().data
-with st.expander("💳 Utang / Piutang", expanded=True):
-    if debts_data:
-        df_debts = pd.DataFrame(debts_data)
+@st.fragment
+def debts_section(view_user_id, owner_labels):
+    data, errors = db.load_concurrently(debt_jobs(view_user_id))
+    with st.expander("💳 Utang / Piutang", expanded=True):
+        if show_errors(errors, "view_debts"):
+            return
+        view_debts_df, owner_cols = with_owner(data["view_debts"], owner_labels)
+        if view_debts_df.empty:
+            st.info("Tidak ada data utang/piutang ditemukan.")
+            return
+
+        df_debts = view_debts_df[owner_cols + ["name", "amount", "type", "description", "due_date", "created_at", "status"]].copy()
         df_debts["created_at"] = pd.to_datetime(df_debts["created_at"], errors="coerce").dt.date
         df_debts["due_date"] = pd.to_datetime(df_debts["due_date"], errors="coerce").dt.date
 
@@ -201,10 +366,11 @@ with st.expander("💳 Utang / Piutang", expanded=True):
         if type_filter:
             filtered_debts = filtered_debts[filtered_debts["type"].isin(type_filter)]
 
-        filtered_debts["amount"] = filtered_debts["amount"].apply(format_rupiah)
-        st.dataframe(filtered_debts[["name", "amount", "type", "description", "status", "created_at", "due_date"]])
-    else:
-        st.info("Tidak ada data utang/piutang ditemukan.")
+        filtered_debts["amount"] = money.from_minor(filtered_debts["amount"])
+        st.dataframe(filtered_debts[owner_cols + ["name", "amount", "type", "description", "status", "created_at", "due_date"]],
+                     column_config={"amount": money.column("amount")})
+
+debts_section(view_user_id, owner_labels)
 
 # =========================
 # LOGOUT BUTTON
@@ -212,5 +378,11 @@ with st.expander("💳 Utang / Piutang", expanded=True):
 st.markdown("---")
 if st.button("🚪 Logout"):
     supabase.auth.sign_out()
+    sync_store.drop()
     st.session_state.user = None
     st.switch_page("app.py")
+
+# =========================
+# DEBUG QUERY (opsional)
+# =========================
+query_log.render_panel()
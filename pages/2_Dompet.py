@@ -1,6 +1,9 @@
 import streamlit as st
-from supabase_client import supabase
-import pandas as pd
+from datetime import date
+import data_access as db
+import money
+import offline
+import query_log
 
 st.set_page_config(page_title="Dompet", layout="wide")
 
@@ -21,23 +24,23 @@ with st.form("add_wallet_form"):
 
     if submitted:
         try:
-            supabase.table("wallets").insert({
+            db.insert("wallets", {
                 "user_id": user_id,
                 "name": name,
-                "balance": balance
-            }).execute()
+                "balance": money.decimal(money.minor(balance))
+            }, user_id)
             st.success("Dompet berhasil ditambahkan!")
             st.rerun()
         except Exception as e:
             st.error(f"Gagal menambahkan dompet: {e}")
 
 # --- Ambil Data Dompet ---
-wallets_data = supabase.table("wallets").select("*").eq("user_id", user_id).execute()
-wallets_df = pd.DataFrame(wallets_data.data)
+wallets_df = db.get_wallets(user_id)
 
 if not wallets_df.empty:
     st.subheader("Daftar Dompet")
-    st.dataframe(wallets_df[["name", "balance", "created_at"]])
+    st.dataframe(wallets_df.assign(balance=money.from_minor(wallets_df["balance"]))[["name", "balance", "created_at"]],
+                 column_config={"balance": money.column("balance")})
 
     # Buat mapping id → nama
     wallet_options = dict(zip(wallets_df["id"], wallets_df["name"]))
@@ -49,7 +52,7 @@ if not wallets_df.empty:
         format_func=lambda x: wallet_options[x]
     )
     if st.button("Hapus Dompet"):
-        supabase.table("wallets").delete().eq("id", delete_id).execute()
+        db.delete("wallets", delete_id, user_id, cascade=("transactions",))
         st.success(f"Dompet '{wallet_options[delete_id]}' berhasil dihapus!")
         st.rerun()
 
@@ -62,9 +65,55 @@ if not wallets_df.empty:
     )
     new_balance = st.number_input("Saldo Baru", min_value=0.0, step=1000.0)
     if st.button("Update Saldo"):
-        supabase.table("wallets").update({"balance": new_balance}).eq("id", update_id).execute()
+        # Dicatat sebagai entri koreksi di ledger, bukan menimpa saldo
+        db.set_wallet_balance(update_id, new_balance, user_id)
         st.success(f"Saldo dompet '{wallet_options[update_id]}' berhasil diupdate!")
         st.rerun()
+
+    # --- Riwayat Saldo ---
+    st.subheader("Saldo pada Tanggal")
+    col1, col2 = st.columns(2)
+    with col1:
+        history_id = st.selectbox(
+            "Pilih Dompet",
+            options=wallet_options.keys(),
+            format_func=lambda x: wallet_options[x],
+            key="history_wallet"
+        )
+    with col2:
+        history_date = st.date_input("Tanggal", value=date.today(), key="history_date")
+    if st.button("Lihat Saldo"):
+        saldo = db.get_wallet_balance_at(history_id, history_date)
+        st.info(f"Saldo '{wallet_options[history_id]}' pada {history_date:%d-%m-%Y}: {money.rupiah(saldo)}")
+
+    # --- Cek Selisih Saldo ---
+    st.subheader("Cek Selisih Saldo")
+    col1, col2 = st.columns(2)
+    with col1:
+        check = st.button("Cek Selisih Saldo")
+    with col2:
+        fix = st.button("Samakan Saldo dengan Ledger")
+    if fix:
+        db.reconcile_wallets(user_id, fix=True)
+        st.success("Saldo dompet disamakan dengan ledger.")
+    if check or fix:
+        drift_df = db.reconcile_wallets(user_id)
+        if drift_df.empty:
+            st.success("Semua saldo dompet sesuai dengan ledger.")
+        else:
+            drift_df["name"] = drift_df["wallet_id"].map(wallet_options)
+            st.warning(f"{len(drift_df)} dompet tidak sesuai dengan ledger.")
+            st.dataframe(drift_df.assign(
+                balance=money.from_minor(drift_df["balance"]),
+                ledger_balance=money.from_minor(drift_df["ledger_balance"]),
+                drift=money.from_minor(drift_df["drift"]),
+            )[["name", "balance", "ledger_balance", "drift"]])
 else:
     st.info("Belum ada dompet. Silakan tambahkan dompet terlebih dahulu.")
 
+
+# --- Status antrian offline (opsional) ---
+offline.render_status(user_id)
+
+# --- Debug query (opsional) ---
+query_log.render_panel()
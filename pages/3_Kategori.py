@@ -1,6 +1,9 @@
 import streamlit as st
-from supabase_client import supabase
 import pandas as pd
+import data_access as db
+import categorizer
+import offline
+import query_log
 from datetime import datetime
 
 st.set_page_config(page_title="Kategori", layout="wide")
@@ -16,8 +19,7 @@ user_id = st.session_state.user.id
 st.title("🏷️ Kelola Kategori")
 
 # --- Ambil data kategori ---
-categories_data = supabase.table("categories").select("*").eq("user_id", user_id).execute()
-categories_df = pd.DataFrame(categories_data.data)
+categories_df = db.get_categories(user_id)
 
 # --- Form Tambah Kategori ---
 with st.form("add_category_form"):
@@ -30,12 +32,12 @@ with st.form("add_category_form"):
             st.error("Nama kategori tidak boleh kosong.")
         else:
             try:
-                supabase.table("categories").insert({
+                db.insert("categories", {
                     "user_id": user_id,
                     "name": name.strip(),
                     "type": cat_type,
                     "created_at": datetime.utcnow().isoformat()
-                }).execute()
+                }, user_id)
                 st.success("Kategori berhasil ditambahkan!")
                 st.rerun()
             except Exception as e:
@@ -50,10 +52,76 @@ if not categories_df.empty:
     delete_id = st.selectbox("Pilih Kategori untuk Dihapus", categories_df["id"], format_func=lambda x: categories_df.loc[categories_df["id"] == x, "name"].iloc[0])
     if st.button("Hapus Kategori"):
         try:
-            supabase.table("categories").delete().eq("id", delete_id).execute()
+            db.delete("categories", delete_id, user_id, cascade=("transactions", "category_rules"))
             st.success("Kategori berhasil dihapus!")
             st.rerun()
         except Exception as e:
             st.error(f"Gagal menghapus kategori: {e}")
 else:
     st.info("Belum ada kategori. Silakan tambah kategori terlebih dahulu.")
+
+# --- Aturan Kategori Otomatis ---
+# Deskripsi transaksi baru & impor yang cocok dengan pola otomatis masuk
+# ke kategori tujuan; prioritas lebih tinggi menang kalau beberapa cocok.
+if not categories_df.empty:
+    st.subheader("🤖 Aturan Kategori Otomatis")
+    category_names = dict(zip(categories_df["id"], categories_df["name"] + " (" + categories_df["type"].astype(str) + ")"))
+
+    with st.form("add_rule_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            rule_category = st.selectbox("Kategori Tujuan", options=list(category_names), format_func=category_names.get)
+            rule_kind = st.selectbox("Jenis Pola", options=list(categorizer.KINDS), format_func=categorizer.KINDS.get)
+        with col2:
+            rule_pattern = st.text_input("Pola", placeholder="mis. grab, indomaret, ^(gaji|salary)")
+            rule_priority = st.number_input("Prioritas", value=0, step=1)
+        st.caption("Kata kunci: potongan teks, huruf besar/kecil diabaikan. "
+                   "Regex: pakai sintaks sederhana yang sama di Python & PostgreSQL "
+                   "(tanpa \\\\b; untuk batas kata pakai (^|\\\\W)kata(\\\\W|$)).")
+        if st.form_submit_button("Tambah Aturan"):
+            try:
+                db.insert("category_rules", {
+                    "user_id": user_id,
+                    "category_id": rule_category,
+                    "kind": rule_kind,
+                    "pattern": categorizer.validate(rule_kind, rule_pattern),
+                    "priority": int(rule_priority),
+                }, user_id)
+                st.success("Aturan berhasil ditambahkan!")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Gagal menambahkan aturan: {e}")
+
+    rules_df = db.get_category_rules(user_id).sort_values(["priority", "id"], ascending=[False, True])
+    if not rules_df.empty:
+        st.dataframe(pd.DataFrame({
+            "Prioritas": rules_df["priority"],
+            "Jenis": rules_df["kind"].map(categorizer.KINDS),
+            "Pola": rules_df["pattern"],
+            "Kategori": rules_df["category_id"].map(category_names),
+        }), hide_index=True)
+
+        rule_labels = dict(zip(rules_df["id"], rules_df["pattern"] + " → " + rules_df["category_id"].map(category_names).fillna("-")))
+        delete_rule = st.selectbox("Pilih Aturan untuk Dihapus", options=list(rule_labels), format_func=rule_labels.get)
+        if st.button("Hapus Aturan"):
+            db.delete("category_rules", delete_rule, user_id)
+            st.success("Aturan berhasil dihapus!")
+            st.rerun()
+
+        # Transaksi lama dikategorikan ulang di server dengan satu UPDATE (aturan
+        # berprioritas tertinggi yang cocok per transaksi)
+        only_uncategorized = st.checkbox("Hanya transaksi tanpa kategori", key="rules_only_uncategorized")
+        if st.button("Terapkan Aturan ke Transaksi Lama"):
+            try:
+                result_df = db.apply_category_rules(user_id, only_uncategorized)
+                st.success(f"{int(result_df['updated'].sum()):,} transaksi dikategorikan ulang.".replace(",", "."))
+            except Exception as e:
+                st.error(f"Gagal menerapkan aturan: {e}")
+    else:
+        st.info("Belum ada aturan.")
+
+# --- Status antrian offline (opsional) ---
+offline.render_status(user_id)
+
+# --- Debug query (opsional) ---
+query_log.render_panel()
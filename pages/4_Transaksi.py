@@ -1,15 +1,18 @@
 # pages/2_Transaksi.py
 import streamlit as st
-from supabase_client import supabase
 import pandas as pd
+import data_access as db
+import money
+import importer
+import categorizer
+import exporter
+import offline
+import query_log
+from supabase_client import get_client
 from datetime import date
 
 st.set_page_config(page_title="Transaksi", layout="wide")
 
-# --- Fungsi format Rupiah ---
-def format_rupiah(x):
-    return f"Rp {x:,.0f}".replace(",", ".")
-
 # Pastikan user login
 if "user" not in st.session_state or st.session_state.user is None:
     st.warning("Silakan login terlebih dahulu.")
@@ -19,11 +22,8 @@ user_id = st.session_state.user.id
 st.title("📜 Kelola Transaksi")
 
 # Ambil data dompet & kategori
-wallets_res = supabase.table("wallets").select("*").eq("user_id", user_id).execute()
-categories_res = supabase.table("categories").select("*").eq("user_id", user_id).execute()
-
-wallets_df = pd.DataFrame(wallets_res.data or [])
-categories_df = pd.DataFrame(categories_res.data or [])
+wallets_df = db.get_wallets(user_id)
+categories_df = db.get_categories(user_id)
 
 if wallets_df.empty:
     st.error("⚠️ Kamu belum punya dompet. Buat dompet dulu di halaman Dompet.")
@@ -36,20 +36,8 @@ if categories_df.empty:
 wallet_options = dict(zip(wallets_df["id"], wallets_df["name"]))
 category_options = dict(zip(categories_df["id"], categories_df["name"]))
 
-# --- Helper ---
-def get_wallet_balance_from_db(wid):
-    res = supabase.table("wallets").select("balance").eq("id", wid).single().execute()
-    data = res.data
-    if data and "balance" in data:
-        try:
-            return float(data["balance"])
-        except:
-            return 0.0
-    return 0.0
-
-def get_transaction_from_db(tid):
-    res = supabase.table("transactions").select("*").eq("id", tid).single().execute()
-    return res.data
+# Aturan kategori otomatis (dikelola di halaman Kategori)
+rules_matcher = categorizer.compile_rules(db.get_category_rules(user_id), categories_df)
 
 # --- Input Tambah Transaksi ---
 st.subheader("Tambah Transaksi")
@@ -71,10 +59,13 @@ trans_type = st.selectbox(
 if trans_type:
     filtered_categories = categories_df[categories_df["type"] == trans_type]
     category_options_filtered = dict(zip(filtered_categories["id"], filtered_categories["name"]))
+    # Pilihan kosong = kategori diisi otomatis dari deskripsi (kalau ada aturan
+    # yang cocok); kategori yang dipilih sendiri tidak pernah ditimpa aturan
     category_id = st.selectbox(
         "Pilih Kategori",
-        options=list(category_options_filtered.keys()),
-        format_func=lambda x: category_options_filtered[x],
+        options=[None] + list(category_options_filtered.keys()),
+        format_func=lambda x: category_options_filtered[x] if x is not None
+        else ("🤖 Otomatis dari deskripsi" if rules_matcher else "Pilih..."),
         key="category_id"
     )
 else:
@@ -85,35 +76,112 @@ amount = st.number_input("Jumlah", min_value=0.0, step=1000.0, key="amount")
 description = st.text_area("Deskripsi", key="description")
 trans_date = st.date_input("Tanggal", value=date.today(), key="trans_date")
 
+auto_category = None
+if category_id is None and rules_matcher and trans_type and description.strip():
+    auto_category = categorizer.categorize(rules_matcher, [description], [trans_type]).iloc[0]
+    if auto_category:
+        st.caption(f"Kategori otomatis: **{category_options[auto_category]}**")
+    else:
+        st.caption("Tidak ada aturan yang cocok, pilih kategori sendiri.")
+
 if st.button("Tambah Transaksi"):
+    if category_id is None:
+        category_id = auto_category
     if not trans_type or not category_id:
         st.error("Jenis transaksi dan kategori harus dipilih.")
     else:
         try:
-            payload = {
-                "user_id": user_id,
-                "wallet_id": wallet_id,
-                "category_id": category_id,
-                "amount": float(amount),
-                "type": trans_type,
-                "description": description,
-                "date": trans_date.isoformat()
-            }
-            supabase.table("transactions").insert(payload).execute()
-
-            wallet_balance = get_wallet_balance_from_db(wallet_id)
-            if trans_type == "pemasukan":
-                new_balance = wallet_balance + float(amount)
-            else:
-                new_balance = wallet_balance - float(amount)
-
-            supabase.table("wallets").update({"balance": new_balance}).eq("id", wallet_id).execute()
-
+            db.add_transaction(
+                user_id,
+                wallet_id=wallet_id,
+                category_id=category_id,
+                amount=amount,
+                type=trans_type,
+                description=description,
+                trans_date=trans_date,
+            )
             st.success("Transaksi berhasil ditambahkan!")
             st.rerun()
         except Exception as e:
             st.error(f"Gagal menambahkan transaksi: {e}")
 
+# --- Impor Massal ---
+with st.expander("📥 Impor CSV / OFX"):
+    st.caption(
+        "CSV: kolom `date, amount, type, wallet, category, description`. "
+        "`type` boleh kosong (amount negatif = pengeluaran). "
+        "`date`: tahun-bulan-hari atau hari/bulan/tahun. "
+        "OFX/QFX: semua transaksi masuk ke dompet yang dipilih."
+    )
+    import_file = st.file_uploader("File mutasi", type=["csv", "ofx", "qfx"], key="import_file")
+    import_wallet = st.selectbox(
+        "Dompet default (OFX / nama dompet tidak ditemukan)",
+        options=[None] + list(wallet_options.keys()),
+        format_func=lambda x: "Tidak ada" if x is None else wallet_options[x],
+        key="import_wallet"
+    )
+    default_categories = {}
+    col_in, col_out = st.columns(2)
+    for col, jenis in ((col_in, "pemasukan"), (col_out, "pengeluaran")):
+        opts = categories_df[categories_df["type"] == jenis]
+        opts = dict(zip(opts["id"], opts["name"]))
+        default_categories[jenis] = col.selectbox(
+            f"Kategori default {jenis}",
+            options=[None] + list(opts.keys()),
+            format_func=lambda x, opts=opts: "Tidak ada" if x is None else opts[x],
+            key=f"import_category_{jenis}"
+        )
+    number_format = st.selectbox("Format angka CSV", options=list(importer.NUMBER_FORMATS),
+                                 format_func=lambda x: importer.NUMBER_FORMATS[x][0], key="import_number_format")
+    batch_size = st.number_input("Baris per request", min_value=100, max_value=5000,
+                                 value=importer.BATCH_SIZE, step=100)
+
+    if st.button("Impor", disabled=import_file is None):
+        if import_file.name.lower().endswith((".ofx", ".qfx")):
+            chunks = [importer.read_ofx(import_file)]
+        else:
+            chunks = importer.read_csv_chunks(import_file)
+
+        progress = st.empty()
+        try:
+            imported, rejected_df = importer.import_transactions(
+                user_id,
+                chunks,
+                wallets_df,
+                categories_df,
+                default_wallet_id=import_wallet,
+                default_category_ids={k: v for k, v in default_categories.items() if v is not None},
+                matcher=rules_matcher,
+                number_format=number_format,
+                batch_size=int(batch_size),
+                progress=lambda n: progress.caption(f"{n:,} baris terimpor..."),
+            )
+            st.success(f"{imported:,} transaksi berhasil diimpor.")
+            if not rejected_df.empty:
+                st.warning(f"{len(rejected_df):,} baris dilewati.")
+                st.dataframe(rejected_df.head(1000), use_container_width=True)
+        except Exception as e:
+            st.error(f"Impor terhenti: {e}")
+
+# --- Cari Transaksi ---
+# Pencarian deskripsi di server (index trigram, toleran salah ketik)
+search_query = st.text_input("🔎 Cari deskripsi transaksi", key="trans_search")
+if search_query.strip():
+    found_df = db.search_transactions(user_id, search_query)
+    if found_df.empty:
+        st.info("Tidak ada transaksi yang cocok.")
+    else:
+        st.caption(f"{len(found_df)} hasil teratas, urut dari yang paling cocok")
+        st.dataframe(pd.DataFrame({
+            "Tanggal": found_df["date"].dt.date,
+            "Deskripsi": found_df["description"].fillna("-"),
+            "Dompet": found_df["wallet_id"].map(wallet_options),
+            "Kategori": found_df["category_id"].map(category_options),
+            "Jenis": found_df["type"],
+            "Jumlah": money.from_minor(found_df["amount"]),
+            "Skor": found_df["score"].round(2),
+        }), hide_index=True, use_container_width=True, column_config={"Jumlah": money.column("Jumlah")})
+
 # --- Filter Transaksi ---
 st.subheader("Filter Transaksi")
 month_filter = st.selectbox(
@@ -149,75 +217,119 @@ category_filter = st.selectbox(
     format_func=lambda x: category_filter_options[x] if x != "Semua" else "Semua"
 )
 
-# --- Ambil data transaksi ---
-query = supabase.table("transactions").select("*").eq("user_id", user_id)
-if type_filter != "Semua":
-    query = query.eq("type", type_filter)
-if wallet_filter != "Semua":
-    query = query.eq("wallet_id", wallet_filter)
-if category_filter != "Semua":
-    query = query.eq("category_id", category_filter)
+# --- Ambil data transaksi (per halaman) ---
+month_start, month_end = db.month_bounds(year_filter, month_filter)
+page_size = st.selectbox("Baris per halaman", options=[25, 50, 100, 200], index=1)
+filter_key = (month_start, type_filter, wallet_filter, category_filter, page_size)
+
+# Tumpukan kursor: elemen terakhir = kursor halaman yang sedang tampil
+if st.session_state.get("trans_filter_key") != filter_key:
+    st.session_state.trans_filter_key = filter_key
+    st.session_state.trans_cursors = [None]
+
+def load_page():
+    return db.get_transactions_page(
+        user_id,
+        start=month_start,
+        end=month_end,
+        type=None if type_filter == "Semua" else type_filter,
+        wallet_id=None if wallet_filter == "Semua" else wallet_filter,
+        category_id=None if category_filter == "Semua" else category_filter,
+        after=st.session_state.trans_cursors[-1],
+        page_size=page_size,
+    )
 
-transactions_res = query.order("date", desc=True).execute()
-transactions_df = pd.DataFrame(transactions_res.data or [])
 
-if not transactions_df.empty:
-    transactions_df["date"] = pd.to_datetime(transactions_df["date"])
-    transactions_df = transactions_df[
-        (transactions_df["date"].dt.month == month_filter) &
-        (transactions_df["date"].dt.year == year_filter)
-    ]
+transactions_df, next_cursor = load_page()
+# Halaman kosong setelah halaman pertama (mis. semua barisnya baru dihapus):
+# mundur ke halaman terakhir yang masih berisi
+while transactions_df.empty and len(st.session_state.trans_cursors) > 1:
+    st.session_state.trans_cursors.pop()
+    transactions_df, next_cursor = load_page()
+
+# --- Ringkasan bulan terpilih (dari rollup bulanan, bukan baris mentah) ---
+if wallet_filter == "Semua":
+    summary_df = db.get_monthly_summary(user_id, month_start, month_end, by_category=True)
+    if type_filter != "Semua":
+        summary_df = summary_df[summary_df["type"] == type_filter]
+    if category_filter != "Semua":
+        summary_df = summary_df[summary_df["category_id"] == category_filter]
+    totals = summary_df.groupby("type", observed=False)["total"].sum()
+    col_in, col_out, col_n = st.columns(3)
+    col_in.metric("Pemasukan", money.rupiah(totals.get("pemasukan", 0)))
+    col_out.metric("Pengeluaran", money.rupiah(totals.get("pengeluaran", 0)))
+    col_n.metric("Jumlah Transaksi", f"{int(summary_df['n'].sum()):,}".replace(",", "."))
 
 # --- Tampilkan Transaksi ---
 if not transactions_df.empty:
-    transactions_df["wallet_name"] = transactions_df["wallet_id"].map(wallet_options)
-    transactions_df["category_name"] = transactions_df["category_id"].map(category_options)
-    transactions_df = transactions_df.sort_values(by=["date", "created_at"], ascending=[False, False])
-
     st.subheader("📋 Daftar Transaksi")
 
-    for _, row in transactions_df.iterrows():
-        with st.container():
-            st.markdown(
-                f"""
-                <div style="border:1px solid #ddd; border-radius:8px; padding:10px; margin-bottom:10px;">
-                    <b>{row['description'] or '-'}</b> - {row['wallet_name']}<br>
-                    <b>{format_rupiah(row['amount'])}</b><br>
-                    <span style="color:{'green' if row['type']=='pemasukan' else 'red'};">
-                        {row['category_name']} ({row['type']})
-                    </span><br>
-                    <small>{row['date'].strftime('%Y-%m-%d')}</small>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+    display_df = pd.DataFrame({
+        "Tanggal": pd.to_datetime(transactions_df["date"]).dt.date,
+        "Deskripsi": transactions_df["description"].fillna("-"),
+        "Dompet": transactions_df["wallet_id"].map(wallet_options),
+        "Kategori": transactions_df["category_id"].map(category_options),
+        "Jenis": transactions_df["type"],
+        "Jumlah": money.from_minor(transactions_df["amount"]),
+    })
+    event = st.dataframe(
+        display_df,
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Jumlah": money.column("Jumlah")},
+        on_select="rerun",
+        selection_mode="multi-row",
+        key=f"trans_table_{len(st.session_state.trans_cursors)}",
+    )
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Sebelumnya", disabled=len(st.session_state.trans_cursors) == 1):
+            st.session_state.trans_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Halaman {len(st.session_state.trans_cursors)}")
+    with col_next:
+        if st.button("Berikutnya ➡️", disabled=next_cursor is None):
+            st.session_state.trans_cursors.append(next_cursor)
+            st.rerun()
 
-            # Tombol hapus langsung
-            if st.button("🗑️ Hapus", key=f"hapus_{row['id']}"):
-                try:
-                    trans = get_transaction_from_db(row["id"])
-                    if trans:
-                        wallet_balance = get_wallet_balance_from_db(trans["wallet_id"])
-                        amt = float(trans["amount"] or 0)
-
-                        # Kembalikan saldo
-                        if trans["type"] == "pemasukan":
-                            new_balance = wallet_balance - amt
-                        else:
-                            new_balance = wallet_balance + amt
-
-                        # Update saldo
-                        supabase.table("wallets").update(
-                            {"balance": new_balance}
-                        ).eq("id", trans["wallet_id"]).execute()
-
-                        # Hapus transaksi
-                        supabase.table("transactions").delete().eq("id", row["id"]).execute()
-
-                        st.success("Transaksi berhasil dihapus dan saldo dikembalikan.")
-                        st.rerun()
-
-                except Exception as e:
-                    st.error(f"Gagal menghapus transaksi: {e}")
+    selected_rows = event.selection.rows
+    if st.button(f"🗑️ Hapus ({len(selected_rows)}) transaksi terpilih", disabled=not selected_rows):
+        try:
+            for tid in transactions_df.iloc[selected_rows]["id"]:
+                db.delete_transaction(tid, user_id)
+            st.success("Transaksi berhasil dihapus dan saldo dikembalikan.")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Gagal menghapus transaksi: {e}")
 else:
     st.info("Belum ada transaksi.")
+
+# --- Ekspor Transaksi ---
+# Dibuat saat tombol unduh diklik, per chunk, tanpa memuat semua baris
+with st.expander("📤 Ekspor Transaksi"):
+    col1, col2 = st.columns(2)
+    with col1:
+        export_fmt = st.selectbox("Format", options=list(exporter.FORMATS),
+                                  format_func=lambda x: exporter.FORMATS[x][0], key="trans_export_fmt")
+    with col2:
+        export_range = st.radio("Rentang", options=["Bulan terpilih", "Semua"], horizontal=True,
+                                key="trans_export_range")
+    export_start, export_end = (month_start, month_end) if export_range == "Bulan terpilih" else (None, None)
+    session_client = get_client()
+    export_labels = {"wallet_id": wallet_options, "category_id": category_options}
+    st.download_button(
+        "⬇️ Unduh",
+        data=lambda: exporter.export_bytes(session_client, "transactions", user_id, export_fmt,
+                                           export_labels, export_start, export_end),
+        file_name=f"transaksi.{export_fmt}",
+        mime=exporter.FORMATS[export_fmt][1],
+        key="trans_export_download",
+    )
+
+# --- Status antrian offline (opsional) ---
+offline.render_status(user_id)
+
+# --- Debug query (opsional) ---
+query_log.render_panel()
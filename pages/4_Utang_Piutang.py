@@ -1,6 +1,10 @@
 import streamlit as st
-from supabase_client import supabase
 import pandas as pd
+import data_access as db
+import money
+import exporter
+import query_log
+from supabase_client import get_client
 from datetime import date
 
 # ===== CONFIGURASI DASAR =====
@@ -61,13 +65,13 @@ with st.container():
                 payload = {
                     "user_id": user_id,
                     "name": name,
-                    "amount": float(amount),
+                    "amount": money.decimal(money.minor(amount)),
                     "type": debt_type,
                     "description": description,
                     "due_date": due_date.isoformat(),
                     "status": "belum lunas"
                 }
-                supabase.table("debts").insert(payload).execute()
+                db.insert("debts", payload, user_id)
                 st.success("✅ Data berhasil ditambahkan!")
                 st.rerun()
             except Exception as e:
@@ -75,8 +79,7 @@ with st.container():
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ===== AMBIL DATA =====
-debts_res = supabase.table("debts").select("*").eq("user_id", user_id).order("due_date").execute()
-debts_df = pd.DataFrame(debts_res.data or [])
+debts_df = db.get_debts(user_id)
 
 if not debts_df.empty:
     debts_df["due_date"] = pd.to_datetime(debts_df["due_date"]).dt.date
@@ -86,7 +89,7 @@ if not debts_df.empty:
     col_f0, col_f1, col_f2, col_f3 = st.columns(4)
 
     with col_f0:
-        nama_filter = st.text_input("Cari Nama", "")
+        nama_filter = st.text_input("Cari Nama / Deskripsi", "")
 
     with col_f1:
         tahun_tersedia = sorted(list({d.year for d in debts_df["due_date"]}), reverse=True)
@@ -105,9 +108,13 @@ if not debts_df.empty:
     # ===== PROSES FILTER =====
     filtered_df = debts_df.copy()
 
-    # Filter nama (case-insensitive & partial match)
-    if nama_filter:
-        filtered_df = filtered_df[filtered_df["name"].str.contains(nama_filter, case=False, na=False)]
+    # Cari nama/deskripsi di server (index trigram, toleran salah ketik),
+    # hasil diurutkan dari yang paling cocok
+    if nama_filter.strip():
+        found = db.search_debts(user_id, nama_filter, limit=500)
+        rank = pd.Series(range(len(found)), index=found["id"])
+        filtered_df = filtered_df[filtered_df["id"].isin(rank.index)]
+        filtered_df = filtered_df.iloc[filtered_df["id"].map(rank).argsort()]
 
     if tahun_filter != "Semua":
         filtered_df = filtered_df[filtered_df["due_date"].apply(lambda d: d.year == tahun_filter)]
@@ -122,25 +129,44 @@ if not debts_df.empty:
         st.info("Tidak ada data sesuai filter.")
     else:
         df_display = filtered_df.copy()
-        df_display["amount"] = df_display["amount"].apply(lambda x: f"Rp {x:,.0f}".replace(",", "."))
+        df_display["amount"] = money.from_minor(df_display["amount"])
         
         # Tabel interaktif
-        st.dataframe(df_display[["name", "type", "amount", "due_date", "status", "description"]])
+        st.dataframe(df_display[["name", "type", "amount", "due_date", "status", "description"]],
+                     column_config={"amount": money.column("amount")})
 
         # ===== UPDATE STATUS =====
+        # Semua centang dikumpulkan di form, lalu disimpan sekaligus
         st.markdown("### ✏️ Update Status")
-        for _, row in filtered_df.iterrows():
-            status_check = st.checkbox(
-                f"{row['name']} ({row['amount']})",
-                value=(row["status"] == "lunas"),
-                key=f"status_{row['id']}"
+        with st.form("debt_status_form"):
+            status_df = pd.DataFrame({
+                "Nama": filtered_df["name"].values,
+                "Jenis": filtered_df["type"].values,
+                "Jumlah": money.from_minor(filtered_df["amount"]).values,
+                "Jatuh Tempo": filtered_df["due_date"].values,
+                "Lunas": (filtered_df["status"] == "lunas").values,
+            }, index=filtered_df["id"].values)
+            edited_df = st.data_editor(
+                status_df,
+                hide_index=True,
+                disabled=["Nama", "Jenis", "Jumlah", "Jatuh Tempo"],
+                column_config={"Jumlah": money.column("Jumlah")},
+                key="debt_status_editor",
             )
-            if status_check and row["status"] != "lunas":
-                supabase.table("debts").update({"status": "lunas"}).eq("id", row["id"]).execute()
-                st.rerun()
-            elif not status_check and row["status"] != "belum lunas":
-                supabase.table("debts").update({"status": "belum lunas"}).eq("id", row["id"]).execute()
-                st.rerun()
+            if st.form_submit_button("💾 Simpan Status"):
+                changed = edited_df["Lunas"] != status_df["Lunas"]
+                if changed.any():
+                    try:
+                        to_paid = edited_df.index[changed & edited_df["Lunas"]].tolist()
+                        to_unpaid = edited_df.index[changed & ~edited_df["Lunas"]].tolist()
+                        db.update_many("debts", {"status": "lunas"}, to_paid, user_id)
+                        db.update_many("debts", {"status": "belum lunas"}, to_unpaid, user_id)
+                        st.success(f"✅ {int(changed.sum())} status berhasil diupdate!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Gagal mengupdate status: {e}")
+                else:
+                    st.info("Tidak ada perubahan status.")
 
         # ===== HAPUS DATA =====
         st.markdown("### 🗑 Hapus Data")
@@ -150,8 +176,25 @@ if not debts_df.empty:
             format_func=lambda x: filtered_df.loc[filtered_df["id"] == x, "name"].values[0]
         )
         if st.button("Hapus Data"):
-            supabase.table("debts").delete().eq("id", selected_delete).execute()
+            db.delete("debts", selected_delete, user_id)
             st.success("✅ Data berhasil dihapus!")
             st.rerun()
+
+    # ===== EKSPOR =====
+    # Dibuat saat tombol unduh diklik, per chunk, tanpa memuat semua baris
+    st.markdown("### 📤 Ekspor")
+    export_fmt = st.selectbox("Format", options=list(exporter.FORMATS),
+                              format_func=lambda x: exporter.FORMATS[x][0], key="debt_export_fmt")
+    session_client = get_client()
+    st.download_button(
+        "⬇️ Unduh Utang & Piutang",
+        data=lambda: exporter.export_bytes(session_client, "debts", user_id, export_fmt),
+        file_name=f"utang_piutang.{export_fmt}",
+        mime=exporter.FORMATS[export_fmt][1],
+        key="debt_export_download",
+    )
 else:
     st.info("💡 Belum ada data utang/piutang.")
+
+# ===== DEBUG QUERY (opsional) =====
+query_log.render_panel()
@@ -0,0 +1,120 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import date
+import data_access as db
+import analytics
+import money
+import query_log
+
+st.set_page_config(page_title="Analitik", layout="wide")
+
+# Pastikan user sudah login
+if "user" not in st.session_state or st.session_state.user is None:
+    st.warning("Silakan login terlebih dahulu.")
+    st.switch_page("app.py")
+
+user_id = st.session_state.user.id
+
+st.title("📈 Analitik Keuangan")
+
+BUCKETS = {"day": "Harian", "week": "Mingguan", "month": "Bulanan"}
+COLORS = {"pemasukan": "green", "pengeluaran": "red"}
+
+# --- Rentang & resolusi ---
+# Default: 12 bulan terakhir, dimulai dari awal bulan supaya bisa memakai rollup
+today = date.today()
+col1, col2, col3 = st.columns(3)
+with col1:
+    start = st.date_input("Dari", value=date(today.year - 1, today.month, 1))
+with col2:
+    end = st.date_input("Sampai", value=today)
+with col3:
+    bucket = st.selectbox("Resolusi", options=list(BUCKETS), format_func=BUCKETS.get, index=2)
+
+if start >= end:
+    st.error("Tanggal awal harus sebelum tanggal akhir.")
+    st.stop()
+
+# Batas akhir eksklusif; dibulatkan ke awal bulan berikutnya untuk bucket
+# bulanan supaya RPC membaca rollup
+end_exclusive = pd.Timestamp(end) + pd.Timedelta(days=1)
+if bucket == "month":
+    end_exclusive = end_exclusive + pd.offsets.MonthBegin(0)
+    start = start.replace(day=1)
+end_exclusive = end_exclusive.date()
+
+# Bucket diperbesar kalau rentang terlalu panjang, sebelum data diambil:
+# garis maksimal MAX_LINE_POINTS titik, batang bertumpuk MAX_BARS
+line_bucket = analytics.fit_bucket(bucket, start, end_exclusive, analytics.MAX_LINE_POINTS)
+stack_bucket = analytics.fit_bucket(bucket, start, end_exclusive)
+
+# --- Ambil data (teragregasi di server, paralel) ---
+data, errors = db.load_concurrently({
+    "trend": lambda: db.get_transaction_series(user_id, start, end_exclusive, line_bucket, "type"),
+    "category": lambda: db.get_transaction_series(user_id, start, end_exclusive, stack_bucket, "category"),
+    "wallet": lambda: db.get_transaction_series(user_id, start, end_exclusive, line_bucket, "wallet"),
+    "categories": lambda: db.get_categories(user_id),
+    "wallets": lambda: db.get_wallets(user_id),
+})
+for name, message in errors.items():
+    st.error(f"Gagal memuat data ({name}): {message}")
+
+# --- Tren Pemasukan vs Pengeluaran ---
+st.subheader("Tren Pemasukan vs Pengeluaran")
+if line_bucket != bucket:
+    st.caption(f"Rentang panjang: garis ditampilkan {BUCKETS[line_bucket].lower()}.")
+trend_df = data.get("trend", pd.DataFrame())
+if trend_df.empty:
+    st.info("Belum ada transaksi pada rentang ini.")
+else:
+    trend_df = trend_df.groupby(["bucket", "type"], observed=True, as_index=False)["total"].sum()
+    trend_df["total"] = money.from_minor(trend_df["total"])
+    trend_df = analytics.downsample_lines(trend_df, "bucket", "total", "type")
+    fig = px.line(trend_df, x="bucket", y="total", color="type", color_discrete_map=COLORS,
+                  labels={"bucket": "Periode", "total": "Jumlah (Rp)", "type": "Jenis"})
+    fig.update_layout(hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+# --- Per Kategori (bertumpuk) ---
+st.subheader("Per Kategori")
+stack_type = st.radio("Jenis", options=["pengeluaran", "pemasukan"], horizontal=True)
+if stack_bucket != bucket:
+    st.caption(f"Rentang panjang: batang ditampilkan {BUCKETS[stack_bucket].lower()}.")
+category_df = data.get("category", pd.DataFrame())
+if not category_df.empty:
+    category_df = category_df[category_df["type"] == stack_type]
+if category_df.empty:
+    st.info(f"Belum ada {stack_type} pada rentang ini.")
+else:
+    categories_df = data.get("categories", pd.DataFrame(columns=["id", "name"]))
+    category_df = analytics.top_keys(category_df, dict(zip(categories_df["id"], categories_df["name"])))
+    category_df["total"] = money.from_minor(category_df["total"])
+    fig = px.bar(category_df, x="bucket", y="total", color="name",
+                 labels={"bucket": "Periode", "total": "Jumlah (Rp)", "name": "Kategori"})
+    fig.update_layout(barmode="stack", hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+# --- Per Dompet ---
+st.subheader("Arus Kas per Dompet")
+cumulative = st.checkbox("Kumulatif", value=True)
+wallet_df = data.get("wallet", pd.DataFrame())
+if wallet_df.empty:
+    st.info("Belum ada transaksi pada rentang ini.")
+else:
+    wallets_df = data.get("wallets", pd.DataFrame(columns=["id", "name"]))
+    signed = wallet_df["total"].where(wallet_df["type"] == "pemasukan", -wallet_df["total"])
+    wallet_df = wallet_df.assign(total=signed).groupby(["key", "bucket"], as_index=False)["total"].sum()
+    if cumulative:
+        wallet_df["total"] = wallet_df.groupby("key")["total"].cumsum()
+    wallet_df["name"] = wallet_df["key"].map(dict(zip(wallets_df["id"], wallets_df["name"]))).fillna("Tanpa dompet")
+    wallet_df["total"] = money.from_minor(wallet_df["total"])
+    wallet_df = analytics.downsample_lines(wallet_df, "bucket", "total", "name")
+    fig = px.line(wallet_df, x="bucket", y="total", color="name",
+                  labels={"bucket": "Periode", "total": "Arus kas bersih (Rp)", "name": "Dompet"})
+    fig.update_layout(hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# --- Debug query (opsional) ---
+query_log.render_panel()
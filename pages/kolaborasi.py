@@ -2,6 +2,8 @@
 import streamlit as st
 from supabase_client import supabase
 from datetime import datetime
+import access
+import query_log
 
 st.set_page_config(page_title="Kolaborasi", layout="wide")
 
@@ -29,14 +31,9 @@ if st.button("Kirim Permintaan Akses"):
     elif invite_email_norm == user_email:
         st.error("Tidak bisa meminta akses ke akun sendiri.")
     else:
-        # Cek apakah sudah ada permintaan yang sama (berdasarkan owner_email & collab_id)
-        check = supabase.table("collaborations") \
-            .select("*") \
-            .eq("owner_email", invite_email_norm) \
-            .eq("collab_id", user_id) \
-            .execute()
-
-        if check.data and len(check.data) > 0:
+        # Cek apakah sudah ada permintaan yang sama (dari cache graf akses)
+        sent = access.outgoing(user)
+        if (sent["owner_email"] == invite_email_norm).any():
             st.info("Permintaan akses sudah pernah dikirim.")
         else:
             supabase.table("collaborations").insert({
@@ -47,6 +44,7 @@ if st.button("Kirim Permintaan Akses"):
                 "status": "pending",
                 "created_at": datetime.utcnow().isoformat()
             }).execute()
+            access.invalidate([user_id], [invite_email_norm])
             st.success("Permintaan akses terkirim. Tunggu pasangan menerima.")
 
 st.divider()
@@ -55,18 +53,14 @@ st.divider()
 # Bagian: Permintaan yang dikirim (outgoing)
 # ---------------------------
 st.subheader("Permintaan yang Anda Kirim")
-outgoing = supabase.table("collaborations") \
-    .select("*") \
-    .eq("collab_id", user_id) \
-    .order("created_at", desc=True) \
-    .execute()
-
-if outgoing.data:
-    for row in outgoing.data:
+outgoing = access.outgoing(user).to_dict("records")
+if outgoing:
+    for row in outgoing:
         st.markdown(f"- **Ke:** {row.get('owner_email')}  — **Status:** {row.get('status')}")
         if row.get('status') == 'pending':
             if st.button(f"Batalkan {row['id']}", key=f"cancel-{row['id']}"):
                 supabase.table("collaborations").delete().eq("id", row['id']).execute()
+                access.invalidate([user_id], [row.get("owner_email")])
                 st.success("Permintaan dibatalkan.")
                 st.rerun()
 else:
@@ -79,15 +73,9 @@ st.divider()
 # ---------------------------
 st.subheader("Permintaan Masuk untuk Anda")
 # Cari berdasarkan owner_email karena owner_id mungkin kosong sebelum owner terima
-incoming = supabase.table("collaborations") \
-    .select("*") \
-    .eq("owner_email", user_email) \
-    .eq("status", "pending") \
-    .order("created_at", desc=True) \
-    .execute()
-
-if incoming.data:
-    for row in incoming.data:
+incoming = access.incoming(user).to_dict("records")
+if incoming:
+    for row in incoming:
         st.markdown(f"**Dari:** {row.get('requester_email')}  — Dikirim: {row.get('created_at')}")
         col1, col2 = st.columns(2)
         with col1:
@@ -98,14 +86,21 @@ if incoming.data:
                     "owner_id": user_id,   # now owner_id terisi
                     "owner_email": user_email  # normalize owner_email
                 }).eq("id", row['id']).execute()
+                access.invalidate([user_id, row["collab_id"]], [user_email])
                 st.success("Permintaan diterima. Pengirim sekarang punya akses baca ke akun Anda.")
-                st.experimental_rerun()
+                st.rerun()
         with col2:
             if st.button(f"Tolak-{row['id']}", key=f"reject-{row['id']}"):
                 supabase.table("collaborations").update({
                     "status": "rejected"
                 }).eq("id", row['id']).execute()
+                access.invalidate([user_id, row["collab_id"]], [user_email])
                 st.success("Permintaan ditolak.")
-                st.experimental_rerun()
+                st.rerun()
 else:
     st.info("Tidak ada permintaan masuk.")
+
+# ---------------------------
+# Debug query (opsional)
+# ---------------------------
+query_log.render_panel()
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+import pandas as pd
+import streamlit as st
+
+# =========================
+# INSTRUMENTASI QUERY SUPABASE
+# =========================
+# Aktif kalau FINAPP_QUERY_LOG=1 atau URL memuat ?debug=1. Setiap execute()
+# lewat `supabase_client.supabase` dicatat (target, filter, latensi, jumlah
+# baris, ukuran payload), dikelompokkan per rerun, ditulis sebagai log JSON
+# ke logger "finapp.queries" dan ditampilkan di panel sidebar.
+ENV_FLAG = "FINAPP_QUERY_LOG"
+N_PLUS_ONE_THRESHOLD = 3  # query berbentuk sama lebih dari ini per rerun
+
+ACTIONS = ("select", "insert", "update", "upsert", "delete")
+COLUMN_FILTERS = ("eq", "neq", "gt", "gte", "lt", "lte", "in_", "is_")
+
+logger = logging.getLogger("finapp.queries")
+
+
+def enabled():
+    if os.getenv(ENV_FLAG, "0") == "1":
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def _state():
+    if "_query_log" not in st.session_state:
+        st.session_state._query_log = {"rerun": 1, "entries": []}
+    return st.session_state._query_log
+
+
+def _short(value, limit=40):
+    text = str(value)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class _TracedQuery:
+    # Membungkus builder postgrest: setiap pemanggilan method dicatat,
+    # execute() diukur.
+    def __init__(self, inner, kind, target):
+        self._inner = inner
+        self._kind = kind
+        self._target = target
+        self._calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name != "execute":
+                self._calls.append((name, args))
+            if hasattr(result, "execute"):
+                self._inner = result
+                return self
+            return result
+
+        return call
+
+    def execute(self):
+        start = time.perf_counter()
+        error = None
+        try:
+            res = self._inner.execute()
+            return res
+        except Exception as e:
+            res = None
+            error = str(e)
+            raise
+        finally:
+            self._record(time.perf_counter() - start, res, error)
+
+    def _record(self, seconds, res, error):
+        data = getattr(res, "data", None)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        action = next((n for n, _ in self._calls if n in ACTIONS), "select")
+        filter_calls = [(n, args) for n, args in self._calls if n not in ACTIONS]
+        filters = [f"{n}({', '.join(_short(a) for a in args)})" for n, args in filter_calls]
+        # Bentuk query tanpa nilai filter, untuk mendeteksi pola N+1
+        columns = sorted(f"{n}:{args[0]}" for n, args in filter_calls if n in COLUMN_FILTERS and args)
+        state = _state()
+        entry = {
+            "rerun": state["rerun"],
+            "kind": self._kind,
+            "target": self._target,
+            "action": "rpc" if self._kind == "rpc" else action,
+            "filters": filters,
+            "shape": f"{self._target}:{action}:{','.join(columns)}",
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "bytes": len(json.dumps(data, default=str)) if data is not None else 0,
+            "error": error,
+        }
+        state["entries"].append(entry)
+        logger.info(json.dumps(entry))
+
+
+def trace_table(builder, table):
+    return _TracedQuery(builder, "table", table) if enabled() else builder
+
+
+def trace_rpc(builder, name):
+    return _TracedQuery(builder, "rpc", name) if enabled() else builder
+
+
+def render_panel():
+    # Panel sidebar: query sejak panel terakhir dirender (= satu rerun,
+    # termasuk write + st.rerun() sebelumnya). Dipanggil di akhir halaman.
+    if not enabled():
+        return
+    state = _state()
+    entries, state["entries"] = state["entries"], []
+    state["rerun"] += 1
+
+    with st.sidebar.expander(f"🐞 Query rerun ini ({len(entries)})", expanded=False):
+        if not entries:
+            st.caption("Tidak ada query ke Supabase.")
+            return
+        df = pd.DataFrame(entries)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Total ms", f"{df['ms'].sum():,.0f}")
+        c2.metric("Baris", f"{df['rows'].sum():,}")
+        c3.metric("KiB", f"{df['bytes'].sum() / 1024:,.1f}")
+
+        repeated = {shape: n for shape, n in Counter(df["shape"]).items() if n > N_PLUS_ONE_THRESHOLD}
+        for shape, n in repeated.items():
+            st.warning(f"Kemungkinan N+1: `{shape}` dipanggil {n}x")
+
+        df["filters"] = df["filters"].str.join(" ")
+        st.dataframe(
+            df[["target", "action", "filters", "ms", "rows", "bytes", "error"]],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.download_button(
+            "Unduh JSON",
+            data="\n".join(json.dumps(e) for e in entries),
+            file_name="query_log.jsonl",
+            mime="application/json",
+        )
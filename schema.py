@@ -0,0 +1,181 @@
+import pandas as pd
+
+import money
+
+# =========================
+# SKEMA TABEL
+# =========================
+# Satu tempat untuk kolom tiap tabel/view dan dtype-nya di pandas:
+# - amount  -> int64 satuan terkecil (sen), lihat money.py
+# - date    -> datetime64[ns] (tanpa jam)
+# - ts      -> datetime64[ns, UTC]
+# - enum    -> category dengan kategori tetap (concat antar-delta tetap category)
+# - int/float -> int64 / float32 (hitungan, skor)
+# - text/id -> apa adanya
+
+TRANSACTION_TYPES = pd.CategoricalDtype(["pemasukan", "pengeluaran"])
+DEBT_TYPES = pd.CategoricalDtype(["utang", "piutang"])
+DEBT_STATUSES = pd.CategoricalDtype(["belum lunas", "lunas"])
+COLLAB_STATUSES = pd.CategoricalDtype(["pending", "accepted", "rejected"])
+
+TABLES = {
+    "wallets": {
+        "id": "id",
+        "user_id": "id",
+        "name": "text",
+        "balance": "amount",
+        "created_at": "ts",
+        "updated_at": "ts",
+    },
+    "categories": {
+        "id": "id",
+        "user_id": "id",
+        "name": "text",
+        "type": TRANSACTION_TYPES,
+        "created_at": "ts",
+    },
+    "transactions": {
+        "id": "id",
+        "user_id": "id",
+        "wallet_id": "id",
+        "category_id": "id",
+        "amount": "amount",
+        "type": TRANSACTION_TYPES,
+        "description": "text",
+        "date": "date",
+        "created_at": "ts",
+        "updated_at": "ts",
+    },
+    "debts": {
+        "id": "id",
+        "user_id": "id",
+        "name": "text",
+        "amount": "amount",
+        "type": DEBT_TYPES,
+        "description": "text",
+        "due_date": "date",
+        "status": DEBT_STATUSES,
+        "created_at": "ts",
+        "updated_at": "ts",
+    },
+    "category_rules": {
+        "id": "id",
+        "user_id": "id",
+        "category_id": "id",
+        "kind": "text",
+        "pattern": "text",
+        "priority": "int",
+        "created_at": "ts",
+    },
+    "collaborations": {
+        "id": "id",
+        "owner_id": "id",
+        "collab_id": "id",
+        "owner_email": "text",
+        "requester_email": "text",
+        "status": COLLAB_STATUSES,
+        "created_at": "ts",
+    },
+    # Hasil RPC
+    "monthly_summary": {
+        "month": "date",
+        "type": TRANSACTION_TYPES,
+        "category_id": "id",
+        "total": "amount",
+        "n": "int",
+    },
+    "transaction_series": {
+        "bucket": "date",
+        "type": TRANSACTION_TYPES,
+        "key": "id",
+        "total": "amount",
+        "n": "int",
+    },
+    "transaction_search": {
+        "id": "id",
+        "wallet_id": "id",
+        "category_id": "id",
+        "amount": "amount",
+        "type": TRANSACTION_TYPES,
+        "description": "text",
+        "date": "date",
+        "score": "float",
+    },
+    "debt_search": {
+        "id": "id",
+        "name": "text",
+        "amount": "amount",
+        "type": DEBT_TYPES,
+        "description": "text",
+        "due_date": "date",
+        "status": DEBT_STATUSES,
+        "score": "float",
+    },
+    "category_rule_results": {
+        "rule_id": "id",
+        "updated": "int",
+    },
+    "wallet_drift": {
+        "wallet_id": "id",
+        "user_id": "id",
+        "balance": "amount",
+        "ledger_balance": "amount",
+        "drift": "amount",
+    },
+}
+
+# Kolom yang diambil per kebutuhan. user_id tidak ikut kalau sudah jadi filter.
+VIEWS = {
+    "wallets": ["id", "name", "balance", "created_at", "updated_at"],
+    "categories": ["id", "name", "type", "created_at"],
+    "transactions": ["id", "wallet_id", "category_id", "amount", "type", "description", "date",
+                     "created_at", "updated_at"],
+    "debts": ["id", "name", "amount", "type", "description", "due_date", "status", "created_at", "updated_at"],
+    "category_rules": ["id", "category_id", "kind", "pattern", "priority", "created_at"],
+    "collaborations": ["id", "owner_id", "collab_id", "owner_email", "requester_email", "status", "created_at"],
+}
+
+
+def columns(view):
+    # String untuk .select(...)
+    return ", ".join(VIEWS[view])
+
+
+def keyset_after(columns, values, desc=False):
+    # Filter .or_(...) untuk baris sesudah kursor pada urutan keyset:
+    # (a, b, c) > (x, y, z), atau < kalau urutannya menurun
+    op = "lt" if desc else "gt"
+    quoted = [f'"{v}"' for v in values]
+    clauses = []
+    for k, col in enumerate(columns):
+        parts = [f"{c}.eq.{v}" for c, v in zip(columns[:k], quoted[:k])] + [f"{col}.{op}.{quoted[k]}"]
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(clauses)
+
+
+def _convert(series, kind):
+    if isinstance(kind, pd.CategoricalDtype):
+        return series.astype(kind)
+    if kind == "amount":
+        return money.to_minor(series)
+    if kind == "date":
+        return pd.to_datetime(series, errors="coerce").dt.normalize()
+    if kind == "ts":
+        return pd.to_datetime(series, errors="coerce", utc=True, format="ISO8601")
+    if kind == "int":
+        return pd.to_numeric(series, errors="coerce").fillna(0).astype("int64")
+    if kind == "float":
+        return pd.to_numeric(series, errors="coerce").astype("float32")
+    return series
+
+
+def to_frame(table, rows, view=None):
+    # List of dict dari Supabase -> DataFrame dengan dtype ringkas
+    spec = TABLES[table]
+    cols = VIEWS.get(view or table, list(spec))
+    df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=cols)
+    for col in df.columns:
+        kind = spec.get(col)
+        if kind is not None:
+            df[col] = _convert(df[col], kind)
+    return df
@@ -0,0 +1,34 @@
+-- Ringkasan pemasukan/pengeluaran per user, bulan, jenis (dan opsional kategori),
+-- dihitung di server supaya dashboard tidak menarik seluruh riwayat transaksi.
+
+create index if not exists transactions_user_date_idx
+    on public.transactions (user_id, date);
+
+create or replace function public.monthly_summary(
+    p_user_id public.transactions.user_id%type,
+    p_start date,
+    p_end date,
+    p_by_category boolean default false
+)
+returns table (
+    month date,
+    type public.transactions.type%type,
+    category_id public.transactions.category_id%type,
+    total numeric,
+    n bigint
+)
+language sql
+stable
+as $$
+    select date_trunc('month', t.date)::date as month,
+           t.type,
+           case when p_by_category then t.category_id end as category_id,
+           sum(t.amount)::numeric as total,
+           count(*) as n
+    from public.transactions t
+    where t.user_id = p_user_id
+      and t.date >= p_start
+      and t.date < p_end
+    group by 1, 2, 3
+    order by 1, 2, 3;
+$$;
@@ -0,0 +1,64 @@
+-- Tambah / hapus transaksi sekaligus menyesuaikan saldo dompet dalam satu
+-- panggilan. `balance = balance + delta` di dalam satu transaksi database
+-- mengunci baris dompet, jadi dua tab/kolaborator tidak saling menimpa.
+
+create or replace function public.record_transaction(
+    p_user_id public.transactions.user_id%type,
+    p_wallet_id public.transactions.wallet_id%type,
+    p_category_id public.transactions.category_id%type,
+    p_amount public.transactions.amount%type,
+    p_type public.transactions.type%type,
+    p_description public.transactions.description%type,
+    p_date public.transactions.date%type
+)
+returns public.transactions
+language plpgsql
+as $$
+declare
+    v_row public.transactions;
+begin
+    if p_type not in ('pemasukan', 'pengeluaran') then
+        raise exception 'Jenis transaksi tidak valid: %', p_type;
+    end if;
+
+    insert into public.transactions (user_id, wallet_id, category_id, amount, type, description, date)
+    values (p_user_id, p_wallet_id, p_category_id, p_amount, p_type, p_description, p_date)
+    returning * into v_row;
+
+    update public.wallets
+    set balance = balance + case when p_type = 'pemasukan' then p_amount else -p_amount end
+    where id = p_wallet_id and user_id = p_user_id;
+
+    if not found then
+        raise exception 'Dompet % tidak ditemukan', p_wallet_id;
+    end if;
+
+    return v_row;
+end;
+$$;
+
+create or replace function public.delete_transaction(
+    p_id public.transactions.id%type
+)
+returns public.transactions
+language plpgsql
+as $$
+declare
+    v_row public.transactions;
+begin
+    delete from public.transactions
+    where id = p_id
+    returning * into v_row;
+
+    if not found then
+        raise exception 'Transaksi % tidak ditemukan', p_id;
+    end if;
+
+    -- Kembalikan saldo
+    update public.wallets
+    set balance = balance - case when v_row.type = 'pemasukan' then v_row.amount else -v_row.amount end
+    where id = v_row.wallet_id;
+
+    return v_row;
+end;
+$$;
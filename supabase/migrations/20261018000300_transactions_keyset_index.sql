@@ -0,0 +1,4 @@
+-- Index untuk keyset pagination daftar transaksi:
+-- where user_id = ? [and date range] order by date desc, created_at desc, id desc
+create index if not exists transactions_user_keyset_idx
+    on public.transactions (user_id, date desc, created_at desc, id desc);
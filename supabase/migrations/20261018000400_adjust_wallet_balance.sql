@@ -0,0 +1,23 @@
+-- Penyesuaian saldo atomik (dipakai impor massal: satu panggilan per dompet).
+create or replace function public.adjust_wallet_balance(
+    p_wallet_id public.wallets.id%type,
+    p_delta numeric
+)
+returns public.wallets
+language plpgsql
+as $$
+declare
+    v_row public.wallets;
+begin
+    update public.wallets
+    set balance = balance + p_delta
+    where id = p_wallet_id
+    returning * into v_row;
+
+    if not found then
+        raise exception 'Dompet % tidak ditemukan', p_wallet_id;
+    end if;
+
+    return v_row;
+end;
+$$;
@@ -0,0 +1,84 @@
+-- Delta sync: updated_at pada tabel yang disinkronkan + tombstone untuk delete.
+-- Klien menyimpan snapshot per user dan hanya meminta baris dengan
+-- updated_at / deleted_at setelah high-water mark terakhir.
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+create table if not exists public.deleted_rows (
+    id bigint generated always as identity primary key,
+    table_name text not null,
+    row_id text not null,
+    user_id uuid not null,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists deleted_rows_sync_idx
+    on public.deleted_rows (user_id, table_name, deleted_at);
+
+create or replace function public.record_tombstone()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.deleted_rows (table_name, row_id, user_id)
+    values (tg_table_name, old.id::text, old.user_id);
+    return old;
+end;
+$$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['transactions', 'debts', 'wallets'] loop
+        execute format('alter table public.%I add column if not exists updated_at timestamptz not null default now()', t);
+        execute format('create index if not exists %I on public.%I (user_id, updated_at)', t || '_user_updated_idx', t);
+        execute format('drop trigger if exists touch_updated_at on public.%I', t);
+        execute format('create trigger touch_updated_at before update on public.%I
+                        for each row execute function public.touch_updated_at()', t);
+        execute format('drop trigger if exists record_tombstone on public.%I', t);
+        execute format('create trigger record_tombstone after delete on public.%I
+                        for each row execute function public.record_tombstone()', t);
+    end loop;
+end;
+$$;
+
+-- Pemilik data dan kolaborator yang sudah diterima boleh membaca tombstone
+alter table public.deleted_rows enable row level security;
+
+drop policy if exists "deleted_rows_read" on public.deleted_rows;
+create policy "deleted_rows_read" on public.deleted_rows
+    for select
+    using (
+        user_id = auth.uid()
+        or exists (
+            select 1 from public.collaborations c
+            where c.owner_id = deleted_rows.user_id
+              and c.collab_id = auth.uid()
+              and c.status = 'accepted'
+        )
+    );
+
+-- Tombstone lama boleh dibuang berkala; snapshot klien yang lebih tua dari
+-- retensi ini harus dimuat ulang penuh (lihat SNAPSHOT_MAX_AGE di sync_store.py).
+create or replace function public.prune_deleted_rows(p_keep interval default interval '7 days')
+returns bigint
+language sql
+as $$
+    with gone as (
+        delete from public.deleted_rows
+        where deleted_at < now() - p_keep
+        returning 1
+    )
+    select count(*) from gone;
+$$;
@@ -0,0 +1,520 @@
+-- Ledger saldo dompet (append-only) + checkpoint berkala.
+--
+-- Setiap perubahan saldo adalah satu baris wallet_ledger (amount bertanda).
+-- wallets.balance tetap ada sebagai saldo berjalan yang dimaterialisasi dan
+-- hanya diubah oleh trigger ledger. Saldo pada tanggal D =
+-- checkpoint terakhir (as_of <= D) + entri setelah checkpoint tersebut.
+--
+-- Entri 'saldo_awal' mencatat saldo yang sudah ada di wallets.balance
+-- (saat dompet dibuat / backfill) sehingga tidak mengubah saldo lagi.
+
+do $$
+declare
+    v_wallet_id_type text;
+    v_transaction_id_type text;
+begin
+    select format_type(atttypid, atttypmod) into v_wallet_id_type
+    from pg_attribute where attrelid = 'public.wallets'::regclass and attname = 'id';
+    select format_type(atttypid, atttypmod) into v_transaction_id_type
+    from pg_attribute where attrelid = 'public.transactions'::regclass and attname = 'id';
+
+    execute format($sql$
+        create table if not exists public.wallet_ledger (
+            id bigint generated always as identity primary key,
+            wallet_id %1$s not null references public.wallets (id) on delete cascade,
+            user_id uuid not null,
+            transaction_id %2$s,
+            kind text not null check (kind in ('saldo_awal', 'transaksi', 'pembatalan', 'koreksi')),
+            amount numeric not null,
+            occurred_on date not null default current_date,
+            note text,
+            created_at timestamptz not null default now()
+        )
+    $sql$, v_wallet_id_type, v_transaction_id_type);
+
+    execute format($sql$
+        create table if not exists public.wallet_checkpoints (
+            wallet_id %1$s not null references public.wallets (id) on delete cascade,
+            as_of date not null,
+            balance numeric not null,
+            ledger_id bigint not null,
+            created_at timestamptz not null default now(),
+            primary key (wallet_id, as_of)
+        )
+    $sql$, v_wallet_id_type);
+end;
+$$;
+
+create index if not exists wallet_ledger_wallet_date_idx on public.wallet_ledger (wallet_id, occurred_on);
+create index if not exists wallet_ledger_wallet_id_idx on public.wallet_ledger (wallet_id, id);
+
+-- ---------------------------------------------------------------------------
+-- Backfill sekali (sebelum trigger dibuat): satu entri per transaksi yang ada
+-- + saldo_awal = selisih saldo sekarang dengan jumlah transaksi.
+-- ---------------------------------------------------------------------------
+do $$
+begin
+    if exists (select 1 from public.wallet_ledger) then
+        return;
+    end if;
+
+    insert into public.wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on, created_at)
+    select t.wallet_id, t.user_id, t.id, 'transaksi',
+           case when t.type = 'pemasukan' then t.amount else -t.amount end,
+           t.date, t.created_at
+    from public.transactions t
+    join public.wallets w on w.id = t.wallet_id;
+
+    insert into public.wallet_ledger (wallet_id, user_id, kind, amount, occurred_on, created_at)
+    select w.id, w.user_id, 'saldo_awal',
+           w.balance - coalesce(s.total, 0),
+           least(w.created_at::date, coalesce(s.first_date, w.created_at::date)),
+           w.created_at
+    from public.wallets w
+    left join (
+        select wallet_id,
+               sum(case when type = 'pemasukan' then amount else -amount end) as total,
+               min(date) as first_date
+        from public.transactions
+        group by wallet_id
+    ) s on s.wallet_id = w.id;
+end;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Trigger: ledger -> wallets.balance (per statement, satu update per dompet)
+-- ---------------------------------------------------------------------------
+create or replace function public.apply_ledger_entries()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    update public.wallets w
+    set balance = w.balance + d.delta
+    from (
+        select wallet_id, sum(amount) as delta
+        from new_entries
+        where kind <> 'saldo_awal'
+        group by wallet_id
+    ) d
+    where w.id = d.wallet_id;
+    return null;
+end;
+$$;
+
+create or replace function public.forbid_ledger_update()
+returns trigger
+language plpgsql
+as $$
+begin
+    raise exception 'wallet_ledger bersifat append-only; catat koreksi sebagai entri baru';
+end;
+$$;
+
+drop trigger if exists apply_ledger_entries on public.wallet_ledger;
+create trigger apply_ledger_entries
+    after insert on public.wallet_ledger
+    referencing new table as new_entries
+    for each statement execute function public.apply_ledger_entries();
+
+drop trigger if exists forbid_ledger_update on public.wallet_ledger;
+create trigger forbid_ledger_update
+    before update on public.wallet_ledger
+    for each row execute function public.forbid_ledger_update();
+
+-- ---------------------------------------------------------------------------
+-- Trigger: transactions -> ledger (per statement, cocok untuk insert massal)
+-- ---------------------------------------------------------------------------
+create or replace function public.ledger_transactions_insert()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    -- Dompet harus milik user transaksi: trigger ini security definer, jadi
+    -- tanpa cek ini saldo dompet user lain bisa diubah
+    if exists (
+        select 1 from new_rows n
+        where n.wallet_id is not null
+          and not exists (select 1 from public.wallets w where w.id = n.wallet_id and w.user_id = n.user_id)
+    ) then
+        raise exception 'Dompet transaksi tidak ditemukan';
+    end if;
+
+    insert into public.wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    select n.wallet_id, n.user_id, n.id, 'transaksi',
+           case when n.type = 'pemasukan' then n.amount else -n.amount end,
+           n.date
+    from new_rows n
+    where n.wallet_id is not null;
+    return null;
+end;
+$$;
+
+create or replace function public.ledger_transactions_delete()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    -- Dompet yang ikut terhapus (cascade) tidak perlu entri pembatalan;
+    -- dompet milik user lain tidak pernah disentuh
+    insert into public.wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    select o.wallet_id, o.user_id, o.id, 'pembatalan',
+           case when o.type = 'pemasukan' then -o.amount else o.amount end,
+           o.date
+    from old_rows o
+    join public.wallets w on w.id = o.wallet_id and w.user_id = o.user_id;
+    return null;
+end;
+$$;
+
+create or replace function public.ledger_transactions_update()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    -- Dompet harus milik user transaksi: trigger ini security definer, jadi
+    -- tanpa cek ini saldo dompet user lain bisa diubah
+    if exists (
+        select 1 from new_rows n
+        where n.wallet_id is not null
+          and not exists (select 1 from public.wallets w where w.id = n.wallet_id and w.user_id = n.user_id)
+    ) then
+        raise exception 'Dompet transaksi tidak ditemukan';
+    end if;
+
+    insert into public.wallet_ledger (wallet_id, user_id, transaction_id, kind, amount, occurred_on)
+    select o.wallet_id, o.user_id, o.id, 'pembatalan',
+           case when o.type = 'pemasukan' then -o.amount else o.amount end,
+           o.date
+    from old_rows o
+    join new_rows n on n.id = o.id
+    join public.wallets w on w.id = o.wallet_id and w.user_id = o.user_id
+    where (o.wallet_id, o.amount, o.type, o.date) is distinct from (n.wallet_id, n.amount, n.type, n.date)
+    union all
+    select n.wallet_id, n.user_id, n.id, 'transaksi',
+           case when n.type = 'pemasukan' then n.amount else -n.amount end,
+           n.date
+    from new_rows n
+    join old_rows o on o.id = n.id
+    where (o.wallet_id, o.amount, o.type, o.date) is distinct from (n.wallet_id, n.amount, n.type, n.date)
+      and n.wallet_id is not null;
+    return null;
+end;
+$$;
+
+drop trigger if exists ledger_transactions_insert on public.transactions;
+create trigger ledger_transactions_insert
+    after insert on public.transactions
+    referencing new table as new_rows
+    for each statement execute function public.ledger_transactions_insert();
+
+drop trigger if exists ledger_transactions_delete on public.transactions;
+create trigger ledger_transactions_delete
+    after delete on public.transactions
+    referencing old table as old_rows
+    for each statement execute function public.ledger_transactions_delete();
+
+drop trigger if exists ledger_transactions_update on public.transactions;
+create trigger ledger_transactions_update
+    after update on public.transactions
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function public.ledger_transactions_update();
+
+-- Dompet baru: saldo awal dicatat sebagai entri saldo_awal
+create or replace function public.ledger_wallet_opening()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.wallet_ledger (wallet_id, user_id, kind, amount)
+    select n.id, n.user_id, 'saldo_awal', n.balance
+    from new_rows n;
+    return null;
+end;
+$$;
+
+drop trigger if exists ledger_wallet_opening on public.wallets;
+create trigger ledger_wallet_opening
+    after insert on public.wallets
+    referencing new table as new_rows
+    for each statement execute function public.ledger_wallet_opening();
+
+-- ---------------------------------------------------------------------------
+-- RPC lama: saldo sekarang diubah lewat ledger, bukan update langsung
+-- ---------------------------------------------------------------------------
+create or replace function public.record_transaction(
+    p_user_id public.transactions.user_id%type,
+    p_wallet_id public.transactions.wallet_id%type,
+    p_category_id public.transactions.category_id%type,
+    p_amount public.transactions.amount%type,
+    p_type public.transactions.type%type,
+    p_description public.transactions.description%type,
+    p_date public.transactions.date%type
+)
+returns public.transactions
+language plpgsql
+as $$
+declare
+    v_row public.transactions;
+begin
+    if p_type not in ('pemasukan', 'pengeluaran') then
+        raise exception 'Jenis transaksi tidak valid: %', p_type;
+    end if;
+
+    if not exists (select 1 from public.wallets where id = p_wallet_id and user_id = p_user_id) then
+        raise exception 'Dompet % tidak ditemukan', p_wallet_id;
+    end if;
+
+    -- Trigger ledger_transactions_insert mencatat entri & menyesuaikan saldo
+    insert into public.transactions (user_id, wallet_id, category_id, amount, type, description, date)
+    values (p_user_id, p_wallet_id, p_category_id, p_amount, p_type, p_description, p_date)
+    returning * into v_row;
+
+    return v_row;
+end;
+$$;
+
+create or replace function public.delete_transaction(
+    p_id public.transactions.id%type
+)
+returns public.transactions
+language plpgsql
+as $$
+declare
+    v_row public.transactions;
+begin
+    -- Trigger ledger_transactions_delete mencatat entri pembatalan
+    delete from public.transactions
+    where id = p_id
+    returning * into v_row;
+
+    if not found then
+        raise exception 'Transaksi % tidak ditemukan', p_id;
+    end if;
+
+    return v_row;
+end;
+$$;
+
+-- Penulisan langsung ke wallet_ledger hanya lewat fungsi security definer
+-- ini; kepemilikan dompet dicek eksplisit.
+create or replace function public.add_ledger_entry(
+    p_wallet_id public.wallets.id%type,
+    p_amount numeric,
+    p_note text
+)
+returns public.wallets
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_row public.wallets;
+begin
+    insert into public.wallet_ledger (wallet_id, user_id, kind, amount, note)
+    select w.id, w.user_id, 'koreksi', p_amount, p_note
+    from public.wallets w
+    where w.id = p_wallet_id and w.user_id = auth.uid();
+
+    if not found then
+        raise exception 'Dompet % tidak ditemukan', p_wallet_id;
+    end if;
+
+    select * into v_row from public.wallets where id = p_wallet_id;
+    return v_row;
+end;
+$$;
+
+-- Saldo kini hanya berubah lewat ledger; impor massal tidak lagi memanggil
+-- adjust_wallet_balance (migrasi 000400), jadi fungsinya dibuang.
+drop function if exists public.adjust_wallet_balance(public.wallets.id%type, numeric);
+
+-- "Update Saldo": saldo baru dicatat sebagai koreksi sebesar selisihnya
+create or replace function public.set_wallet_balance(
+    p_wallet_id public.wallets.id%type,
+    p_balance numeric
+)
+returns public.wallets
+language plpgsql
+as $$
+declare
+    v_current numeric;
+begin
+    select balance into v_current
+    from public.wallets
+    where id = p_wallet_id
+    for update;
+
+    if not found then
+        raise exception 'Dompet % tidak ditemukan', p_wallet_id;
+    end if;
+
+    return public.add_ledger_entry(p_wallet_id, p_balance - v_current, 'Update saldo manual');
+end;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Saldo historis: checkpoint terakhir + entri sesudahnya
+-- ---------------------------------------------------------------------------
+create or replace function public.wallet_balance_at(
+    p_wallet_id public.wallets.id%type,
+    p_at date default current_date
+)
+returns numeric
+language plpgsql
+stable
+as $$
+declare
+    v_cp public.wallet_checkpoints;
+    v_after numeric;
+    v_backdated numeric;
+begin
+    select * into v_cp
+    from public.wallet_checkpoints
+    where wallet_id = p_wallet_id and as_of <= p_at
+    order by as_of desc
+    limit 1;
+
+    if v_cp.wallet_id is null then
+        select coalesce(sum(amount), 0) into v_after
+        from public.wallet_ledger
+        where wallet_id = p_wallet_id and occurred_on <= p_at;
+        return v_after;
+    end if;
+
+    -- Entri bertanggal setelah checkpoint
+    select coalesce(sum(amount), 0) into v_after
+    from public.wallet_ledger
+    where wallet_id = p_wallet_id and occurred_on > v_cp.as_of and occurred_on <= p_at;
+
+    -- Entri mundur tanggal yang dicatat setelah checkpoint dibuat
+    select coalesce(sum(amount), 0) into v_backdated
+    from public.wallet_ledger
+    where wallet_id = p_wallet_id and id > v_cp.ledger_id and occurred_on <= v_cp.as_of;
+
+    return v_cp.balance + v_after + v_backdated;
+end;
+$$;
+
+-- Checkpoint per dompet pada p_as_of; dijalankan harian oleh pg_cron (di bawah)
+create or replace function public.create_wallet_checkpoints(p_as_of date default current_date - 1)
+returns bigint
+language sql
+as $$
+    with inserted as (
+        insert into public.wallet_checkpoints (wallet_id, as_of, balance, ledger_id)
+        select w.id, p_as_of, public.wallet_balance_at(w.id, p_as_of),
+               coalesce((select max(l.id) from public.wallet_ledger l where l.wallet_id = w.id), 0)
+        from public.wallets w
+        on conflict (wallet_id, as_of) do nothing
+        returning 1
+    )
+    select count(*) from inserted;
+$$;
+
+-- Setiap hari 02:15 UTC: checkpoint untuk hari kemarin. Tanpa checkpoint
+-- wallet_balance_at & wallet_ledger_balances menjumlah seluruh ledger.
+-- cron.schedule dengan nama yang sama menimpa job lama (idempoten).
+create extension if not exists pg_cron with schema pg_catalog;
+
+select cron.schedule(
+    'wallet-checkpoints',
+    '15 2 * * *',
+    $$select public.create_wallet_checkpoints()$$
+);
+
+-- Saldo menurut ledger untuk banyak dompet sekaligus (set-based):
+-- checkpoint terakhir tiap dompet + entri yang belum tercakup.
+create or replace function public.wallet_ledger_balances(p_user_id uuid default null)
+returns table (
+    wallet_id public.wallets.id%type,
+    user_id uuid,
+    balance numeric,
+    ledger_balance numeric
+)
+language sql
+stable
+as $$
+    with cp as (
+        select distinct on (c.wallet_id) c.wallet_id, c.as_of, c.balance, c.ledger_id
+        from public.wallet_checkpoints c
+        order by c.wallet_id, c.as_of desc
+    ),
+    tail as (
+        select l.wallet_id, sum(l.amount) as total
+        from public.wallet_ledger l
+        left join cp on cp.wallet_id = l.wallet_id
+        where cp.wallet_id is null or l.occurred_on > cp.as_of or l.id > cp.ledger_id
+        group by l.wallet_id
+    )
+    select w.id, w.user_id, w.balance::numeric,
+           coalesce(cp.balance, 0) + coalesce(tail.total, 0)
+    from public.wallets w
+    left join cp on cp.wallet_id = w.id
+    left join tail on tail.wallet_id = w.id
+    where p_user_id is null or w.user_id = p_user_id;
+$$;
+
+-- Rekonsiliasi massal: dompet yang saldo materialisasinya menyimpang dari
+-- ledger. p_fix = true menyamakan wallets.balance dengan ledger.
+create or replace function public.reconcile_wallets(
+    p_user_id uuid default null,
+    p_fix boolean default false
+)
+returns table (
+    wallet_id public.wallets.id%type,
+    user_id uuid,
+    balance numeric,
+    ledger_balance numeric,
+    drift numeric
+)
+language plpgsql
+as $$
+begin
+    return query
+    select d.wallet_id, d.user_id, d.balance, d.ledger_balance, d.balance - d.ledger_balance
+    from public.wallet_ledger_balances(p_user_id) d
+    where d.balance <> d.ledger_balance;
+
+    if p_fix then
+        update public.wallets w
+        set balance = d.ledger_balance
+        from public.wallet_ledger_balances(p_user_id) d
+        where w.id = d.wallet_id and w.balance <> d.ledger_balance;
+    end if;
+end;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- RLS: pemilik & kolaborator boleh membaca; tulis hanya lewat trigger/RPC
+-- ---------------------------------------------------------------------------
+alter table public.wallet_ledger enable row level security;
+alter table public.wallet_checkpoints enable row level security;
+
+drop policy if exists "wallet_ledger_read" on public.wallet_ledger;
+create policy "wallet_ledger_read" on public.wallet_ledger
+    for select
+    using (
+        user_id = auth.uid()
+        or exists (
+            select 1 from public.collaborations c
+            where c.owner_id = wallet_ledger.user_id
+              and c.collab_id = auth.uid()
+              and c.status = 'accepted'
+        )
+    );
+
+drop policy if exists "wallet_checkpoints_read" on public.wallet_checkpoints;
+create policy "wallet_checkpoints_read" on public.wallet_checkpoints
+    for select
+    using (exists (select 1 from public.wallets w where w.id = wallet_checkpoints.wallet_id));
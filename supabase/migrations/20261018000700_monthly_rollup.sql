@@ -0,0 +1,187 @@
+-- Rollup bulanan transaksi per (user, bulan, kategori, jenis): jumlah & banyaknya.
+-- Dipelihara trigger per statement pada transactions, bisa dibangun ulang
+-- massal dengan rebuild_monthly_rollup(). monthly_summary membaca tabel ini
+-- untuk rentang yang jatuh di awal bulan, jadi grafik multi-tahun cukup
+-- membaca ratusan baris rollup, bukan seluruh riwayat.
+
+do $$
+declare
+    v_category_id_type text;
+    v_type_type text;
+begin
+    select format_type(atttypid, atttypmod) into v_category_id_type
+    from pg_attribute where attrelid = 'public.transactions'::regclass and attname = 'category_id';
+    select format_type(atttypid, atttypmod) into v_type_type
+    from pg_attribute where attrelid = 'public.transactions'::regclass and attname = 'type';
+
+    execute format($sql$
+        create table if not exists public.transaction_monthly_rollup (
+            user_id uuid not null,
+            month date not null,
+            category_id %1$s,
+            type %2$s not null,
+            total numeric not null default 0,
+            n bigint not null default 0,
+            constraint transaction_monthly_rollup_key
+                unique nulls not distinct (user_id, month, category_id, type)
+        )
+    $sql$, v_category_id_type, v_type_type);
+end;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Trigger per statement: satu upsert per kelompok (user, bulan, kategori,
+-- jenis) yang tersentuh; baris yang jumlahnya jadi 0 dibuang.
+-- ---------------------------------------------------------------------------
+create or replace function public.rollup_transactions()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') then
+        insert into public.transaction_monthly_rollup as r (user_id, month, category_id, type, total, n)
+        select user_id, date_trunc('month', date)::date, category_id, type, -sum(amount), -count(*)
+        from old_rows
+        group by 1, 2, 3, 4
+        on conflict on constraint transaction_monthly_rollup_key do update
+        set total = r.total + excluded.total,
+            n = r.n + excluded.n;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.transaction_monthly_rollup as r (user_id, month, category_id, type, total, n)
+        select user_id, date_trunc('month', date)::date, category_id, type, sum(amount), count(*)
+        from new_rows
+        group by 1, 2, 3, 4
+        on conflict on constraint transaction_monthly_rollup_key do update
+        set total = r.total + excluded.total,
+            n = r.n + excluded.n;
+    end if;
+
+    if tg_op <> 'INSERT' then
+        delete from public.transaction_monthly_rollup r
+        where r.n <= 0
+          and r.user_id in (select distinct user_id from old_rows);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists rollup_transactions_insert on public.transactions;
+create trigger rollup_transactions_insert
+    after insert on public.transactions
+    referencing new table as new_rows
+    for each statement execute function public.rollup_transactions();
+
+drop trigger if exists rollup_transactions_delete on public.transactions;
+create trigger rollup_transactions_delete
+    after delete on public.transactions
+    referencing old table as old_rows
+    for each statement execute function public.rollup_transactions();
+
+drop trigger if exists rollup_transactions_update on public.transactions;
+create trigger rollup_transactions_update
+    after update on public.transactions
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function public.rollup_transactions();
+
+-- ---------------------------------------------------------------------------
+-- Bangun ulang massal (semua user atau satu user)
+-- ---------------------------------------------------------------------------
+create or replace function public.rebuild_monthly_rollup(p_user_id uuid default null)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_count bigint;
+begin
+    if p_user_id is null and auth.uid() is not null then
+        raise exception 'Rebuild semua user hanya untuk service role';
+    end if;
+    if p_user_id is not null and auth.uid() is not null and p_user_id <> auth.uid() then
+        raise exception 'Tidak boleh membangun ulang rollup user lain';
+    end if;
+
+    delete from public.transaction_monthly_rollup
+    where p_user_id is null or user_id = p_user_id;
+
+    insert into public.transaction_monthly_rollup (user_id, month, category_id, type, total, n)
+    select t.user_id, date_trunc('month', t.date)::date, t.category_id, t.type, sum(t.amount), count(*)
+    from public.transactions t
+    where p_user_id is null or t.user_id = p_user_id
+    group by 1, 2, 3, 4;
+
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+select public.rebuild_monthly_rollup();
+
+-- ---------------------------------------------------------------------------
+-- monthly_summary: rentang awal-bulan dibaca dari rollup, selain itu mentah
+-- ---------------------------------------------------------------------------
+create or replace function public.monthly_summary(
+    p_user_id public.transactions.user_id%type,
+    p_start date,
+    p_end date,
+    p_by_category boolean default false
+)
+returns table (
+    month date,
+    type public.transactions.type%type,
+    category_id public.transactions.category_id%type,
+    total numeric,
+    n bigint
+)
+language sql
+stable
+as $$
+    select r.month,
+           r.type,
+           case when p_by_category then r.category_id end as category_id,
+           sum(r.total)::numeric as total,
+           sum(r.n)::bigint as n
+    from public.transaction_monthly_rollup r
+    where r.user_id = p_user_id
+      and r.month >= p_start
+      and r.month < p_end
+      and date_trunc('month', p_start)::date = p_start
+      and date_trunc('month', p_end)::date = p_end
+    group by 1, 2, 3
+    union all
+    select date_trunc('month', t.date)::date as month,
+           t.type,
+           case when p_by_category then t.category_id end as category_id,
+           sum(t.amount)::numeric as total,
+           count(*) as n
+    from public.transactions t
+    where t.user_id = p_user_id
+      and t.date >= p_start
+      and t.date < p_end
+      and not (date_trunc('month', p_start)::date = p_start and date_trunc('month', p_end)::date = p_end)
+    group by 1, 2, 3
+    order by 1, 2, 3;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- RLS: sama dengan transaksi (pemilik & kolaborator yang diterima)
+-- ---------------------------------------------------------------------------
+alter table public.transaction_monthly_rollup enable row level security;
+
+drop policy if exists "transaction_monthly_rollup_read" on public.transaction_monthly_rollup;
+create policy "transaction_monthly_rollup_read" on public.transaction_monthly_rollup
+    for select
+    using (
+        user_id = auth.uid()
+        or exists (
+            select 1 from public.collaborations c
+            where c.owner_id = transaction_monthly_rollup.user_id
+              and c.collab_id = auth.uid()
+              and c.status = 'accepted'
+        )
+    );
@@ -0,0 +1,65 @@
+-- Deret waktu teragregasi untuk halaman Analitik: total per bucket
+-- (hari/minggu/bulan) x jenis x kunci (kategori/dompet). Bucket bulanan per
+-- jenis/kategori dibaca dari rollup; selain itu diagregasi dari transaksi
+-- memakai index (user_id, date). Baris mentah tidak pernah dikirim.
+
+create or replace function public.transaction_series(
+    p_user_id public.transactions.user_id%type,
+    p_start date,
+    p_end date,
+    p_bucket text default 'month',
+    p_group text default 'type'
+)
+returns table (
+    bucket date,
+    type public.transactions.type%type,
+    key text,
+    total numeric,
+    n bigint
+)
+language plpgsql
+stable
+as $$
+begin
+    if p_bucket not in ('day', 'week', 'month') then
+        raise exception 'Bucket tidak valid: %', p_bucket;
+    end if;
+    if p_group not in ('type', 'category', 'wallet') then
+        raise exception 'Pengelompokan tidak valid: %', p_group;
+    end if;
+
+    if p_bucket = 'month' and p_group <> 'wallet'
+       and date_trunc('month', p_start)::date = p_start
+       and date_trunc('month', p_end)::date = p_end then
+        return query
+        select r.month,
+               r.type,
+               case when p_group = 'category' then r.category_id::text end,
+               sum(r.total)::numeric,
+               sum(r.n)::bigint
+        from public.transaction_monthly_rollup r
+        where r.user_id = p_user_id
+          and r.month >= p_start
+          and r.month < p_end
+        group by 1, 2, 3
+        order by 1, 2, 3;
+        return;
+    end if;
+
+    return query
+    select date_trunc(p_bucket, t.date)::date,
+           t.type,
+           case p_group
+               when 'category' then t.category_id::text
+               when 'wallet' then t.wallet_id::text
+           end,
+           sum(t.amount)::numeric,
+           count(*)::bigint
+    from public.transactions t
+    where t.user_id = p_user_id
+      and t.date >= p_start
+      and t.date < p_end
+    group by 1, 2, 3
+    order by 1, 2, 3;
+end;
+$$;
@@ -0,0 +1,89 @@
+-- Pencarian teks toleran salah ketik untuk transactions.description dan
+-- debts.name/description memakai trigram (pg_trgm). Index GIN gabungan
+-- (user_id, kolom teks) lewat btree_gin supaya filter per user dan
+-- pencocokan teks dilayani satu index, juga pada jutaan baris.
+
+create extension if not exists pg_trgm with schema extensions;
+create extension if not exists btree_gin with schema extensions;
+
+create index if not exists transactions_description_trgm_idx
+    on public.transactions using gin (user_id, description extensions.gin_trgm_ops);
+create index if not exists debts_name_trgm_idx
+    on public.debts using gin (user_id, name extensions.gin_trgm_ops);
+create index if not exists debts_description_trgm_idx
+    on public.debts using gin (user_id, description extensions.gin_trgm_ops);
+
+-- Pola ILIKE dengan % dan _ dari input user di-escape
+create or replace function public.search_pattern(p_query text)
+returns text
+language sql
+immutable
+as $$
+    select '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+$$;
+
+-- Skor: 1 untuk potongan teks yang persis ada, selain itu word_similarity
+-- (0..1). Hasil diurutkan dari skor tertinggi.
+create or replace function public.search_transactions(
+    p_user_id public.transactions.user_id%type,
+    p_query text,
+    p_limit integer default 50
+)
+returns table (
+    id public.transactions.id%type,
+    wallet_id public.transactions.wallet_id%type,
+    category_id public.transactions.category_id%type,
+    amount public.transactions.amount%type,
+    type public.transactions.type%type,
+    description public.transactions.description%type,
+    date public.transactions.date%type,
+    score real
+)
+language sql
+stable
+set search_path = public, extensions
+as $$
+    select t.id, t.wallet_id, t.category_id, t.amount, t.type, t.description, t.date,
+           case when t.description ilike public.search_pattern(p_query) then 1
+                else word_similarity(p_query, t.description) end::real as score
+    from public.transactions t
+    where t.user_id = p_user_id
+      and (p_query <% t.description or t.description ilike public.search_pattern(p_query))
+    order by score desc, t.date desc
+    limit p_limit;
+$$;
+
+create or replace function public.search_debts(
+    p_user_id public.debts.user_id%type,
+    p_query text,
+    p_limit integer default 50
+)
+returns table (
+    id public.debts.id%type,
+    name public.debts.name%type,
+    amount public.debts.amount%type,
+    type public.debts.type%type,
+    description public.debts.description%type,
+    due_date public.debts.due_date%type,
+    status public.debts.status%type,
+    score real
+)
+language sql
+stable
+set search_path = public, extensions
+as $$
+    select d.id, d.name, d.amount, d.type, d.description, d.due_date, d.status,
+           greatest(
+               case when d.name ilike public.search_pattern(p_query) then 1
+                    else word_similarity(p_query, d.name) end,
+               -- kecocokan di deskripsi sedikit di bawah kecocokan nama
+               0.9 * case when d.description ilike public.search_pattern(p_query) then 1
+                          else coalesce(word_similarity(p_query, d.description), 0) end
+           )::real as score
+    from public.debts d
+    where d.user_id = p_user_id
+      and (p_query <% d.name or d.name ilike public.search_pattern(p_query)
+           or p_query <% d.description or d.description ilike public.search_pattern(p_query))
+    order by score desc, d.due_date
+    limit p_limit;
+$$;
@@ -0,0 +1,101 @@
+-- Aturan kategori otomatis: pola deskripsi (kata kunci / regex) -> kategori.
+--
+-- Di aplikasi semua aturan user digabung jadi satu regex (categorizer.py)
+-- untuk transaksi baru & impor. Di sini aturan yang sama diterapkan ke
+-- transaksi lama dalam satu UPDATE: per transaksi dipilih aturan cocok
+-- dengan prioritas tertinggi (seri: id terkecil), sama seperti di aplikasi.
+
+do $$
+declare
+    v_category_id_type text;
+begin
+    select format_type(atttypid, atttypmod) into v_category_id_type
+    from pg_attribute where attrelid = 'public.categories'::regclass and attname = 'id';
+
+    execute format($sql$
+        create table if not exists public.category_rules (
+            id bigint generated always as identity primary key,
+            user_id uuid not null default auth.uid(),
+            category_id %1$s not null references public.categories (id) on delete cascade,
+            kind text not null check (kind in ('keyword', 'regex')),
+            pattern text not null check (length(pattern) between 1 and 200),
+            priority integer not null default 0,
+            created_at timestamptz not null default now()
+        )
+    $sql$, v_category_id_type);
+end;
+$$;
+
+create index if not exists category_rules_user_priority_idx
+    on public.category_rules (user_id, priority desc, id);
+
+-- Kata kunci = potongan teks tanpa beda huruf besar/kecil (ILIKE, dilayani
+-- index trigram deskripsi); regex = ~* (regex POSIX, case-insensitive)
+create or replace function public.rule_matches(p_kind text, p_pattern text, p_text text)
+returns boolean
+language sql
+immutable
+as $$
+    select case p_kind
+        when 'keyword' then p_text ilike public.search_pattern(p_pattern)
+        else p_text ~* p_pattern
+    end;
+$$;
+
+-- Terapkan semua aturan user ke transaksi yang sudah ada. Hanya transaksi
+-- yang jenisnya sama dengan jenis kategori tujuan yang diubah.
+-- Mengembalikan jumlah baris yang diubah per aturan.
+create or replace function public.apply_category_rules(
+    p_user_id public.transactions.user_id%type,
+    p_only_uncategorized boolean default false
+)
+returns table (rule_id bigint, updated integer)
+language plpgsql
+as $$
+begin
+    if auth.uid() is not null and p_user_id <> auth.uid() then
+        raise exception 'Tidak boleh menerapkan aturan user lain';
+    end if;
+
+    return query
+    with matched as (
+        select distinct on (t.id) t.id as transaction_id, cr.id as rule_id, cr.category_id
+        from public.transactions t
+        join public.category_rules cr on cr.user_id = p_user_id
+        join public.categories c on c.id = cr.category_id
+        where t.user_id = p_user_id
+          and t.type::text = c.type::text
+          and (not p_only_uncategorized or t.category_id is null)
+          and public.rule_matches(cr.kind, cr.pattern, t.description)
+        order by t.id, cr.priority desc, cr.id
+    ),
+    changed as (
+        update public.transactions t
+        set category_id = m.category_id
+        from matched m
+        where t.id = m.transaction_id
+          and t.category_id is distinct from m.category_id
+        returning m.rule_id
+    )
+    select cr.id, count(c.rule_id)::integer
+    from public.category_rules cr
+    left join changed c on c.rule_id = cr.id
+    where cr.user_id = p_user_id
+    group by cr.id
+    order by cr.id;
+end;
+$$;
+
+alter table public.category_rules enable row level security;
+
+drop policy if exists "category_rules_owner" on public.category_rules;
+create policy "category_rules_owner" on public.category_rules
+    for all
+    using (user_id = auth.uid())
+    with check (
+        user_id = auth.uid()
+        and exists (
+            select 1 from public.categories c
+            where c.id = category_id and c.user_id = auth.uid()
+        )
+    );
@@ -0,0 +1,133 @@
+-- monthly_summary & pushdown rentang bulan, dijalankan pada Postgres lokal:
+--   supabase start && supabase test db
+-- Semua data dibuat di dalam transaksi dan dibuang lagi (rollback).
+begin;
+create extension if not exists pgtap with schema extensions;
+
+select plan(7);
+
+insert into auth.users (id, email)
+values ('00000000-0000-0000-0000-00000000a001', 'summary-test@example.com');
+
+insert into public.wallets (user_id, name, balance)
+values ('00000000-0000-0000-0000-00000000a001', 'Kas', 0);
+
+insert into public.categories (user_id, name, type)
+values ('00000000-0000-0000-0000-00000000a001', 'Gaji', 'pemasukan'),
+       ('00000000-0000-0000-0000-00000000a001', 'Makan', 'pengeluaran'),
+       ('00000000-0000-0000-0000-00000000a001', 'Transport', 'pengeluaran');
+
+create temporary table fixture (amount numeric, type text, category text, date date, description text)
+    on commit drop;
+insert into fixture values
+    (5000000, 'pemasukan', 'Gaji', '2024-01-25', 'gaji januari'),
+    (25000.50, 'pengeluaran', 'Makan', '2024-01-03', 'makan siang'),
+    (15000, 'pengeluaran', 'Makan', '2024-01-20', 'kopi'),
+    (12000, 'pengeluaran', 'Transport', '2024-01-31', 'ojek'),
+    (75000, 'pengeluaran', 'Makan', '2024-02-10', 'makan malam'),
+    (5100000, 'pemasukan', 'Gaji', '2024-02-25', 'gaji februari'),
+    (30000, 'pengeluaran', 'Makan', '2024-03-01', 'sarapan');
+
+-- Satu insert per baris: kolom type bisa enum, literal teks langsung cocok
+do $$
+declare
+    f record;
+begin
+    for f in select * from fixture loop
+        execute format($sql$
+            insert into public.transactions (user_id, wallet_id, category_id, amount, type, description, date)
+            select w.user_id, w.id, c.id, %L, %L, %L, %L
+            from public.wallets w
+            join public.categories c on c.user_id = w.user_id and c.name = %L
+            where w.user_id = '00000000-0000-0000-0000-00000000a001'
+        $sql$, f.amount, f.type, f.description, f.date, f.category);
+    end loop;
+end;
+$$;
+
+select has_index('public', 'transactions', 'transactions_user_date_idx', 'index (user_id, date) ada');
+
+-- Rentang awal bulan: dibaca dari rollup; batas akhir eksklusif (1 Maret tidak ikut)
+select set_eq(
+    $$select month, type::text, total, n
+      from public.monthly_summary('00000000-0000-0000-0000-00000000a001', '2024-01-01', '2024-03-01')$$,
+    $$values ('2024-01-01'::date, 'pemasukan', 5000000::numeric, 1::bigint),
+             ('2024-01-01', 'pengeluaran', 52000.50, 3),
+             ('2024-02-01', 'pemasukan', 5100000, 1),
+             ('2024-02-01', 'pengeluaran', 75000, 1)$$,
+    'rentang awal bulan (rollup)'
+);
+
+select set_eq(
+    $$select s.month, s.type::text, c.name, s.total, s.n
+      from public.monthly_summary('00000000-0000-0000-0000-00000000a001', '2024-01-01', '2024-03-01', true) s
+      join public.categories c on c.id = s.category_id$$,
+    $$values ('2024-01-01'::date, 'pemasukan', 'Gaji'::text, 5000000::numeric, 1::bigint),
+             ('2024-01-01', 'pengeluaran', 'Makan', 40000.50, 2),
+             ('2024-01-01', 'pengeluaran', 'Transport', 12000, 1),
+             ('2024-02-01', 'pemasukan', 'Gaji', 5100000, 1),
+             ('2024-02-01', 'pengeluaran', 'Makan', 75000, 1)$$,
+    'per kategori (rollup)'
+);
+
+-- Rentang di tengah bulan: dihitung dari baris mentah
+select set_eq(
+    $$select month, type::text, total, n
+      from public.monthly_summary('00000000-0000-0000-0000-00000000a001', '2024-01-10', '2024-03-01')$$,
+    $$values ('2024-01-01'::date, 'pemasukan', 5000000::numeric, 1::bigint),
+             ('2024-01-01', 'pengeluaran', 27000, 2),
+             ('2024-02-01', 'pemasukan', 5100000, 1),
+             ('2024-02-01', 'pengeluaran', 75000, 1)$$,
+    'rentang di tengah bulan (baris mentah)'
+);
+
+-- Rollup ikut update & delete
+update public.transactions set date = '2024-03-05'
+where user_id = '00000000-0000-0000-0000-00000000a001' and description = 'makan malam';
+delete from public.transactions
+where user_id = '00000000-0000-0000-0000-00000000a001' and description = 'gaji februari';
+
+select set_eq(
+    $$select month, type::text, total, n
+      from public.monthly_summary('00000000-0000-0000-0000-00000000a001', '2024-02-01', '2024-04-01')$$,
+    $$values ('2024-03-01'::date, 'pengeluaran', 105000::numeric, 2::bigint)$$,
+    'rollup setelah update & delete'
+);
+
+-- Pushdown: filter user + rentang tanggal dilayani index, bukan seq scan
+create function pg_temp.plan_of(query text)
+returns text
+language plpgsql
+as $$
+declare
+    line text;
+    plan text := '';
+begin
+    for line in execute 'explain ' || query loop
+        plan := plan || line || E'\n';
+    end loop;
+    return plan;
+end;
+$$;
+
+set local enable_seqscan = off;
+
+select matches(
+    pg_temp.plan_of($$select * from public.monthly_summary('00000000-0000-0000-0000-00000000a001',
+                                                          '2024-01-10', '2024-03-01')$$),
+    'transactions_user_(date|keyset)_idx',
+    'monthly_summary (baris mentah) memakai index (user_id, date)'
+);
+
+select matches(
+    pg_temp.plan_of($$select id from public.transactions
+                      where user_id = '00000000-0000-0000-0000-00000000a001'
+                        and date >= '2024-01-01' and date < '2024-02-01'
+                      order by date desc, created_at desc, id desc
+                      limit 51$$),
+    'transactions_user_(date|keyset)_idx',
+    'halaman transaksi per bulan memakai index (user_id, date, ...)'
+);
+
+select * from finish();
+rollback;
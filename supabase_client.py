@@ -1,10 +1,66 @@
-from supabase import create_client
+from supabase import create_client, ClientOptions
 import os
+import httpx
+import streamlit as st
 from dotenv import load_dotenv
 
+import query_log
+
 load_dotenv()
 
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(url, key)
+# Pool koneksi keep-alive dipakai bersama semua sesi; HTTP/2 opsional
+# (SUPABASE_HTTP2=1, butuh paket `h2`).
+HTTP2 = os.getenv("SUPABASE_HTTP2", "0") == "1"
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=30,
+)
+REQUEST_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+# Batas baris per respons PostgREST (max-rows, default Supabase 1000).
+# Query yang bisa lebih besar dari ini harus dipaginasi.
+MAX_ROWS = int(os.getenv("SUPABASE_MAX_ROWS", "1000"))
+
+
+@st.cache_resource
+def _shared_transport():
+    return httpx.HTTPTransport(limits=POOL_LIMITS, http2=HTTP2)
+
+
+def create_session_client():
+    # Client baru dengan auth state sendiri, tapi koneksi dari pool bersama.
+    # httpx.Client per sesi karena supabase-py menulis header Authorization
+    # ke client tersebut.
+    http_client = httpx.Client(transport=_shared_transport(), timeout=REQUEST_TIMEOUT)
+    try:
+        options = ClientOptions(httpx_client=http_client, postgrest_client_timeout=REQUEST_TIMEOUT)
+    except TypeError:
+        # supabase-py lama belum mendukung httpx_client
+        options = ClientOptions(postgrest_client_timeout=REQUEST_TIMEOUT)
+    return create_client(url, key, options=options)
+
+
+def get_client():
+    if "_supabase_client" not in st.session_state:
+        st.session_state._supabase_client = create_session_client()
+    return st.session_state._supabase_client
+
+
+class _SessionClient:
+    # `from supabase_client import supabase` tetap dipakai di semua halaman;
+    # setiap akses diteruskan ke client milik sesi yang sedang berjalan.
+    # table()/rpc() dibungkus query_log kalau instrumentasi aktif.
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+    def table(self, name):
+        return query_log.trace_table(get_client().table(name), name)
+
+    def rpc(self, name, params=None):
+        return query_log.trace_rpc(get_client().rpc(name, params or {}), name)
+
+
+supabase = _SessionClient()
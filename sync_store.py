@@ -0,0 +1,196 @@
+import logging
+import time
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+import schema
+from supabase_client import MAX_ROWS, supabase
+
+# =========================
+# SNAPSHOT LOKAL PER SESI (DELTA SYNC)
+# =========================
+# Tiap sesi menyimpan satu DataFrame per (tabel, user_id). Setelah load
+# pertama, hanya baris dengan updated_at > high-water mark dan tombstone
+# (deleted_rows) yang diambil dari Supabase. Kedua query dipaginasi keyset
+# (updated_at, id) per MAX_ROWS; high-water mark baru dimajukan setelah
+# halaman terakhir terbaca.
+SYNC_TABLES = ("transactions", "debts", "wallets")
+SYNC_INTERVAL = 60  # detik; selama itu snapshot dipakai tanpa request
+SYNC_OVERLAP = timedelta(seconds=30)  # toleransi commit yang terlambat
+SNAPSHOT_MAX_AGE = 6 * 24 * 3600  # harus < retensi prune_deleted_rows
+VERIFY_DELAY = 5  # detik; baris hasil update optimistis dicek ulang ke server setelah ini
+
+EPOCH = pd.Timestamp("1970-01-01", tz="UTC")
+
+logger = logging.getLogger("finapp.sync")
+
+SORT_KEYS = {
+    "transactions": (["date", "created_at"], False),
+    "debts": (["due_date"], True),
+    "wallets": (["created_at"], True),
+}
+
+
+def _store():
+    if "_sync_store" not in st.session_state:
+        st.session_state._sync_store = {}
+    return st.session_state._sync_store
+
+
+def _frame(table, res):
+    return schema.to_frame(table, res.data)
+
+
+def _max_ts(values, current):
+    if len(values) == 0:
+        return current
+    return max(current, pd.to_datetime(pd.Series(values), utc=True).max())
+
+
+def _sorted(table, df):
+    columns, ascending = SORT_KEYS.get(table, ([], True))
+    if df.empty or not columns or not set(columns) <= set(df.columns):
+        return df.reset_index(drop=True)
+    return df.sort_values(columns, ascending=ascending, kind="stable").reset_index(drop=True)
+
+
+def _fetch_all(table, columns, user_id, ts_column, since=None, filters=()):
+    # Semua baris dengan ts_column > since, urut (ts_column, id), per halaman MAX_ROWS
+    rows, last = [], None
+    while True:
+        query = supabase.table(table).select(columns).eq("user_id", user_id)
+        for column, value in filters:
+            query = query.eq(column, value)
+        if since is not None:
+            query = query.gt(ts_column, since)
+        if last is not None:
+            query = query.or_(schema.keyset_after((ts_column, "id"), (last[ts_column], last["id"])))
+        page = query.order(ts_column).order("id").limit(MAX_ROWS).execute().data or []
+        rows.extend(page)
+        if len(page) < MAX_ROWS:
+            return rows
+        last = page[-1]
+
+
+def _full_load(table, user_id):
+    df = schema.to_frame(table, _fetch_all(table, schema.columns(table), user_id, "updated_at"))
+    hwm = _max_ts(df["updated_at"] if "updated_at" in df else [], EPOCH)
+    return {"df": _sorted(table, df), "hwm": hwm, "tomb_hwm": hwm, "loaded_at": time.monotonic()}
+
+
+def _delta_sync(table, user_id, entry):
+    since = (entry["hwm"] - SYNC_OVERLAP).isoformat()
+    changed = schema.to_frame(table, _fetch_all(table, schema.columns(table), user_id, "updated_at", since))
+    tombs = _fetch_all("deleted_rows", "id, row_id, deleted_at", user_id, "deleted_at",
+                       (entry["tomb_hwm"] - SYNC_OVERLAP).isoformat(), filters=[("table_name", table)])
+
+    df = entry["df"]
+    if not changed.empty:
+        if not df.empty:
+            df = df[~df["id"].isin(changed["id"])]
+        df = pd.concat([df, changed], ignore_index=True)
+        entry["hwm"] = _max_ts(changed["updated_at"], entry["hwm"])
+    if tombs:
+        dead = {t["row_id"] for t in tombs}
+        if not df.empty:
+            df = df[~df["id"].astype(str).isin(dead)]
+        entry["tomb_hwm"] = _max_ts([t["deleted_at"] for t in tombs], entry["tomb_hwm"])
+    entry["df"] = _sorted(table, df)
+
+
+def get(table, user_id, generation=0):
+    # `generation` = penghitung invalidasi dari data_access; kalau berubah
+    # (ada write), delta sync langsung dijalankan tanpa menunggu interval.
+    store = _store()
+    key = (table, user_id)
+    entry = store.get(key)
+    now = time.monotonic()
+
+    if entry is None or now - entry["loaded_at"] >= SNAPSHOT_MAX_AGE:
+        entry = _full_load(table, user_id)
+    elif entry["generation"] != generation or now - entry["synced_at"] >= SYNC_INTERVAL:
+        _delta_sync(table, user_id, entry)
+    elif entry.get("optimistic") and now >= entry["verify_at"]:
+        _verify(table, user_id, entry)
+        return entry["df"].copy()
+    else:
+        return entry["df"].copy()
+
+    entry["generation"] = generation
+    entry["synced_at"] = now
+    store[key] = entry
+    return entry["df"].copy()
+
+
+# =========================
+# UPDATE OPTIMISTIS
+# =========================
+# Hasil write (baris yang dikembalikan server) langsung diterapkan ke
+# snapshot, tanpa delta sync. `before`/`after` = generation tabel sebelum
+# dan sesudah write: snapshot yang tadinya mutakhir tetap dianggap
+# mutakhir. Baris yang disentuh dicek ulang ke server setelah
+# VERIFY_DELAY; kalau berbeda, data server yang dipakai (rollback).
+def merge_rows(table, df, upserted, deleted_ids=()):
+    # Ganti/tambah baris `upserted` dan buang `deleted_ids` dari df
+    ids = set(upserted["id"]) | set(deleted_ids)
+    if not df.empty:
+        df = df[~df["id"].isin(ids)]
+    if not upserted.empty:
+        df = pd.concat([df, upserted.reindex(columns=df.columns)], ignore_index=True)
+    return _sorted(table, df)
+
+
+def _mark(entry, ids, before, after):
+    entry["optimistic"] = entry.get("optimistic", set()) | set(ids)
+    entry["verify_at"] = time.monotonic() + VERIFY_DELAY
+    if entry["generation"] == before:
+        entry["generation"] = after
+
+
+def apply(table, user_id, upserted, deleted_ids, before, after):
+    entry = _store().get((table, user_id))
+    if entry is None:
+        return
+    entry["df"] = merge_rows(table, entry["df"], upserted, deleted_ids)
+    _mark(entry, set(upserted["id"]) | set(deleted_ids), before, after)
+
+
+def adjust(table, user_id, column, deltas, before, after):
+    # deltas: {row_id: selisih}, mis. saldo dompet setelah transaksi
+    entry = _store().get((table, user_id))
+    if entry is None or not deltas:
+        return
+    df = entry["df"].copy()
+    df[column] = df[column] + df["id"].map(deltas).fillna(0).astype(df[column].dtype)
+    entry["df"] = df
+    _mark(entry, deltas, before, after)
+
+
+def _verify(table, user_id, entry):
+    # Ambil ulang baris optimistis dari server; server yang menang
+    ids = sorted(entry.pop("optimistic"))
+    server = _frame(table, supabase.table(table)
+                    .select(schema.columns(table))
+                    .eq("user_id", user_id)
+                    .in_("id", ids)
+                    .execute())
+    df = entry["df"]
+    local = df[df["id"].isin(ids)].set_index("id")
+    remote = server.set_index("id")
+    common = local.index.intersection(remote.index)
+    columns = [c for c in local.columns if c != "updated_at"]
+    a, b = local.loc[common, columns], remote.loc[common, columns]
+    differs = ~((a == b) | (a.isna() & b.isna())).all(axis=1)
+    mismatched = len(local.index.symmetric_difference(remote.index)) + int(differs.sum())
+    if mismatched:
+        logger.warning("rollback %s baris optimistis %s (user %s)", mismatched, table, user_id)
+    entry["df"] = merge_rows(table, df, server, ids)
+
+
+def drop(user_id=None):
+    # Buang snapshot (mis. saat logout)
+    store = _store()
+    for key in [k for k in store if user_id is None or k[1] == user_id]:
+        del store[key]
@@ -0,0 +1,38 @@
+import logging
+import os
+import sys
+
+import pytest
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.seed import seed  # noqa: E402
+
+# st.session_state dipakai tanpa runtime Streamlit (bare mode)
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+@pytest.fixture
+def fake():
+    return FakeSupabase()
+
+
+@pytest.fixture
+def user(fake):
+    return seed(fake, 300, years=2)
+
+
+@pytest.fixture
+def session(fake):
+    # Sesi Streamlit tiruan: proxy `supabase` memakai client fake
+    import data_access
+
+    st.session_state.clear()
+    st.session_state["_supabase_client"] = fake
+    data_access.clear_cache()
+    yield st.session_state
+    st.session_state.clear()
+    data_access.clear_cache()
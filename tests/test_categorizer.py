@@ -0,0 +1,142 @@
+import random
+import re
+import string
+import time
+
+import pandas as pd
+import pytest
+
+import categorizer
+
+CATEGORIES = pd.DataFrame({
+    "id": ["makan", "transport", "gaji", "belanja"],
+    "type": ["pengeluaran", "pengeluaran", "pemasukan", "pengeluaran"],
+})
+
+
+def rules(*items):
+    return pd.DataFrame(items, columns=["id", "kind", "pattern", "category_id", "priority"])
+
+
+@pytest.mark.parametrize("pattern", [r"\bgrab\b", r"kopi\B"])
+def test_validate_rejects_python_only_escapes(pattern):
+    with pytest.raises(ValueError, match="PostgreSQL"):
+        categorizer.validate("regex", pattern)
+
+
+@pytest.mark.parametrize("kind, pattern", [
+    ("regex", "(gaji"),
+    ("regex", "(?P<x>gaji)"),
+    ("regex", ""),
+    ("regex", "x" * (categorizer.MAX_PATTERN_LENGTH + 1)),
+    ("glob", "gaji*"),
+])
+def test_validate_rejects_invalid(kind, pattern):
+    with pytest.raises(ValueError):
+        categorizer.validate(kind, pattern)
+
+
+def test_validate_accepts_and_strips():
+    assert categorizer.validate("regex", r"  ^(gaji|salary)\\b ") == r"^(gaji|salary)\\b"
+    assert categorizer.validate("regex", r"(^|\W)grab(\W|$)") == r"(^|\W)grab(\W|$)"
+    assert categorizer.validate("keyword", " \\b (") == "\\b ("
+
+
+def test_categorize_priority_and_type():
+    matcher = categorizer.compile_rules(rules(
+        (1, "keyword", "grab", "transport", 0),
+        (2, "keyword", "grabfood", "makan", 10),
+        (3, "regex", "^(gaji|salary)", "gaji", 0),
+        (4, "keyword", "a.b", "belanja", 0),
+        (5, "keyword", "hilang", "tidak-ada", 99),
+    ), CATEGORIES)
+    out = categorizer.categorize(
+        matcher,
+        ["GrabFood ayam", "grab ke kantor", "Gaji Januari", "gaji dikembalikan", "axb", "a.b", None, "hilang"],
+        ["pengeluaran", "pengeluaran", "pemasukan", "pengeluaran", "pengeluaran", "pengeluaran",
+         "pengeluaran", "pengeluaran"],
+    )
+    assert out.tolist() == ["makan", "transport", "gaji", None, None, "belanja", None, None]
+
+
+def test_categorize_without_rules():
+    assert categorizer.compile_rules(rules(), CATEGORIES) == {}
+    assert categorizer.categorize({}, ["grab"], ["pengeluaran"]).isna().all()
+
+
+def test_matches_apply_category_rules(fake, user):
+    # Hasil di aplikasi harus sama dengan RPC apply_category_rules
+    categories = pd.DataFrame(fake.table("categories").select("id, name, type").eq("user_id", user.id).execute().data)
+    by_name = dict(zip(categories["name"], categories["id"]))
+    fake.table("category_rules").insert([
+        {"user_id": user.id, "category_id": by_name["Transport"], "kind": "keyword", "pattern": "bensin", "priority": 0},
+        {"user_id": user.id, "category_id": by_name["Tagihan"], "kind": "regex", "pattern": "(pln|pulsa)$",
+         "priority": 5},
+        {"user_id": user.id, "category_id": by_name["Makan"], "kind": "keyword", "pattern": "an", "priority": 1},
+        {"user_id": user.id, "category_id": by_name["Bonus"], "kind": "keyword", "pattern": "dividen", "priority": 0},
+    ]).execute()
+    rule_df = pd.DataFrame(fake.table("category_rules").select("*").eq("user_id", user.id).execute().data)
+    before = pd.DataFrame(fake.table("transactions").select("id, description, type, category_id")
+                          .eq("user_id", user.id).execute().data).set_index("id")
+
+    counts = fake.rpc("apply_category_rules", {"p_user_id": user.id}).execute().data
+    after = pd.DataFrame(fake.table("transactions").select("id, category_id")
+                         .eq("user_id", user.id).execute().data).set_index("id")["category_id"]
+
+    expected = categorizer.categorize(categorizer.compile_rules(rule_df, categories),
+                                      before["description"], before["type"])
+    expected = expected.fillna(before["category_id"])
+    assert after.sort_index().tolist() == expected.sort_index().tolist()
+    assert sum(c["updated"] for c in counts) == int((before["category_id"] != expected).sum())
+
+
+def reference(rule_df, descriptions):
+    # Aturan berprioritas tertinggi yang cocok, dicek satu per satu dengan re
+    ordered = rule_df.sort_values(["priority", "id"], ascending=[False, True])
+    out = []
+    for text in descriptions:
+        out.append(next((r.category_id for r in ordered.itertuples()
+                         if re.search(re.escape(r.pattern) if r.kind == "keyword" else r.pattern, text, re.I | re.S)), None))
+    return out
+
+
+def test_categorize_matches_reference():
+    rng = random.Random(7)
+    words = ["grab", "grabfood", "abf", "food", "kopi", "KOPI kenangan", "café", "ÉCOLE", "pln", "token pln",
+             "indomaret", "tarik tunai", "ab", "b"]
+    rule_df = rules(*[(i, "keyword", w, rng.choice(list(CATEGORIES["id"][CATEGORIES["type"] == "pengeluaran"])),
+                       rng.randrange(3)) for i, w in enumerate(words)],
+                    (90, "regex", r"^tarik\s+\d+", "belanja", 1),
+                    (91, "regex", r"(^|\W)pln(\W|$)", "transport", 2),
+                    (92, "regex", r"(?<=kopi )susu", "makan", 0),
+                    (93, "regex", r"\d{4}$", "belanja", 0))
+    pool = words + ["GrabFood", "abfood", "Café Latte", "école", "kopi susu", "tarik 5000", "x\nPLN", "pln\n",
+                    "token PLN 2024", "ｐｌｎ", "Ünïcödé 1234"]
+    descriptions = [" ".join(rng.sample(pool, rng.randrange(1, 4))) for _ in range(500)] + pool
+    out = categorizer.categorize(categorizer.compile_rules(rule_df, CATEGORIES), descriptions,
+                                 ["pengeluaran"] * len(descriptions))
+    assert out.tolist() == reference(rule_df, descriptions)
+
+
+def test_categorize_throughput():
+    # 100 kata kunci + 10 regex atas 20.000 deskripsi unik: ribuan/ms di
+    # mesin pengembang; batas di sini longgar supaya tidak rapuh di CI
+    rng = random.Random(1)
+
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(4, 9)))
+
+    rule_df = rules(*[(i, "keyword", word(), "makan", rng.randrange(10)) for i in range(100)],
+                    *[(100 + i, "regex", rf"(^|\W){word()}\d*(\W|$)", "belanja", rng.randrange(10)) for i in range(10)])
+    matcher = categorizer.compile_rules(rule_df, CATEGORIES)
+    descriptions = pd.Series([" ".join(word() for _ in range(4)).upper() + f" {i}" for i in range(20_000)])
+    types = pd.Series(["pengeluaran"] * len(descriptions))
+
+    elapsed = min(timed(categorizer.categorize, matcher, descriptions, types) for _ in range(3))
+    assert len(descriptions) / (elapsed * 1000) > 200  # deskripsi per ms
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
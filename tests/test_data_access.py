@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import data_access
+
+
+def test_other_readers_do_not_share_the_owner_cache(session):
+    # Kolaborator yang aksesnya dicabut dapat hasil kosong dari RLS; hasil
+    # itu tidak boleh tersaji ke pemilik akun
+    owner, revoked = SimpleNamespace(id="owner"), SimpleNamespace(id="revoked")
+    rows = {"owner": pd.DataFrame({"id": ["t1", "t2"]}), "revoked": pd.DataFrame({"id": []})}
+
+    def load():
+        return rows[session.user.id]
+
+    session.user = revoked
+    assert data_access._cached("transactions", "owner", "all", load).empty
+    session.user = owner
+    assert len(data_access._cached("transactions", "owner", "all", load)) == 2
+
+    # Entri pemilik dipakai bersama, tanpa query lagi
+    assert len(data_access._cached("transactions", "owner", "all", lambda: rows["revoked"])) == 2
+
+    # Write pemilik ikut menghapus entri pembaca lain
+    data_access.invalidate("transactions", "owner")
+    session.user = revoked
+    assert len(data_access._cached("transactions", "owner", "all", lambda: rows["owner"])) == 2
@@ -0,0 +1,65 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import exporter
+
+
+@pytest.fixture
+def small_pages(fake, monkeypatch):
+    # Paksa banyak chunk: server & klien sama-sama dibatasi 40 baris
+    monkeypatch.setattr(exporter, "MAX_ROWS", 40)
+    fake.max_rows = 40
+
+
+def server_rows(fake, user_id, start=None, end=None):
+    query = fake.table("transactions").select("id, amount, date").eq("user_id", user_id)
+    if start:
+        query = query.gte("date", start.isoformat()).lt("date", end.isoformat())
+    limit, fake.max_rows = fake.max_rows, None
+    try:
+        return pd.DataFrame(query.execute().data)
+    finally:
+        fake.max_rows = limit
+
+
+def test_iter_chunks_keyset_covers_all_rows(fake, user, small_pages):
+    chunks = list(exporter.iter_chunks(fake, "transactions", user.id))
+    assert len(chunks) > 1
+    assert all(len(c) <= 40 for c in chunks)
+    ids = pd.concat(chunks)["id"]
+    assert ids.is_unique
+    assert set(ids) == set(server_rows(fake, user.id)["id"])
+
+
+@pytest.mark.parametrize("fmt, read", [
+    ("csv", lambda b: pd.read_csv(io.BytesIO(b))),
+    ("parquet", lambda b: pd.read_parquet(io.BytesIO(b))),
+    ("xlsx", lambda b: pd.read_excel(io.BytesIO(b))),
+])
+def test_export_bytes(fake, user, small_pages, fmt, read):
+    start, end = date(date.today().year - 1, 1, 1), date(date.today().year, 1, 1)
+    expected = server_rows(fake, user.id, start, end)
+    df = read(exporter.export_bytes(fake, "transactions", user.id, fmt, start=start, end=end))
+
+    assert list(df.columns) == list(exporter.EXPORT_COLUMNS["transactions"])
+    assert len(df) == len(expected)
+    assert df["jumlah"].sum() == pytest.approx(expected["amount"].sum())
+    assert pd.to_datetime(df["tanggal"]).is_monotonic_increasing
+    assert pd.to_datetime(df["tanggal"]).min() >= pd.Timestamp(start)
+
+
+def test_export_empty_range_has_header(fake, user):
+    out = exporter.export_bytes(fake, "transactions", user.id, "csv", start=date(1990, 1, 1), end=date(1990, 2, 1))
+    assert out.decode().strip() == ",".join(exporter.EXPORT_COLUMNS["transactions"])
+
+
+def test_export_labels_and_unknown_format(fake, user):
+    wallets = fake.table("wallets").select("id, name").eq("user_id", user.id).execute().data
+    labels = {"wallet_id": {w["id"]: w["name"] for w in wallets}}
+    df = pd.read_csv(io.BytesIO(exporter.export_bytes(fake, "transactions", user.id, "csv", labels=labels)))
+    assert set(df["dompet"]) <= {w["name"] for w in wallets}
+    with pytest.raises(ValueError):
+        exporter.export_bytes(fake, "transactions", user.id, "pdf")
@@ -0,0 +1,69 @@
+import io
+
+import pandas as pd
+
+import importer
+
+WALLETS = pd.DataFrame({"id": ["w1", "w2"], "name": ["Kas", " BCA "]})
+CATEGORIES = pd.DataFrame({
+    "id": ["c1", "c2", "c3"],
+    "name": ["Gaji", "Makan", "Lainnya"],
+    "type": ["pemasukan", "pengeluaran", "pengeluaran"],
+})
+
+
+def test_parse_dates_explicit_formats():
+    out = importer.parse_dates(["2024-03-01", "02/03/2024", "03-03-2024", "04.03.2024",
+                                "2024-03-05 10:11:12", "2024-03-06T08:00", "31/02/2024", "kemarin"])
+    assert out.dt.strftime("%Y-%m-%d").tolist()[:6] == [
+        "2024-03-01", "2024-03-02", "2024-03-03", "2024-03-04", "2024-03-05", "2024-03-06"]
+    assert out.iloc[6:].isna().all()
+
+
+def test_parse_amounts_per_format():
+    assert importer.parse_amounts(["Rp 1.234,56", "-50.000", "12"], "id").tolist() == [1234.56, -50000.0, 12.0]
+    assert importer.parse_amounts(["1,234.56", "-0.5"], "en").tolist() == [1234.56, -0.5]
+    assert importer.parse_amounts(pd.Series([1.5, -2])).tolist() == [1.5, -2.0]
+    assert importer.parse_amounts(["satu juta"]).isna().all()
+
+
+def test_prepare_maps_and_rejects():
+    raw = pd.DataFrame({
+        "date": ["2024-01-05", "06/01/2024", "2024-01-07", "2024-01-08", "tanggal"],
+        "amount": ["5.000.000", "-25.000,50", "10.000", "0", "1"],
+        "type": ["", "", "pengeluaran", "", ""],
+        "wallet": ["kas", "bca", "Dompet Lain", "Kas", "Kas"],
+        "category": ["gaji", "MAKAN", "makan", "gaji", "gaji"],
+        "description": ["gaji", None, "x", "nol", "salah"],
+    }, dtype=str)
+    rows, rejected = importer.prepare(raw, WALLETS, CATEGORIES)
+
+    assert rows.to_dict("records") == [
+        {"wallet_id": "w1", "category_id": "c1", "amount": "5000000.00", "type": "pemasukan",
+         "description": "gaji", "date": "2024-01-05"},
+        {"wallet_id": "w2", "category_id": "c2", "amount": "25000.50", "type": "pengeluaran",
+         "description": "", "date": "2024-01-06"},
+    ]
+    assert rejected["error"].tolist() == ["dompet tidak ditemukan", "jumlah tidak valid", "tanggal tidak valid"]
+
+
+def test_prepare_defaults():
+    raw = pd.DataFrame({"date": ["2024-01-05"], "amount": ["-10"], "description": ["parkir"]})
+    rows, rejected = importer.prepare(raw, WALLETS, CATEGORIES, default_wallet_id="w2",
+                                      default_category_ids={"pengeluaran": "c3"})
+    assert rejected.empty
+    assert rows.iloc[0][["wallet_id", "category_id", "type", "amount"]].tolist() == ["w2", "c3", "pengeluaran", "10.00"]
+
+
+def test_read_ofx_sgml():
+    ofx = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000<TRNAMT>-15000.00<NAME>INDOMARET
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240131<TRNAMT>7500000.00<MEMO>GAJI JANUARI
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+    df = importer.read_ofx(io.BytesIO(ofx))
+    assert df.to_dict("records") == [
+        {"date": "2024-01-05", "amount": -15000.0, "description": "INDOMARET"},
+        {"date": "2024-01-31", "amount": 7500000.0, "description": "GAJI JANUARI"},
+    ]
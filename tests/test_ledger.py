@@ -0,0 +1,29 @@
+def balances(fake, user_id):
+    return {w["id"]: w["balance"] for w in fake.table("wallets").select("id, balance").eq("user_id", user_id)
+            .execute().data}
+
+
+def test_update_moves_balance_between_wallets(fake, user):
+    tx = fake.table("transactions").select("*").eq("user_id", user.id).eq("type", "pengeluaran") \
+        .limit(1).execute().data[0]
+    other = next(w for w in balances(fake, user.id) if w != tx["wallet_id"])
+    before = balances(fake, user.id)
+
+    fake.table("transactions").update({"amount": tx["amount"] + 500, "wallet_id": other}).eq("id", tx["id"]).execute()
+    after = balances(fake, user.id)
+    assert after[tx["wallet_id"]] == before[tx["wallet_id"]] + tx["amount"]
+    assert after[other] == before[other] - tx["amount"] - 500
+    assert fake.rpc("reconcile_wallets", {"p_user_id": user.id}).execute().data == []
+
+
+def test_update_without_money_change_adds_no_entries(fake, user):
+    tx = fake.table("transactions").select("id").eq("user_id", user.id).limit(1).execute().data[0]
+    count = len(fake.table("wallet_ledger").select("id").eq("user_id", user.id).execute().data)
+    fake.table("transactions").update({"description": "cuma deskripsi"}).eq("id", tx["id"]).execute()
+    assert len(fake.table("wallet_ledger").select("id").eq("user_id", user.id).execute().data) == count
+
+
+def test_balance_at_sums_ledger(fake, user):
+    wallet_id, balance = next(iter(balances(fake, user.id).items()))
+    at = fake.rpc("wallet_balance_at", {"p_wallet_id": wallet_id, "p_at": "2999-12-31"}).execute().data
+    assert at == balance
@@ -0,0 +1,35 @@
+import math
+
+import pandas as pd
+import pytest
+
+import money
+
+
+def test_to_minor_rounds_to_cents():
+    out = money.to_minor(pd.Series([1.005, "12345.67", None, -2.5]))
+    assert out.dtype == "int64"
+    assert out.tolist() == [100, 1234567, 0, -250]
+
+
+def test_to_decimal_is_exact():
+    assert money.to_decimal([1234567, -5, 0, 100]).tolist() == ["12345.67", "-0.05", "0.00", "1.00"]
+    assert money.decimal(7) == "0.07"
+
+
+def test_minor_single_value():
+    assert money.minor(None) == 0
+    assert money.minor(12.34) == 1234
+    assert money.minor("99") == 9900
+
+
+@pytest.mark.parametrize("value", ["abc", "", float("nan"), math.inf])
+def test_minor_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        money.minor(value)
+
+
+def test_rupiah_groups_and_rounds():
+    assert [money.rupiah(v) for v in (123456789, 0, -150, 49, -49)] == \
+        ["Rp 1.234.568", "Rp 0", "Rp -2", "Rp 0", "Rp 0"]
+    assert money.rupiah(100_000_000) == "Rp 1.000.000"
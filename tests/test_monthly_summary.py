@@ -0,0 +1,65 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import data_access
+
+
+def raw_transactions(fake, user_id):
+    df = pd.DataFrame(fake.table("transactions").select("*").eq("user_id", user_id).execute().data)
+    df["month"] = df["date"].str[:7] + "-01"
+    return df
+
+
+def expected_summary(df, start, end, by_category):
+    df = df[(df["date"] >= start.isoformat()) & (df["date"] < end.isoformat())]
+    keys = ["month", "type"] + (["category_id"] if by_category else [])
+    out = df.groupby(keys).agg(total=("amount", "sum"), n=("id", "size")).reset_index()
+    return {(r.month, r.type, r.category_id if by_category else None): (r.total, r.n) for r in out.itertuples()}
+
+
+def rpc_summary(fake, user_id, start, end, by_category):
+    rows = fake.rpc("monthly_summary", {"p_user_id": user_id, "p_start": start.isoformat(),
+                                        "p_end": end.isoformat(), "p_by_category": by_category}).execute().data
+    return {(r["month"], r["type"], r["category_id"]): (r["total"], r["n"]) for r in rows}
+
+
+@pytest.mark.parametrize("start, end", [
+    (date(date.today().year - 1, 1, 1), date(date.today().year, 1, 1)),  # awal bulan -> rollup
+    (date(date.today().year - 1, 1, 15), date(date.today().year, 1, 10)),  # di tengah bulan -> baris mentah
+])
+@pytest.mark.parametrize("by_category", [False, True])
+def test_rpc_matches_raw_rows(fake, user, start, end, by_category):
+    expected = expected_summary(raw_transactions(fake, user.id), start, end, by_category)
+    assert expected
+    assert rpc_summary(fake, user.id, start, end, by_category) == expected
+
+
+def test_get_monthly_summary(fake, user, session):
+    today = date.today()
+    start, end = data_access.month_bounds(today.year - 1, 1)[0], data_access.month_bounds(today.year - 1, 12)[1]
+    out = data_access.get_monthly_summary(user.id, start, end, by_category=True)
+    expected = expected_summary(raw_transactions(fake, user.id), start, end, True)
+
+    assert len(out) == len(expected)
+    assert out["total"].sum() == round(sum(t for t, _ in expected.values()) * 100)  # sen
+    assert out["n"].sum() == sum(n for _, n in expected.values())
+    assert out["month"].between(pd.Timestamp(start), pd.Timestamp(end), inclusive="left").all()
+
+
+def test_transactions_page_within_month(fake, user, session):
+    df = raw_transactions(fake, user.id)
+    month = df["month"].value_counts().index[0]
+    start, end = data_access.month_bounds(int(month[:4]), int(month[5:7]))
+    expected = set(df.loc[df["month"] == month, "id"])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = data_access.get_transactions_page(user.id, start, end, after=cursor, page_size=3)
+        assert page["date"].between(pd.Timestamp(start), pd.Timestamp(end), inclusive="left").all()
+        seen.extend(page["id"])
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected
@@ -0,0 +1,101 @@
+import pytest
+
+import offline
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    # Mirror + antrian di SQLite sementara; worker tidak dijalankan,
+    # antrian dikirim manual lewat flush()
+    monkeypatch.setenv(offline.ENV_FLAG, "1")
+    monkeypatch.setattr(offline, "DB_PATH", str(tmp_path / "offline.db"))
+    monkeypatch.setattr(offline, "_ensure_worker", lambda: None)
+    for name, value in (("_conn", None), ("_clients", {}), ("_versions", {}), ("_frames", {}),
+                        ("_pull_requests", set())):
+        monkeypatch.setattr(offline, name, value)
+    yield offline
+    if offline._conn is not None:
+        offline._conn.close()
+
+
+def wallet_balance(fake, wallet_id):
+    return fake.table("wallets").select("balance").eq("id", wallet_id).single().execute().data["balance"]
+
+
+def payload(fake, user, **values):
+    tx = fake.table("transactions").select("wallet_id, category_id").eq("user_id", user.id) \
+        .eq("type", "pengeluaran").limit(1).execute().data[0]
+    return {"user_id": user.id, "wallet_id": tx["wallet_id"], "category_id": tx["category_id"],
+            "amount": "15000.00", "type": "pengeluaran", "description": "offline", "date": "2024-05-01", **values}
+
+
+def test_insert_is_local_until_flush(fake, user, queue):
+    queue.frame("wallets", user.id, fake)
+    row = queue.insert("transactions", payload(fake, user), user.id, fake)
+    balance = wallet_balance(fake, row["wallet_id"])
+
+    assert queue.status(user.id)["pending"] == 1
+    assert not fake.table("transactions").select("id").eq("id", row["id"]).execute().data
+    local = queue.frame("wallets", user.id, fake).set_index("id")
+    assert local.loc[row["wallet_id"], "balance"] == round(balance * 100) - 1_500_000  # sen
+
+    assert queue.flush(user.id) == 1
+    assert queue.status(user.id) == {"pending": 0, "conflict": 0, "failed": 0}
+    assert fake.table("transactions").select("id").eq("id", row["id"]).execute().data
+    assert wallet_balance(fake, row["wallet_id"]) == balance - 15000
+
+
+
+def test_local_balance_is_exact(fake, user, queue):
+    # 0.10 sepuluh kali = tepat 1 rupiah, tanpa sisa float di mirror
+    before = queue.frame("wallets", user.id, fake).set_index("id")
+    for i in range(10):
+        row = queue.insert("transactions", payload(fake, user, amount="0.10", description=f"receh {i}"),
+                           user.id, fake)
+    local = queue.frame("wallets", user.id, fake).set_index("id")
+    assert local.loc[row["wallet_id"], "balance"] == before.loc[row["wallet_id"], "balance"] - 100
+
+    queue.set_wallet_balance(row["wallet_id"], "12345.67", user.id, fake)
+    local = queue.frame("wallets", user.id, fake).set_index("id")
+    assert local.loc[row["wallet_id"], "balance"] == 1_234_567
+
+def test_consecutive_inserts_share_one_request(fake, user, queue):
+    for i in range(3):
+        queue.insert("transactions", payload(fake, user, description=f"offline {i}"), user.id, fake)
+    fake.reset_stats()
+    assert queue.flush(user.id) == 3
+    # 1 upsert untuk ketiganya + 1 pull mirror setelah antrian kosong
+    assert fake.snapshot_stats()["by_target"]["transactions"] == 2
+    assert len(fake.table("transactions").select("id").eq("description", "offline 1").execute().data) == 1
+
+
+def test_delete_before_flush_cancels_insert(fake, user, queue):
+    row = queue.insert("transactions", payload(fake, user), user.id, fake)
+    queue.update("transactions", {"description": "ubah"}, [row["id"]], user.id, fake)
+    queue.delete("transactions", row["id"], user.id, fake)
+    assert queue.status(user.id)["pending"] == 0
+    assert queue.flush(user.id) == 0
+
+
+def test_server_change_is_a_conflict(fake, user, queue):
+    df = queue.frame("transactions", user.id, fake)
+    row_id = df["id"].iloc[0]
+    queue.update("transactions", {"description": "dari offline"}, [row_id], user.id, fake)
+    # Perangkat lain mengubah baris yang sama lebih dulu
+    fake.table("transactions").update({"description": "dari perangkat lain"}).eq("id", row_id).execute()
+
+    queue.flush(user.id)
+    assert queue.status(user.id)["conflict"] == 1
+    server = fake.table("transactions").select("description").eq("id", row_id).single().execute().data
+    assert server["description"] == "dari perangkat lain"
+    assert queue.problems(user.id)["last_error"].tolist() == ["diubah di perangkat lain"]
+
+
+def test_failed_send_is_retried_later(fake, user, queue, monkeypatch):
+    row = queue.insert("transactions", payload(fake, user), user.id, fake)
+    monkeypatch.setattr(offline, "_send", lambda client, group: (_ for _ in ()).throw(ConnectionError("offline")))
+    assert queue.flush(user.id) == 0
+    item = queue._db().execute("select attempts, last_error, next_attempt_at from queue where row_id = ?",
+                               (row["id"],)).fetchone()
+    assert (item["attempts"], item["last_error"]) == (1, "offline")
+    assert queue.status(user.id)["pending"] == 1
@@ -0,0 +1,23 @@
+import pandas as pd
+
+
+def rollup(fake, user_id):
+    rows = fake.table("transaction_monthly_rollup").select("month, category_id, type, total, n") \
+        .eq("user_id", user_id).execute().data
+    return pd.DataFrame(rows).sort_values(["month", "type", "category_id"]).reset_index(drop=True)
+
+
+def test_rollup_follows_writes(fake, user):
+    txs = fake.table("transactions").select("*").eq("user_id", user.id).limit(3).execute().data
+    moved, deleted, recategorized = txs
+    fake.table("transactions").update({"amount": moved["amount"] + 500, "date": "2000-02-29"}) \
+        .eq("id", moved["id"]).execute()
+    fake.table("transactions").delete().eq("id", deleted["id"]).execute()
+    fake.table("transactions").update({"category_id": None}).eq("id", recategorized["id"]).execute()
+    maintained = rollup(fake, user.id)
+
+    assert maintained[maintained["month"] == "2000-02-01"][["total", "n"]].values.tolist() == \
+        [[moved["amount"] + 500, 1]]
+    assert (maintained["n"] > 0).all()
+    fake.rpc("rebuild_monthly_rollup", {"p_user_id": user.id}).execute()
+    pd.testing.assert_frame_equal(maintained, rollup(fake, user.id))
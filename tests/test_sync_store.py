@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+import sync_store
+
+
+@pytest.fixture
+def small_pages(fake, monkeypatch):
+    monkeypatch.setattr(sync_store, "MAX_ROWS", 50)
+    fake.max_rows = 50
+
+
+def server_ids(fake, user_id):
+    limit, fake.max_rows = fake.max_rows, None
+    try:
+        return {r["id"] for r in fake.table("transactions").select("id").eq("user_id", user_id).execute().data}
+    finally:
+        fake.max_rows = limit
+
+
+def test_full_load_paginates(fake, user, session, small_pages):
+    df = sync_store.get("transactions", user.id)
+    assert len(df) == len(server_ids(fake, user.id)) > 50
+    assert df["id"].is_unique
+    assert df["date"].is_monotonic_decreasing
+
+
+def test_cached_until_generation_changes(fake, user, session, small_pages):
+    before = sync_store.get("transactions", user.id)
+    fake.table("transactions").delete().eq("id", before["id"].iloc[0]).execute()
+    assert len(sync_store.get("transactions", user.id)) == len(before)
+    assert len(sync_store.get("transactions", user.id, generation=1)) == len(before) - 1
+
+
+def test_delta_sync_applies_changes(fake, user, session, small_pages):
+    df = sync_store.get("transactions", user.id)
+    row = df.iloc[0]
+    removed, changed = df["id"].iloc[1], df["id"].iloc[2]
+    added = fake.table("transactions").insert({
+        "user_id": user.id, "wallet_id": row["wallet_id"], "category_id": row["category_id"],
+        "amount": 1234.5, "type": "pengeluaran", "description": "baru", "date": "2099-01-01",
+    }).execute().data[0]["id"]
+    fake.table("transactions").update({"description": "diubah"}).eq("id", changed).execute()
+    fake.table("transactions").delete().eq("id", removed).execute()
+
+    out = sync_store.get("transactions", user.id, generation=1).set_index("id")
+    assert set(out.index) == server_ids(fake, user.id)
+    assert out.loc[changed, "description"] == "diubah"
+    assert out.loc[added, "amount"] == 123450  # sen
+    assert out.index[0] == added
+
+
+def test_merge_rows_and_drop(fake, user, session):
+    df = sync_store.get("transactions", user.id)
+    upserted = df.head(1).assign(description="lokal")
+    merged = sync_store.merge_rows("transactions", df, upserted, deleted_ids=[df["id"].iloc[1]])
+    assert len(merged) == len(df) - 1
+    assert merged.set_index("id").loc[upserted["id"].iloc[0], "description"] == "lokal"
+
+    sync_store.drop(user.id)
+    assert not any(key[1] == user.id for key in session["_sync_store"])
+    pd.testing.assert_frame_equal(sync_store.get("transactions", user.id), df)